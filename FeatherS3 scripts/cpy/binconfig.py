@@ -0,0 +1,377 @@
+"""
+Compact Binary Config
+Compiles macropad_config.json into fixed-size records with integer action opcodes and a
+shared string pool, and reads it back without building a dict per key
+
+Layout (little-endian):
+    header   HEADER_FORMAT
+    layers   layer_count x (LAYER_FORMAT + slots_per_layer x BINDING_FORMAT)
+    pool     UTF-8 strings, each stored once and referenced by (offset, length)
+
+Binding slots per layer: buttons 1..N first, then three slots (ccw, cw, press) per knob A, B, ...
+Settings the hot path never touches (display, power, limits, ...) live in the pool as a small JSON.
+"""
+
+import json
+import struct
+
+MAGIC = b"PBIN"
+VERSION = 1
+
+# magic, version, buttons per layer, knobs per layer, reserved, layer count,
+# settings JSON (offset, length), pool size
+HEADER_FORMAT = "<4sBBBBHHHH"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# layer id, name (offset, length), layer extras JSON (offset, length)
+LAYER_FORMAT = "<HHHHH"
+LAYER_SIZE = struct.calcsize(LAYER_FORMAT)
+
+# opcode, flags, argument string (offset, length), extras JSON (offset, length)
+BINDING_FORMAT = "<BBHHHH"
+BINDING_SIZE = struct.calcsize(BINDING_FORMAT)
+
+FLAG_ENABLED = 0x01
+
+# Action opcodes - shared by buttons and knobs
+OP_NONE = 0
+OP_TYPE_TEXT = 1
+OP_SPECIAL_KEY = 2
+OP_KEY_COMBO = 3
+OP_VOLUME_CONTROL = 4   # Consumer control code named by the argument ("Mute", "Volume Up", ...)
+OP_LAYER_SWITCH = 5
+OP_VOLUME_UP = 6
+OP_VOLUME_DOWN = 7
+OP_SCROLL_UP = 8
+OP_SCROLL_DOWN = 9
+OP_KEY_PRESS = 10       # Legacy knob action, sends Enter
+OP_SCROLL_LEFT = 11
+OP_SCROLL_RIGHT = 12
+OP_MACRO = 13           # Step list in the "steps" extra or the key ("tap:Ctrl+C; wait:100; ...")
+OP_TRANSPARENT = 14     # Falls through to the next active layer below
+OP_LAYER_MOMENTARY = 15 # Layer number in the key, active while the key is held
+OP_LAYER_TOGGLE = 16    # Layer number in the key, on / off with each press
+OP_LAYER_ONESHOT = 17   # Layer number in the key, active for the next action only
+OP_COUNT = 18
+
+# Canonical action name per opcode
+ACTION_NAMES = (
+    "None",
+    "Type Text",
+    "Special Key",
+    "Key combo",
+    "Volume Control",
+    "Layer Switch",
+    "Increase Volume",
+    "Decrease Volume",
+    "Scroll Up",
+    "Scroll Down",
+    "Key Press",
+    "Scroll Left",
+    "Scroll Right",
+    "Macro",
+    "Transparent",
+    "Momentary Layer",
+    "Toggle Layer",
+    "One-Shot Layer",
+)
+
+# Actions that make sense once per knob step (a fast turn runs them several times)
+REPEATABLE_OPCODES = (
+    OP_SPECIAL_KEY,
+    OP_KEY_COMBO,
+    OP_VOLUME_CONTROL,
+    OP_VOLUME_UP,
+    OP_VOLUME_DOWN,
+    OP_SCROLL_UP,
+    OP_SCROLL_DOWN,
+    OP_KEY_PRESS,
+    OP_SCROLL_LEFT,
+    OP_SCROLL_RIGHT,
+)
+
+# Actions that auto-repeat while held unless the binding sets "repeat": false
+AUTO_REPEAT_OPCODES = (
+    OP_VOLUME_UP,
+    OP_VOLUME_DOWN,
+    OP_SCROLL_UP,
+    OP_SCROLL_DOWN,
+    OP_SCROLL_LEFT,
+    OP_SCROLL_RIGHT,
+)
+
+# Actions that change the layer stack (a one-shot layer waits for the next other action)
+LAYER_OPCODES = (
+    OP_LAYER_SWITCH,
+    OP_LAYER_MOMENTARY,
+    OP_LAYER_TOGGLE,
+    OP_LAYER_ONESHOT,
+)
+
+# Action strings accepted in the JSON, including legacy aliases
+ACTION_OPCODES = {name: opcode for opcode, name in enumerate(ACTION_NAMES)}
+ACTION_OPCODES.update({
+    "": OP_NONE,
+    "Key Combo": OP_KEY_COMBO,
+    "Switch Layer": OP_LAYER_SWITCH,
+    "Volume Up": OP_VOLUME_UP,
+    "Volume Down": OP_VOLUME_DOWN,
+    "Hold Layer": OP_LAYER_MOMENTARY,
+    "One Shot Layer": OP_LAYER_ONESHOT,
+})
+
+KNOB_LETTERS = "ABCDEFGH"
+KNOB_SLOTS = ("ccw", "cw", "press")
+SLOT_CCW = 0
+SLOT_CW = 1
+SLOT_PRESS = 2
+
+# Top-level keys that are not compiled into settings
+DROPPED_KEYS = ("layers", "created", "device", "lastModified", "systemTime")
+BUTTON_KEYS = ("action", "key", "enabled")
+LAYER_KEYS = ("id", "name", "buttons", "knobs")
+
+def action_opcode(action):
+    """Opcode for an action string (unknown actions compile to OP_NONE)"""
+    if action is None:
+        return OP_NONE
+    opcode = ACTION_OPCODES.get(action)
+    if opcode is None:
+        print(f"Unknown action: {action} - ignored")
+        return OP_NONE
+    return opcode
+
+def _is_slot_key(key):
+    """True for knob keys that belong to one slot (ccwAction, cwKey, pressRepeat, ...)"""
+    for slot in KNOB_SLOTS:
+        if key.startswith(slot):
+            return True
+    return False
+
+class _Pool:
+    """String pool builder - identical strings are stored once"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.refs = {}
+
+    def add(self, text):
+        if not text:
+            return 0, 0
+        if text not in self.refs:
+            encoded = text.encode()
+            self.refs[text] = (len(self.data), len(encoded))
+            self.data += encoded
+        return self.refs[text]
+
+    def add_json(self, obj):
+        return self.add(json.dumps(obj)) if obj else (0, 0)
+
+def _legacy_layers(layers):
+    """Convert the old {"layer0": {"keys": [...]}} format into button dicts"""
+    converted = []
+    index = 0
+    while f"layer{index}" in layers:
+        keys = layers[f"layer{index}"].get("keys", [])
+        buttons = {str(i + 1): {"action": "Type Text", "key": key} for i, key in enumerate(keys) if key}
+        converted.append({"id": index + 1, "name": f"Layer {index + 1}", "buttons": buttons})
+        index += 1
+    return converted
+
+def _button_number(button_id):
+    """1-based button number of a "buttons" key, None (with a warning) for anything else"""
+    try:
+        number = int(button_id)
+    except (ValueError, TypeError):
+        number = 0
+    if number < 1:
+        print(f"Button '{button_id}' ignored: not a button number")
+        return None
+    return number
+
+def _knob_index(letter):
+    """0-based knob index of a "knobs" key, None (with a warning) for anything else"""
+    index = KNOB_LETTERS.find(letter) if isinstance(letter, str) and len(letter) == 1 else -1
+    if index < 0:
+        print(f"Knob '{letter}' ignored: must be one of {KNOB_LETTERS}")
+        return None
+    return index
+
+def compile_config(config):
+    """Compile a parsed JSON config into the binary format (returns bytearray).
+    Buttons and knobs with an invalid key are left out like the JSON path does"""
+    layers = config.get("layers", [])
+    if isinstance(layers, dict):
+        layers = _legacy_layers(layers)
+
+    buttons_per_layer = config.get("limits", {}).get("maxButtons", 0)
+    knobs_per_layer = 0
+    for layer in layers:
+        for button_id in layer.get("buttons", {}):
+            number = _button_number(button_id)
+            if number is not None:
+                buttons_per_layer = max(buttons_per_layer, number)
+        for letter in layer.get("knobs", {}):
+            index = _knob_index(letter)
+            if index is not None:
+                knobs_per_layer = max(knobs_per_layer, index + 1)
+    if buttons_per_layer > 255:
+        raise ValueError("too many buttons per layer")
+
+    pool = _Pool()
+    settings = {key: value for key, value in config.items() if key not in DROPPED_KEYS}
+    settings_ref = pool.add_json(settings)
+
+    knob_letters = tuple(KNOB_LETTERS[:knobs_per_layer])
+    records = bytearray()
+    for layer_index, layer in enumerate(layers):
+        name_ref = pool.add(layer.get("name", ""))
+        layer_extras = {key: value for key, value in layer.items() if key not in LAYER_KEYS}
+        knob_extras = {}
+        for letter, knob in layer.get("knobs", {}).items():
+            if letter not in knob_letters:
+                continue
+            shared = {key: value for key, value in knob.items() if not _is_slot_key(key)}
+            if shared:
+                knob_extras[letter] = shared
+        if knob_extras:
+            layer_extras["knobs"] = knob_extras
+        extras_ref = pool.add_json(layer_extras)
+        records += struct.pack(LAYER_FORMAT, layer.get("id", layer_index + 1), name_ref[0], name_ref[1], extras_ref[0], extras_ref[1])
+
+        buttons = layer.get("buttons", {})
+        for number in range(1, buttons_per_layer + 1):
+            button = buttons.get(str(number), {})
+            flags = FLAG_ENABLED if button.get("enabled", True) else 0
+            arg_ref = pool.add(button.get("key", ""))
+            extras_ref = pool.add_json({key: value for key, value in button.items() if key not in BUTTON_KEYS})
+            records += struct.pack(BINDING_FORMAT, action_opcode(button.get("action")), flags,
+                                   arg_ref[0], arg_ref[1], extras_ref[0], extras_ref[1])
+
+        knobs = layer.get("knobs", {})
+        for knob_index in range(knobs_per_layer):
+            knob = knobs.get(KNOB_LETTERS[knob_index], {})
+            for slot in KNOB_SLOTS:
+                arg_ref = pool.add(knob.get(slot + "Key") or "")
+                # Slot-specific extras, e.g. "cwRepeat" -> {"repeat": ...} on the cw slot
+                extras = {}
+                for key, value in knob.items():
+                    if key.startswith(slot) and key not in (slot + "Action", slot + "Key"):
+                        name = key[len(slot):]
+                        extras[name[:1].lower() + name[1:]] = value
+                extras_ref = pool.add_json(extras)
+                records += struct.pack(BINDING_FORMAT, action_opcode(knob.get(slot + "Action")), FLAG_ENABLED,
+                                       arg_ref[0], arg_ref[1], extras_ref[0], extras_ref[1])
+
+    if len(pool.data) > 0xFFFF:
+        raise ValueError("config string pool exceeds 64 KB")
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, buttons_per_layer, knobs_per_layer, 0,
+                         len(layers), settings_ref[0], settings_ref[1], len(pool.data))
+    return bytearray(header) + records + pool.data
+
+class BinaryConfig:
+    """Read-only view of a compiled config held in a (preallocated) buffer"""
+
+    def __init__(self, buffer, length=None):
+        magic, version, buttons, knobs, _, layer_count, settings_off, settings_len, pool_size = struct.unpack_from(HEADER_FORMAT, buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a compiled config")
+        self.buffer = memoryview(buffer)[:length] if length is not None else memoryview(buffer)
+        self.buttons_per_layer = buttons
+        self.knobs_per_layer = knobs
+        self.layer_count = layer_count
+        self.slots_per_layer = buttons + knobs * len(KNOB_SLOTS)
+        self.layer_size = LAYER_SIZE + self.slots_per_layer * BINDING_SIZE
+        self.pool_offset = HEADER_SIZE + layer_count * self.layer_size
+        if self.pool_offset + pool_size > len(self.buffer):
+            raise ValueError("compiled config is truncated")
+        settings = self.string(settings_off, settings_len)
+        self.settings = json.loads(settings) if settings else {}
+        # Binding extras decoded once, by pool offset (the pool stores equal extras once) -
+        # binding() runs on every key press and must not parse JSON
+        self._extras = {}
+        for layer_index in range(layer_count):
+            for slot in range(self.slots_per_layer):
+                _, _, _, _, extras_off, extras_len = self.binding_raw(layer_index, slot)
+                if extras_len and extras_off not in self._extras:
+                    self._extras[extras_off] = self._json(extras_off, extras_len)
+
+    def string(self, offset, length):
+        """Decode a pool string"""
+        if not length:
+            return ""
+        start = self.pool_offset + offset
+        return str(self.buffer[start:start + length], "utf-8")
+
+    def _json(self, offset, length):
+        return json.loads(self.string(offset, length)) if length else None
+
+    def _layer_offset(self, layer_index):
+        if not 0 <= layer_index < self.layer_count:
+            raise IndexError("layer index out of range")
+        return HEADER_SIZE + layer_index * self.layer_size
+
+    def layer_id(self, layer_index):
+        return struct.unpack_from("<H", self.buffer, self._layer_offset(layer_index))[0]
+
+    def layer_name(self, layer_index):
+        _, name_off, name_len, _, _ = struct.unpack_from(LAYER_FORMAT, self.buffer, self._layer_offset(layer_index))
+        return self.string(name_off, name_len)
+
+    def layer_extras(self, layer_index):
+        _, _, _, extras_off, extras_len = struct.unpack_from(LAYER_FORMAT, self.buffer, self._layer_offset(layer_index))
+        return self._json(extras_off, extras_len) or {}
+
+    def binding_raw(self, layer_index, slot):
+        """(opcode, flags, arg offset, arg length, extras offset, extras length) of one slot"""
+        offset = self._layer_offset(layer_index) + LAYER_SIZE + slot * BINDING_SIZE
+        return struct.unpack_from(BINDING_FORMAT, self.buffer, offset)
+
+    def binding(self, layer_index, slot):
+        """(opcode, enabled, argument string, extras dict or None) of one slot - the extras dict is
+        shared by all slots with the same extras, don't change it"""
+        opcode, flags, arg_off, arg_len, extras_off, extras_len = self.binding_raw(layer_index, slot)
+        extras = self._extras[extras_off] if extras_len else None
+        return opcode, bool(flags & FLAG_ENABLED), self.string(arg_off, arg_len), extras
+
+    def button_slot(self, button_index):
+        """Slot of a 0-based button index"""
+        return button_index
+
+    def knob_slot(self, knob_index, which):
+        """Slot of a knob binding, which = SLOT_CCW / SLOT_CW / SLOT_PRESS"""
+        return self.buttons_per_layer + knob_index * len(KNOB_SLOTS) + which
+
+    def to_dict(self):
+        """Rebuild the JSON interchange form (used when the SD copy is not available)"""
+        config = dict(self.settings)
+        layers = []
+        for layer_index in range(self.layer_count):
+            layer = {"id": self.layer_id(layer_index), "name": self.layer_name(layer_index)}
+            extras = self.layer_extras(layer_index)
+            knob_extras = extras.pop("knobs", {})
+            layer.update(extras)
+            buttons = {}
+            for button_index in range(self.buttons_per_layer):
+                opcode, enabled, key, button_extras = self.binding(layer_index, self.button_slot(button_index))
+                button = {"action": ACTION_NAMES[opcode], "key": key, "enabled": enabled}
+                if button_extras:
+                    button.update(button_extras)
+                buttons[str(button_index + 1)] = button
+            layer["buttons"] = buttons
+            knobs = {}
+            for knob_index in range(self.knobs_per_layer):
+                letter = KNOB_LETTERS[knob_index]
+                knob = dict(knob_extras.get(letter, {}))
+                for which, slot in enumerate(KNOB_SLOTS):
+                    opcode, _, key, slot_extras = self.binding(layer_index, self.knob_slot(knob_index, which))
+                    knob[slot + "Action"] = ACTION_NAMES[opcode]
+                    if key:
+                        knob[slot + "Key"] = key
+                    for name, value in (slot_extras or {}).items():
+                        knob[slot + name[:1].upper() + name[1:]] = value
+                knobs[letter] = knob
+            layer["knobs"] = knobs
+            layers.append(layer)
+        config["layers"] = layers
+        return config
@@ -1,8 +1,22 @@
 """Boot configuration for Feather S3"""
+import os
 import usb_cdc
+import usb_hid
 import storage
 
 #storage.disable_usb_drive()
 
 usb_cdc.enable(console=False, data=True)
 
+# HID devices from settings.toml (needs a hard reset to take effect):
+#   PADAWAN_HID_KEYBOARD = "nkro" | "boot"
+#   PADAWAN_HID_MOUSE = "hires" | "standard" | "none"
+try:
+    import hid_descriptors
+    usb_hid.enable(hid_descriptors.build_devices(
+        keyboard=os.getenv("PADAWAN_HID_KEYBOARD", "nkro"),
+        mouse=os.getenv("PADAWAN_HID_MOUSE", "hires"),
+    ))
+except Exception as e:
+    print(f"BOOT.PY: Custom HID devices failed ({e}) - using keyboard + consumer control")
+    usb_hid.enable((usb_hid.Device.KEYBOARD, usb_hid.Device.CONSUMER_CONTROL))
@@ -0,0 +1,40 @@
+"""
+Boot Profiler
+Timestamps the start-up phases of code.py so the boot sequence can be measured over serial
+"""
+
+import time
+
+# time.monotonic_ns() counts from power-on/reset, so marks are absolute boot times
+_names = []
+_times_ns = []
+
+def mark(name):
+    """Record that the boot phase `name` has just finished"""
+    _names.append(name)
+    _times_ns.append(time.monotonic_ns())
+
+def elapsed_ms(name):
+    """Milliseconds since power-on at which `name` was marked (None if never marked)"""
+    for i, phase in enumerate(_names):
+        if phase == name:
+            return _times_ns[i] // 1000000
+    return None
+
+def format_report():
+    """BOOT_PROFILE:<phase>=<ms since power-on>+<ms spent in phase>,..."""
+    parts = []
+    previous = 0
+    for i, phase in enumerate(_names):
+        t = _times_ns[i] // 1000000
+        parts.append(f"{phase}={t}+{t - previous}")
+        previous = t
+    return "BOOT_PROFILE:" + ",".join(parts)
+
+def print_report():
+    """Print the boot timeline to the console"""
+    previous = 0
+    for i, phase in enumerate(_names):
+        t = _times_ns[i] // 1000000
+        print(f"Boot: {phase:<16} {t:6d} ms (+{t - previous} ms)")
+        previous = t
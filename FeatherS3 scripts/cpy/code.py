@@ -1,26 +1,66 @@
-import feathers3
+import boot_profile
+import event_trace
+import mem_monitor
+import stats
 import time
-import json
-import board
-import busio
-import sdcardio
-import storage
-import digitalio
-import rotaryio
 import usb_hid
 import usb_cdc
-import displayio
-import terminalio
-from adafruit_display_text import label
-import adafruit_displayio_ssd1306
-from adafruit_hid.keyboard import Keyboard
+import nkro_keyboard
+from nkro_keyboard import create_keyboard
 from adafruit_hid.keyboard_layout_win_de import KeyboardLayout as KeyboardLayoutWinDE
 from adafruit_hid.keycode_win_de import Keycode as KeycodeDE
 from adafruit_hid.consumer_control import ConsumerControl
 from adafruit_hid.consumer_control_code import ConsumerControlCode
 
+boot_profile.mark("hid_imports")
 print("CODE.PY: Starting...")
 
+# HID devices wrapped so STATS can count reports and press-to-report latency
+hid_devices = stats.count_devices(usb_hid.devices)
+
+# The keyboard object!
+# Created first so HID reports can go out as soon as USB has enumerated.
+# Keyboard() itself retries once if the host is not ready yet, so no extra sleep is needed.
+# NKRO bitmap keyboard if boot.py enabled it (see settings.toml), standard keyboard otherwise.
+try:
+    keyboard = create_keyboard(hid_devices)
+except OSError as e:
+    print(f"CODE.PY: Keyboard not ready yet ({e}) - retrying")
+    time.sleep(0.05)
+    keyboard = create_keyboard(hid_devices)
+keyboard_layout = KeyboardLayoutWinDE(keyboard)  # We're in DE :)
+
+# Consumer control for volume/media keys
+consumer_control = ConsumerControl(hid_devices)
+boot_profile.mark("hid")
+
+import feathers3
+import power
+import config_cache
+import binconfig
+import text_reports
+import typing_engine
+import wheel_mouse
+import macro_engine
+import held_keys
+import layer_stack
+import key_scanner
+import encoders
+import json
+import os
+import board
+import busio
+import sdcardio
+import storage
+
+typing_engine.set_keyboard(keyboard)
+wheel_mouse.init(hid_devices)
+boot_profile.mark("imports")
+
+# Per-event debug output (key presses, actions, serial lines) - every message is a string
+# allocated in the main loop, so it is off unless PADAWAN_LOG_EVENTS = 1 or LOG_EVENTS:1
+log_events = bool(int(os.getenv("PADAWAN_LOG_EVENTS") or 0))
+
 # Display mode settings (will be updated from desktop app)
 display_mode = "off"  # "off", "layer", "battery", "time"
 display_enabled = True
@@ -33,155 +73,148 @@ system_date = None
 max_layers = 1  # Default, will be updated from config
 max_buttons = 6  # Default, will be updated from config
 
-# Rotary encoder state tracking (using CircuitPython rotaryio)
-# State variables are now handled by the rotaryio.IncrementalEncoder objects
+# Upload state (defined early because display updates check it)
+uploading = False
 
 # Check if USB is available (don't try to enable it)
 usb = usb_cdc.data
 print(f"CODE.PY: USB object: {usb}")
+if usb:
+    # Count the serial bytes for STATS
+    usb = stats.CountingSerial(usb)
 
 if usb:
     print("CODE.PY: USB is available")
     print("CODE.PY: Ready to receive commands from desktop app")
     print("CODE.PY: Send 'PING' to test communication")
     print("CODE.PY: Waiting for commands...")
-    
-    # Give USB time to stabilize
-    time.sleep(1)
-    
-    # Test USB connection
-    try:
-        usb.write(b"CODE.PY: FeatherS3 ready\n")
-        time.sleep(0.1)  # Give USB time to send
-        print("CODE.PY: USB test write successful")
-    except Exception as e:
-        print(f"CODE.PY: USB test write failed: {e}")
 else:
     print("CODE.PY: USB is NOT available - check boot.py!")
     print("CODE.PY: This means the app cannot communicate with the Feather S3")
 
 # A simple neat keyboard demo in CircuitPython
-def read_json_file(file_path, current_layer):
+def get_layer_keys(config, current_layer):
+    """Key list of one layer of the compiled config, in pin order"""
+    if config is None:
+        return []
     try:
-        with open(file_path, "r") as f:
-            json_object = json.load(f)
+        if log_events:
             print(f"Reading config for layer {current_layer}")
-
-            # Handle new comprehensive format with layers array
-            if "layers" in json_object and isinstance(json_object["layers"], list):
-                layers = json_object["layers"]
-                # Find the layer by index (current_layer is 1-based, array is 0-based)
-                layer_index = current_layer - 1
-                if 0 <= layer_index < len(layers):
-                    layer = layers[layer_index]
-                    buttons = layer.get("buttons", {})
-                    layer_name = layer.get('name', f'Layer {current_layer}')
-                    print(f"Found layer: {layer_name}")
-
-                    # Convert button dictionary to array in pin order
-                    keys = []
-                    for i in range(1, max_buttons + 1):  # Dynamic button count
-                        button_id = str(i)
-                        if button_id in buttons:
-                            button_config = buttons[button_id]
-                            if button_config.get("enabled", True) and button_config.get("action") != "None":
-                                action = button_config.get("action", "")
-                                if action == "Layer Switch":
-                                    keys.append("LAYER_SWITCH")
-                                else:
-                                    keys.append(button_config.get("key", ""))
-                            else:
-                                keys.append("")  # Empty for disabled buttons
-                        else:
-                            keys.append("")  # Empty for missing buttons
-                    print(f"Loaded keys: {keys}")
-                    return keys
-
-            # Handle old format with layers object (backward compatibility)
-            elif "layers" in json_object and isinstance(json_object["layers"], dict):
-                layers = json_object["layers"]
-                layer_key = f"layer{current_layer - 1}"
-                if layer_key in layers:
-                    layer = layers[layer_key]
-                    keys = layer.get("keys", [])
-                    # Pad to max_buttons if needed
-                    while len(keys) < max_buttons:
-                        keys.append("")
-                    return keys[:max_buttons]  # Only return first max_buttons buttons
-
+        # Find the layer by index (current_layer is 1-based, array is 0-based)
+        layer_index = current_layer - 1
+        if not 0 <= layer_index < config.layer_count:
             print(f"No layer found for {current_layer}")
             return []
+        if log_events:
+            print(f"Found layer: {config.layer_name(layer_index) or f'Layer {current_layer}'}")
+            if layer_stack.entries:
+                print(f"Active layer stack: {[entry[0] for entry in layer_stack.entries]}")
+
+        # Convert button records to array in pin order (each from the layer serving it)
+        keys = []
+        for i in range(max_buttons):  # Dynamic button count
+            if i >= config.buttons_per_layer:
+                keys.append("")  # Empty for missing buttons
+                continue
+            slot = config.button_slot(i)
+            opcode, enabled, key, extras = config.binding(layer_stack.layer_of(slot, layer_index), slot)
+            if opcode == binconfig.OP_NONE and enabled and extras and ("hold" in extras or "doubleTap" in extras):
+                keys.append(binconfig.ACTION_NAMES[opcode])  # Only a hold / double-tap action
+            elif not enabled or opcode in (binconfig.OP_NONE, binconfig.OP_TRANSPARENT):
+                keys.append("")  # Empty for disabled buttons
+            elif opcode == binconfig.OP_LAYER_SWITCH:
+                keys.append("LAYER_SWITCH")
+            else:
+                # Actions without an argument (macro steps in the extras, volume, scroll) still count
+                keys.append(key or binconfig.ACTION_NAMES[opcode])
+        if log_events:
+            print(f"Loaded keys: {keys}")
+        return keys
     except Exception as e:
-        print(f"Error reading JSON file: {e}")
+        print(f"Error reading layer config: {e}")
         return []
 
 def load_full_config(file_path):
-    """Lädt die vollständige Konfiguration aus der JSON-Datei"""
+    """Lädt die vollständige Konfiguration aus der JSON-Datei (nur für die Kompilierung)"""
     try:
+        stats.note_sd_read()
+        event_trace.begin(event_trace.SD_READ)
         with open(file_path, "r") as f:
-            return json.load(f)
+            config = json.load(f)
+        event_trace.end(event_trace.SD_READ)
+        return config
     except Exception as e:
         print(f"Fehler beim Laden der Konfiguration: {e}")
         return None
 
 # SD card setup with error handling
+# The SD card is mounted lazily: boot uses the NVM config cache and mounts the card afterwards
 sd_available = False
 file_path = "/sd/macropad_config.json"
+compiled_path = "/sd/macropad_config.bin"
+spi = None
 
-try:
-    spi = busio.SPI(board.SCK, MOSI=board.MOSI, MISO=board.MISO)
-    cs = board.IO38
-    sd = sdcardio.SDCard(spi, cs)
-    vfs = storage.VfsFat(sd)
-    storage.mount(vfs, "/sd")
-    sd_available = True
-    print("SD card mounted successfully")
-except Exception as e:
-    print(f"SD card error: {e}")
-    sd_available = False
-    print("ERROR: SD card is required for operation!")
-    # Don't set fallback path - SD card is required
-
-# Individual button pins - each with its own DigitalInOut object
-# Buttons: 1->IO14, 2->IO18, 3->IO5, 4->IO17, 5->IO6, 6->IO12
-button_1 = digitalio.DigitalInOut(board.IO14)
-button_1.direction = digitalio.Direction.INPUT
-button_1.pull = digitalio.Pull.UP
-
-button_2 = digitalio.DigitalInOut(board.IO18)
-button_2.direction = digitalio.Direction.INPUT
-button_2.pull = digitalio.Pull.UP
-
-button_3 = digitalio.DigitalInOut(board.IO5)
-button_3.direction = digitalio.Direction.INPUT
-button_3.pull = digitalio.Pull.UP
-
-button_4 = digitalio.DigitalInOut(board.IO17)
-button_4.direction = digitalio.Direction.INPUT
-button_4.pull = digitalio.Pull.UP
-
-button_5 = digitalio.DigitalInOut(board.IO6)
-button_5.direction = digitalio.Direction.INPUT
-button_5.pull = digitalio.Pull.UP
-
-button_6 = digitalio.DigitalInOut(board.IO12)
-button_6.direction = digitalio.Direction.INPUT
-button_6.pull = digitalio.Pull.UP
-
-# Rotary encoder pin definitions
-# Rotary A: A->IO10, B->IO11, Press->IO7
-# Rotary B: A->IO1, B->IO3, Press->IO33
-rotary_a_pins = (board.IO10, board.IO11)  # Rotary A: A and B pins
-rotary_b_pins = (board.IO1, board.IO3)    # Rotary B: A and B pins
-
-# Rotary encoder button pins
-rotary_a_button = digitalio.DigitalInOut(board.IO7)
-rotary_a_button.direction = digitalio.Direction.INPUT
-rotary_a_button.pull = digitalio.Pull.UP
-
-rotary_b_button = digitalio.DigitalInOut(board.IO33)
-rotary_b_button.direction = digitalio.Direction.INPUT
-rotary_b_button.pull = digitalio.Pull.UP
+def mount_sd():
+    """Mount the SD card if it isn't already (safe to call again after a failure)"""
+    global sd_available, spi
+    if sd_available:
+        return True
+    try:
+        if spi is None:
+            spi = busio.SPI(board.SCK, MOSI=board.MOSI, MISO=board.MISO)
+        cs = board.IO38
+        sd = sdcardio.SDCard(spi, cs)
+        vfs = storage.VfsFat(sd)
+        storage.mount(vfs, "/sd")
+        sd_available = True
+        print("SD card mounted successfully")
+    except Exception as e:
+        print(f"SD card error: {e}")
+        sd_available = False
+        print("SD card not available - running from the config cache")
+    return sd_available
+
+
+# Button pins come from the settings.toml hardware profile (see key_scanner)
+# Default wiring: 1->IO14, 2->IO18, 3->IO5, 4->IO17, 5->IO6, 6->IO12
+
+def load_compiled_config(path):
+    """Load a compiled config with readinto into a buffer allocated once at the file size"""
+    try:
+        size = os.stat(path)[6]
+        buffer = bytearray(size)
+        stats.note_sd_read()
+        event_trace.begin(event_trace.SD_READ)
+        with open(path, "rb") as f:
+            if f.readinto(buffer) != size:
+                raise OSError("short read")
+        event_trace.end(event_trace.SD_READ)
+        return binconfig.BinaryConfig(buffer)
+    except Exception as e:
+        print(f"Could not load compiled config {path}: {e}")
+        return None
+
+def save_compiled_config(path, compiled):
+    event_trace.begin(event_trace.SD_WRITE)
+    with open(path, "wb") as f:
+        f.write(compiled)
+    event_trace.end(event_trace.SD_WRITE)
+
+# Rotary encoders come from the settings.toml hardware profile (see encoders)
+# Default wiring: Rotary A: A->IO10, B->IO11, Press->IO7 / Rotary B: A->IO1, B->IO3, Press->IO33
+
+# Buttons are scanned in the background by keypad, the main loop only sees press/release events
+key_scanner.start()
+# Press/release/repeat state per button, by key number
+button_keys = [held_keys.HeldKey() for _ in range(key_scanner.key_count)]
+# Key numbers with a pending hold / double tap / repeat, polled until they go idle
+active_buttons = held_keys.ActiveKeys(len(button_keys))
+
+# Encoder press buttons come from a second keypad scanner, by its key number
+encoders.load_profile()
+encoders.start()
+knob_keys = [held_keys.HeldKey() for _ in encoders.press_knob]
+active_knobs = held_keys.ActiveKeys(len(knob_keys))
 
 # Mapping von Strings zu HID-Keycodes
 key_mapping = {
@@ -271,6 +304,14 @@ key_mapping = {
     "MENU KEY": KeycodeDE.APPLICATION,
 }
 
+# One-key tuples for nkro_keyboard.tap, built once so a special key press allocates nothing
+key_taps = {name: (keycode,) for name, keycode in key_mapping.items()}
+UP_ARROW_TAP = (KeycodeDE.UP_ARROW,)
+DOWN_ARROW_TAP = (KeycodeDE.DOWN_ARROW,)
+LEFT_ARROW_TAP = (KeycodeDE.LEFT_ARROW,)
+RIGHT_ARROW_TAP = (KeycodeDE.RIGHT_ARROW,)
+ENTER_TAP = (KeycodeDE.ENTER,)
+
 # Volume Control Mapping
 volume_mapping = {
     "Volume Up": ConsumerControlCode.VOLUME_INCREMENT,
@@ -282,37 +323,83 @@ volume_mapping = {
     "Stop": ConsumerControlCode.STOP,
 }
 
+def parse_key_combo(key_combo_string):
+    """HID keycodes of a combo string like 'Ctrl+C' (ValueError for unknown keys)"""
+    # Parse the key combination (e.g., "Ctrl+C" -> ["Ctrl", "C"])
+    keycodes = []
+    for key in key_combo_string.split('+'):
+        key_upper = key.strip().upper()
+        if not key_upper:
+            continue
+        if key_upper not in key_mapping:
+            raise ValueError(f"Unknown key in combo: {key}")
+        keycodes.append(key_mapping[key_upper])
+    return keycodes
+
+
 # === Display Setup ===
 display = None
 layer_text = None
 splash = None
+# Layer number or message on the display - the periodic refresh skips re-rendering the same
+# content, which would rebuild the label's glyphs (and allocate) every time
+display_shown = None
 
-try:
-    print("CODE.PY: Initializing display...")
-    displayio.release_displays()
-    i2c = board.I2C()
-    display_bus = displayio.I2CDisplay(i2c, device_address=0x3C)
-    WIDTH = 128
-    HEIGHT = 32
-    display = adafruit_displayio_ssd1306.SSD1306(display_bus, width=WIDTH, height=HEIGHT)
-    splash = displayio.Group()
-    display.root_group = splash
-    layer_text = label.Label(terminalio.FONT, text="Layer: 1", color=0xFFFFFF, x=10, y=20, scale=2)
-    splash.append(layer_text)
-    print("CODE.PY: Display initialized successfully")
-except Exception as e:
-    print(f"CODE.PY: ERROR - Display initialization failed: {e}")
-    print("CODE.PY: Continuing without display...")
-    display = None
-    layer_text = None
-    splash = None
+def init_display():
+    """Bring up the OLED - deferred until the main loop runs so it doesn't delay the keys"""
+    global display, layer_text, splash, display_shown
+    try:
+        print("CODE.PY: Initializing display...")
+        import displayio
+        import terminalio
+        from adafruit_display_text import label
+        import adafruit_displayio_ssd1306
+        displayio.release_displays()
+        i2c = board.I2C()
+        display_bus = displayio.I2CDisplay(i2c, device_address=0x3C)
+        WIDTH = 128
+        HEIGHT = 32
+        display = adafruit_displayio_ssd1306.SSD1306(display_bus, width=WIDTH, height=HEIGHT)
+        splash = displayio.Group()
+        display.root_group = splash
+        layer_text = label.Label(terminalio.FONT, text=f"Layer: {layer_stack.top(current_layer)}", color=0xFFFFFF, x=10, y=20, scale=2)
+        splash.append(layer_text)
+        print("CODE.PY: Display initialized successfully")
+    except Exception as e:
+        print(f"CODE.PY: ERROR - Display initialization failed: {e}")
+        print("CODE.PY: Continuing without display...")
+        display = None
+        layer_text = None
+        splash = None
+        return
+
+    # Show the loaded settings
+    try:
+        update_display_mode()
+    except Exception as e:
+        print(f"Error initializing display: {e}")
+        # Fallback to basic layer display
+        try:
+            layer_text.text = f"Layer: {layer_stack.top(current_layer)}"
+            display_shown = None
+            print("Fallback display set")
+        except Exception as e2:
+            print(f"Fallback display error: {e2}")
+    boot_profile.mark("display")
 
 # Display helper functions
 def update_display_layer(layer):
+    global display_shown
     try:
         if layer_text is not None and display is not None:
+            if display_shown == layer:
+                return
+            event_trace.begin(event_trace.DISPLAY)
             layer_text.text = f"Layer: {layer}"
-            print(f"Display: Layer {layer}")
+            event_trace.end(event_trace.DISPLAY)
+            display_shown = layer
+            if log_events:
+                print(f"Display: Layer {layer}")
         else:
             print(f"Display not available - would show layer: {layer}")
     except Exception as e:
@@ -326,10 +413,17 @@ def update_display_layer(layer):
 
 def update_display_message(message):
     """Update display with a temporary message"""
+    global display_shown
     try:
         if layer_text is not None and display is not None:
+            if display_shown == message:
+                return
+            event_trace.begin(event_trace.DISPLAY)
             layer_text.text = message
-            print(f"Display message: {message}")
+            event_trace.end(event_trace.DISPLAY)
+            display_shown = message
+            if log_events:
+                print(f"Display message: {message}")
         else:
             print(f"Display not available - would show: {message}")
     except Exception as e:
@@ -360,7 +454,7 @@ def check_display_health():
 
 def update_display_mode():
     """Update display based on current display mode"""
-    global display_enabled, uploading
+    global display_enabled, uploading, display_shown
 
     try:
         # Don't update display during upload to avoid "Layer: xyz" spam
@@ -375,20 +469,17 @@ def update_display_mode():
 
         if not display_enabled or display_mode == "off":
             # Turn off display
-            if layer_text is not None:
-                layer_text.text = ""
-            print("Display: OFF")
+            update_display_message("")
             return
 
         if display_mode == "layer":
-            update_display_layer(current_layer)
+            update_display_layer(layer_stack.top(current_layer))
         elif display_mode == "battery":
             try:
                 # Check if feathers3 module is available
                 if 'feathers3' in globals():
                     battery_info = feathers3.get_battery_status()
                     battery_percent = battery_info['percentage']
-                    print(f"Display: Battery {battery_percent}%")
                     update_display_message(f"{battery_percent}%")
                 else:
                     print("feathers3 module not available")
@@ -401,75 +492,86 @@ def update_display_mode():
                 # Use system time from desktop app if available, otherwise use local time
                 if system_time:
                     time_str = system_time
-                    print(f"Display: System Time {time_str}")
                 else:
                     current_time = time.localtime()
                     time_str = f"{current_time.tm_hour:02d}:{current_time.tm_min:02d}"
-                    print(f"Display: Local Time {time_str}")
                 update_display_message(time_str)
             except Exception as e:
                 print(f"Time error: {e}")
                 update_display_message("Time: ?")
         else:
             print(f"Unknown display mode: {display_mode}, defaulting to layer")
-            update_display_layer(current_layer)
+            update_display_layer(layer_stack.top(current_layer))
 
     except Exception as e:
         print(f"Error in update_display_mode: {e}")
         # Fallback to layer display
         try:
-            update_display_layer(current_layer)
+            update_display_layer(layer_stack.top(current_layer))
         except Exception as e2:
             print(f"Fallback error: {e2}")
             if layer_text is not None:
                 layer_text.text = "Error"
+                display_shown = None
 
-# The keyboard object!
-time.sleep(1)  # Sleep for a bit to avoid a race condition on some systems
-keyboard = Keyboard(usb_hid.devices)
-keyboard_layout = KeyboardLayoutWinDE(keyboard)  # We're in DE :)
+# The keyboard and consumer control objects are created at the very top of this file
 
-# Consumer control for volume/media keys
-consumer_control = ConsumerControl(usb_hid.devices)
+def release_input_pins():
+    """Free all button and encoder pins so they can be used as wake alarms"""
+    key_scanner.stop()
+    encoders.stop()
 
-# All button pins are already initialized above with individual DigitalInOut objects
+def claim_input_pins():
+    """Recreate the button and encoder objects after light sleep"""
+    key_scanner.start()
+    encoders.start()
 
-# Initialize rotary encoders
-# Rotary A encoder: A->IO10, B->IO11
-# Using divisor=4 for encoders with 1 detent per cycle (most common)
-# divisor options: 1=no detents or 4 detents/cycle, 2=2 detents/cycle, 4=1 detent/cycle
-try:
-    rotary_a = rotaryio.IncrementalEncoder(rotary_a_pins[0], rotary_a_pins[1], divisor=4)
-    rotary_a_last_position = 0
-    print("CODE.PY: Rotary A encoder initialized successfully")
-except Exception as e:
-    print(f"CODE.PY: Failed to initialize Rotary A encoder: {e}")
-    rotary_a = None
-    rotary_a_last_position = 0
-
-# Rotary B encoder: A->IO1, B->IO3
-try:
-    rotary_b = rotaryio.IncrementalEncoder(rotary_b_pins[0], rotary_b_pins[1], divisor=4)
-    rotary_b_last_position = 0
-    print("CODE.PY: Rotary B encoder initialized successfully")
-except Exception as e:
-    print(f"CODE.PY: Failed to initialize Rotary B encoder: {e}")
-    rotary_b = None
-    rotary_b_last_position = 0
+def enter_light_sleep():
+    """Light sleep until any button, encoder press or encoder turn pulls its pin low
+    (encoder channels resting low on their detent are left out, see encoders.wake_pins())"""
+    import alarm
+    release_input_pins()
+    try:
+        wake_pins = key_scanner.wake_pins() + encoders.wake_pins()
+        alarms = [alarm.pin.PinAlarm(pin, value=False, pull=True) for pin in wake_pins]
+        print("Power: entering light sleep")
+        alarm.light_sleep_until_alarms(*alarms)
+        print("Power: woke up from light sleep")
+    except Exception as e:
+        print(f"Light sleep failed: {e}")
+    finally:
+        claim_input_pins()
+
+def display_sleep():
+    try:
+        if display is not None:
+            display.sleep()
+    except Exception as e:
+        print(f"Display sleep failed: {e}")
+
+def display_wake():
+    try:
+        if display is not None:
+            display.wake()
+            update_display_mode()
+    except Exception as e:
+        print(f"Display wake failed: {e}")
 
-# Rotary encoder button pins are already initialized above
+power.set_hooks(display_sleep=display_sleep, display_wake=display_wake, light_sleep=enter_light_sleep)
 
 # Define current_layer before using it
 current_layer = 1  # The current layer we're working with
 
-def update_config_limits(config_data):
+def update_config_limits(config):
     """Update dynamic limits and settings based on configuration"""
     global max_layers, max_buttons, display_mode, display_enabled, current_layer
 
     try:
+        settings = config.settings
+
         # Update display settings
-        if "display" in config_data:
-            display_config = config_data["display"]
+        if "display" in settings:
+            display_config = settings["display"]
             if "mode" in display_config:
                 display_mode = display_config["mode"]
                 print(f"Loaded display mode from config: {display_mode}")
@@ -480,33 +582,43 @@ def update_config_limits(config_data):
         else:
             print("No display settings found in config, using defaults")
 
+        # Update idle power management settings
+        if "power" in settings:
+            power.configure(settings["power"])
+
+        # Update text macro pacing
+        if "typing" in settings:
+            typing_engine.configure(settings["typing"])
+
+        # Update mouse-wheel scrolling
+        if "scroll" in settings:
+            wheel_mouse.configure(settings["scroll"])
+
+        # Update hold-to-repeat timing
+        if "repeat" in settings:
+            held_keys.configure(settings["repeat"])
+
+        # Update tap / hold / double-tap timing
+        if "tapHold" in settings:
+            held_keys.configure_tap_hold(settings["tapHold"])
+
+        # Update encoder divisor / direction / scale (knobs not listed go back to the hardware profile)
+        encoders.configure(settings.get("encoders"))
+
         # Update current layer
-        if "currentLayer" in config_data:
-            current_layer = config_data["currentLayer"]
+        if "currentLayer" in settings:
+            current_layer = settings["currentLayer"]
             print(f"Updated current layer to: {current_layer}")
 
         # Update layer limits from actual layers
-        if "layers" in config_data:
-            if isinstance(config_data["layers"], list):
-                max_layers = len(config_data["layers"])  # Dynamic based on actual layers
-                # Find max buttons from all layers
-                max_buttons = 0
-                for layer in config_data["layers"]:
-                    if "buttons" in layer:
-                        max_buttons = max(max_buttons, len(layer["buttons"]))
-                    elif "keys" in layer:
-                        max_buttons = max(max_buttons, len(layer["keys"]))
-            elif isinstance(config_data["layers"], dict):
-                max_layers = len(config_data["layers"])  # Dynamic based on actual layers
-                # Find max buttons from all layers
-                max_buttons = 0
-                for layer_key, layer in config_data["layers"].items():
-                    if "keys" in layer:
-                        max_buttons = max(max_buttons, len(layer["keys"]))
+        max_layers = config.layer_count  # Dynamic based on actual layers
+        max_buttons = config.buttons_per_layer
+        if max_buttons > key_scanner.key_count:
+            print(f"Warning: config has {max_buttons} buttons, the key scanner only {key_scanner.key_count}")
 
         # Update limits from config if available
-        if "limits" in config_data:
-            limits = config_data["limits"]
+        if "limits" in settings:
+            limits = settings["limits"]
             if "maxLayers" in limits:
                 max_layers = limits["maxLayers"]
             if "maxButtons" in limits:
@@ -520,18 +632,18 @@ def update_config_limits(config_data):
         print(f"Current layer: {current_layer}")
 
         # Process knob configurations for current layer
-        if "layers" in config_data and isinstance(config_data["layers"], list):
-            layer_index = current_layer - 1
-            if 0 <= layer_index < len(config_data["layers"]):
-                layer = config_data["layers"][layer_index]
-                if "knobs" in layer:
-                    print(f"Processing knob configurations for layer {current_layer}:")
-                    for knob_letter, knob_config in layer["knobs"].items():
-                        print(f"  Knob {knob_letter}: CCW='{knob_config.get('ccwAction', 'None')}', CW='{knob_config.get('cwAction', 'None')}', Press='{knob_config.get('pressAction', 'None')}'")
-                else:
-                    print("No knob configurations found in current layer")
+        layer_index = current_layer - 1
+        if 0 <= layer_index < config.layer_count:
+            if config.knobs_per_layer:
+                print(f"Processing knob configurations for layer {current_layer}:")
+                for knob_index in range(config.knobs_per_layer):
+                    names = [binconfig.ACTION_NAMES[config.binding_raw(layer_index, config.knob_slot(knob_index, which))[0]]
+                             for which in (binconfig.SLOT_CCW, binconfig.SLOT_CW, binconfig.SLOT_PRESS)]
+                    print(f"  Knob {binconfig.KNOB_LETTERS[knob_index]}: CCW='{names[0]}', CW='{names[1]}', Press='{names[2]}'")
             else:
-                print(f"Invalid layer index: {layer_index}")
+                print("No knob configurations found in current layer")
+        else:
+            print(f"Invalid layer index: {layer_index}")
 
         # Update display after loading config
         print("Applying display settings from config...")  # Debug: Show display update
@@ -542,46 +654,268 @@ def update_config_limits(config_data):
         print(f"Error updating config limits: {e}")
         # Keep defaults if there's an error
 
-# Initialize keys - SD card is required
-if not sd_available:
-    print("FATAL ERROR: SD storage is required for operation!")
-    print("Please SD SPI storage to the FeatherS3")
-    # Don't initialize anything - SD card is required
-else:
-    keys_pressed = read_json_file(file_path, current_layer)
-
-    # Try to load and update config limits from existing file
+# Active configuration, kept in RAM as a compiled binconfig.BinaryConfig
+active_config = None
+# Pre-encoded HID reports of every "Type Text" binding (typing_engine.prepare), keyed by the text
+text_macros = {}
+# Keycode tuples of every "Key Combo" binding, keyed by the combo string
+key_combos = {}
+# Compiled steps of every "Macro" binding, keyed by binding source
+macros = {}
+# Hold / double-tap actions of multi-function keys, keyed by binding source
+key_variants = {}
+# Knob bindings of the active layers, see compile_knob_bindings
+knob_bindings = []
+# (binding, variants) per button / knob press button of the active layers, see compile_press_tables
+button_presses = []
+knob_presses = []
+NO_PRESS = (None, None)
+
+# Source offsets of the hold / double-tap action of a binding (keeps their jobs apart from the tap's)
+SOURCE_HOLD = 0x10000
+SOURCE_DOUBLE_TAP = 0x20000
+
+def binding_source(config, layer_index, slot):
+    """Number identifying one binding - lets a second press find the job the first one started"""
+    return layer_index * config.slots_per_layer + slot
+
+def compile_text_macros(config):
+    """Encode the text of all Type Text bindings (buttons and knobs, all layers) into HID reports"""
+    macros = {}
+    for layer_index in range(config.layer_count):
+        for slot in range(config.slots_per_layer):
+            opcode, _, arg_off, arg_len, _, _ = config.binding_raw(layer_index, slot)
+            if opcode != binconfig.OP_TYPE_TEXT or not arg_len:
+                continue
+            text = config.string(arg_off, arg_len)
+            if text in macros:
+                continue
+            reports = text_reports.encode(keyboard_layout, text)
+            if reports is None:
+                print(f"Text macro {text!r} cannot be pre-encoded - typing it character by character")
+            else:
+                reports = typing_engine.prepare(reports)
+            macros[text] = reports
+    return macros
+
+def compile_key_combo(combos, key):
+    """Add the keycode tuple of combo string `key` to `combos` (unknown keys are reported on press)"""
+    if key in combos:
+        return
     try:
-        print(f"Loading config from: {file_path}")
-        with open(file_path, "r") as f:
-            config_data = json.load(f)
-            print(f"Config loaded successfully: {config_data}")
-            update_config_limits(config_data)
-    except Exception as e:
-        print(f"Could not load config limits: {e}")
-        print("Using default settings")
-
-# Initialize display after loading config
-print("Initializing display with loaded settings...")
-try:
-    update_display_mode()
-    print("Display initialized successfully")
-except Exception as e:
-    print(f"Error initializing display: {e}")
-    # Fallback to basic layer display
+        keycodes = tuple(parse_key_combo(key))
+    except ValueError as e:
+        print(f"Key combo {key!r} ignored: {e}")
+        return
+    if keycodes:
+        combos[key] = keycodes
+
+def compile_key_combos(config):
+    """Parse the combo string of all Key Combo bindings once instead of on every press"""
+    combos = {}
+    for layer_index in range(config.layer_count):
+        for slot in range(config.slots_per_layer):
+            opcode, _, arg_off, arg_len, _, _ = config.binding_raw(layer_index, slot)
+            if opcode == binconfig.OP_KEY_COMBO and arg_len:
+                compile_key_combo(combos, config.string(arg_off, arg_len))
+    return combos
+
+def resolve_consumer_code(name):
+    """Consumer control code of a volume_mapping name or a plain number"""
+    if name in volume_mapping:
+        return volume_mapping[name]
     try:
-        layer_text.text = f"Layer: {current_layer}"
-        print("Fallback display set")
-    except Exception as e2:
-        print(f"Fallback display error: {e2}")
+        return int(name)
+    except (TypeError, ValueError):
+        raise ValueError(f"Unknown consumer control: {name}")
+
+def encode_macro_text(text):
+    reports = text_reports.encode(keyboard_layout, text)
+    return typing_engine.prepare(reports) if reports is not None else None
+
+def compile_macros(config):
+    """Compile the steps of all Macro bindings, keyed by binding source"""
+    macros = {}
+    for layer_index in range(config.layer_count):
+        for slot in range(config.slots_per_layer):
+            if config.binding_raw(layer_index, slot)[0] != binconfig.OP_MACRO:
+                continue
+            _, _, key, extras = config.binding(layer_index, slot)
+            try:
+                macros[binding_source(config, layer_index, slot)] = compile_macro(key, extras)
+            except (ValueError, TypeError, AttributeError) as e:
+                print(f"Macro in layer {layer_index + 1}, slot {slot + 1} ignored: {e}")
+    return macros
+
+def compile_macro(key, extras):
+    """Compiled steps of one Macro binding ("steps" list in the extras or the compact key form)"""
+    steps = extras.get("steps") if extras else None
+    if steps is None:
+        steps = macro_engine.parse_steps(key)
+    return macro_engine.compile_steps(steps, parse_key_combo, resolve_consumer_code, encode_macro_text)
+
+def compile_variant(spec, source):
+    """Binding tuple of a "hold" / "doubleTap" entry ({"action": ..., "key": ..., ...}), None if empty.
+    Its text and macro steps are compiled into text_macros / macros like those of normal bindings."""
+    if not isinstance(spec, dict):
+        return None
+    opcode = binconfig.action_opcode(spec.get("action"))
+    if opcode == binconfig.OP_NONE:
+        return None
+    key = spec.get("key") or ""
+    extras = {name: value for name, value in spec.items() if name not in binconfig.BUTTON_KEYS} or None
+    if opcode == binconfig.OP_TYPE_TEXT and key not in text_macros:
+        text_macros[key] = encode_macro_text(key)
+    elif opcode == binconfig.OP_KEY_COMBO and key:
+        compile_key_combo(key_combos, key)
+    elif opcode == binconfig.OP_MACRO:
+        macros[source] = compile_macro(key, extras)
+    return (opcode, key, extras, source)
+
+def compile_key_variants(config):
+    """Hold / double-tap actions of all bindings that have them, keyed by binding source.
+    Each entry is (hold binding, double-tap binding, hold ms, double-tap ms) for held_keys.HeldKey."""
+    variants = {}
+    for layer_index in range(config.layer_count):
+        for slot in range(config.slots_per_layer):
+            if not config.binding_raw(layer_index, slot)[5]:
+                continue
+            extras = config.binding(layer_index, slot)[3]
+            if not extras or not ("hold" in extras or "doubleTap" in extras):
+                continue
+            source = binding_source(config, layer_index, slot)
+            try:
+                hold = compile_variant(extras.get("hold"), source + SOURCE_HOLD)
+                double_tap = compile_variant(extras.get("doubleTap"), source + SOURCE_DOUBLE_TAP)
+                if hold is None and double_tap is None:
+                    continue
+                variants[source] = (hold, double_tap,
+                                    int(extras.get("holdTime", held_keys.hold_time_ms)),
+                                    int(extras.get("doubleTapTime", held_keys.double_tap_time_ms)))
+            except (ValueError, TypeError, AttributeError) as e:
+                print(f"Hold/double tap in layer {layer_index + 1}, slot {slot + 1} ignored: {e}")
+    return variants
+
+def compile_knob_bindings(config):
+    """(opcode, key, extras, source) or None per knob slot (knob index * 3 + ccw/cw/press),
+    each from the layer serving it - rebuilt when the layers change, read on every detent"""
+    bindings = []
+    if config is None or not 0 <= current_layer - 1 < config.layer_count:
+        return bindings
+    for knob_index in range(config.knobs_per_layer):
+        for which in (binconfig.SLOT_CCW, binconfig.SLOT_CW, binconfig.SLOT_PRESS):
+            slot = config.knob_slot(knob_index, which)
+            layer_index = layer_stack.layer_of(slot, current_layer - 1)
+            opcode, _, key, extras = config.binding(layer_index, slot)
+            if opcode in (binconfig.OP_NONE, binconfig.OP_TRANSPARENT):
+                bindings.append(None)
+            else:
+                bindings.append((opcode, key, extras, binding_source(config, layer_index, slot)))
+    return bindings
+
+def get_knob_binding(knob_index, which):
+    """(opcode, key, extras, source) of a knob slot in the active layers, or None"""
+    i = knob_index * 3 + which
+    return knob_bindings[i] if i < len(knob_bindings) else None
+
+def compile_press_tables(config):
+    """(binding, hold/double-tap variants) for held_keys.HeldKey.press per button and per knob
+    press button of the active layers, NO_PRESS where nothing happens. Rebuilt with the layers,
+    so a press is one list lookup instead of decoding its binding from the config."""
+    global button_presses, knob_presses
+    button_presses = []
+    knob_presses = []
+    if config is None or not 0 <= current_layer - 1 < config.layer_count:
+        return
+    for button_index in range(min(len(keys_pressed), config.buttons_per_layer)):
+        if not keys_pressed[button_index]:
+            button_presses.append(NO_PRESS)
+            continue
+        slot = config.button_slot(button_index)
+        layer_index = layer_stack.layer_of(slot, current_layer - 1)
+        opcode, enabled, key_value, extras = config.binding(layer_index, slot)
+        source = binding_source(config, layer_index, slot)
+        variants = key_variants.get(source)
+        if not enabled or (opcode == binconfig.OP_NONE and variants is None):
+            button_presses.append(NO_PRESS)
+            continue
+        binding = (opcode, key_value, extras, source) if opcode != binconfig.OP_NONE else None
+        button_presses.append((binding, variants))
+    for knob_index in range(config.knobs_per_layer):
+        binding = get_knob_binding(knob_index, binconfig.SLOT_PRESS)
+        knob_presses.append(NO_PRESS if binding is None else (binding, key_variants.get(binding[3])))
+
+def set_active_config(config):
+    """Make the compiled `config` the running configuration and reload the keys of the current layer"""
+    global active_config, keys_pressed, text_macros, key_combos, macros, key_variants, knob_bindings
+    mem_monitor.begin("config")
+    active_config = config
+    update_config_limits(active_config)
+    # Layers of the old config may be gone - start from the base layer again
+    layer_stack.clear()
+    layer_stack.resolve(active_config, current_layer)
+    keys_pressed = get_layer_keys(active_config, current_layer)
+    knob_bindings = compile_knob_bindings(active_config)
+    text_macros = compile_text_macros(active_config)
+    key_combos = compile_key_combos(active_config)
+    macros = compile_macros(active_config)
+    key_variants = compile_key_variants(active_config)
+    compile_press_tables(active_config)
+    mem_monitor.end("config")
+
+def compile_and_store(json_object):
+    """Compile an uploaded/loaded JSON config, mirror it into NVM and onto the SD card.
+    Returns (compiled config, stored in NVM, stored on SD)."""
+    compiled = binconfig.compile_config(json_object)
+    print(f"Compiled config: {len(compiled)} bytes")
+    cached = config_cache.save(compiled)
+    saved = False
+    if sd_available:
+        try:
+            save_compiled_config(compiled_path, compiled)
+            saved = True
+        except Exception as e:
+            print(f"Could not save compiled config to SD: {e}")
+    return binconfig.BinaryConfig(compiled), cached, saved
+
+# Initialize keys - boot from the NVM cache first, the SD card is only needed without a cache
+keys_pressed = []
+boot_config = config_cache.load()
+if boot_config is not None:
+    print("Config loaded from NVM cache")
+elif mount_sd():
+    boot_config = load_compiled_config(compiled_path)
+    if boot_config is not None:
+        print(f"Config loaded from {compiled_path}")
+        config_cache.save(boot_config.buffer)
+    else:
+        # First boot with this firmware - compile the JSON once
+        print(f"Loading config from: {file_path}")
+        config_data = load_full_config(file_path)
+        if config_data:
+            try:
+                boot_config = compile_and_store(config_data)[0]
+            except Exception as e:
+                print(f"Could not compile config: {e}")
+        else:
+            print("Could not load config - using default settings")
+        config_data = None
+else:
+    print("No config cache and no SD card - waiting for a config upload")
+if boot_config is not None:
+    set_active_config(boot_config)
+boot_config = None
+boot_profile.mark("config")
 
 control_key = KeycodeDE.SHIFT
 
 def save_json_string_to_file(json_string, file_path):
     try:
         json_object = json.loads(json_string)
+        event_trace.begin(event_trace.SD_WRITE)
         with open(file_path, "w") as f:
             json.dump(json_object, f)
+        event_trace.end(event_trace.SD_WRITE)
         print("JSON erfolgreich gespeichert")
         return True
     except Exception as e:
@@ -611,310 +945,502 @@ def set_display_mode(mode, enabled=True):
     print(f"Display mode set to: {mode}, enabled: {enabled}")
     update_display_mode()
 
-def handle_rotary_press(knob_letter):
-    """Handle rotary encoder press action"""
-    try:
-        # Get full configuration
-        config = load_full_config(file_path)
-        if not config:
-            print(f"No config available for knob {knob_letter} press")
-            return
-
-        # Find knob configuration in current layer
-        if "layers" in config and isinstance(config["layers"], list):
-            layer_index = current_layer - 1
-            if 0 <= layer_index < len(config["layers"]):
-                layer = config["layers"][layer_index]
-                if "knobs" in layer and knob_letter in layer["knobs"]:
-                    knob_config = layer["knobs"][knob_letter]
-                    press_action = knob_config.get("pressAction", "None")
-                    press_key = knob_config.get("pressKey", "")
-                    print(f"Knob {knob_letter} press action: {press_action}, key: {press_key}")
-                    execute_knob_action(press_action, press_key)
-                else:
-                    print(f"No knob {knob_letter} configuration found")
-            else:
-                print(f"Invalid layer index: {layer_index}")
-        else:
-            print("No layers configuration found")
-    except Exception as e:
-        print(f"Error handling rotary press: {e}")
-
-def handle_rotary_rotation(knob_letter, direction):
-    """Handle rotary encoder rotation (clockwise/counter-clockwise)"""
-    try:
-        # Get full configuration
-        config = load_full_config(file_path)
-        if not config:
-            print(f"No config available for knob {knob_letter} rotation")
-            return
-
-        # Find knob configuration in current layer
-        if "layers" in config and isinstance(config["layers"], list):
-            layer_index = current_layer - 1
-            if 0 <= layer_index < len(config["layers"]):
-                layer = config["layers"][layer_index]
-                if "knobs" in layer and knob_letter in layer["knobs"]:
-                    knob_config = layer["knobs"][knob_letter]
-                    action = knob_config.get("cwAction" if direction == "cw" else "ccwAction", "None")
-                    print(f"Knob {knob_letter} {direction} action: {action}")
-                    execute_knob_action(action)
-                else:
-                    print(f"No knob {knob_letter} configuration found")
-            else:
-                print(f"Invalid layer index: {layer_index}")
-        else:
-            print("No layers configuration found")
-    except Exception as e:
-        print(f"Error handling rotary rotation: {e}")
+def rotary_press_binding(key_number):
+    """(binding, hold/double-tap variants) of an encoder press button for held_keys.HeldKey.press"""
+    knob_index = encoders.press_knob[key_number]
+    if knob_index >= len(knob_presses):
+        return NO_PRESS
+    press = knob_presses[knob_index]
+    if log_events and press[0] is not None:
+        opcode, press_key, _, _ = press[0]
+        print(f"Knob {binconfig.KNOB_LETTERS[knob_index]} press action: {binconfig.ACTION_NAMES[opcode]}, key: {press_key}")
+    return press
+
+def handle_rotary_rotation(knob_index, steps):
+    """Handle rotary encoder rotation by `steps` detents (positive = clockwise)"""
+    event_trace.instant(event_trace.KNOB, knob_index << 8 | steps & 0xFF)
+    power.note_activity()
+    binding = get_knob_binding(knob_index, binconfig.SLOT_CW if steps > 0 else binconfig.SLOT_CCW)
+    if steps < 0:
+        steps = -steps
+    if binding is None:
+        return
+    mem_monitor.begin("rotation")
+    opcode, key_value, extras, source = binding
+    if log_events:
+        print(f"Knob {binconfig.KNOB_LETTERS[knob_index]} action: {binconfig.ACTION_NAMES[opcode]} x{steps}")
+    # Step-wise actions follow every detent of a fast turn, the rest runs once
+    if opcode not in binconfig.REPEATABLE_OPCODES:
+        steps = 1
+    for _ in range(steps):
+        execute_action(opcode, key_value, extras, source)
+    mem_monitor.end("rotation")
 
 def load_config():
-    """Load configuration from JSON file"""
-    try:
-        with open(file_path, "r") as f:
-            config = json.load(f)
-            return config
-    except Exception as e:
-        print(f"Error loading config: {e}")
-        return None
+    """Return the active configuration (held in RAM - no SD access per event)"""
+    return active_config
+
+def read_config_text():
+    """Config JSON for the host: the file on SD if available, otherwise the active config"""
+    if sd_available:
+        try:
+            stats.note_sd_read()
+            event_trace.begin(event_trace.SD_READ)
+            with open(file_path, "r") as f:
+                text = f.read()
+            event_trace.end(event_trace.SD_READ)
+            return text
+        except Exception as e:
+            print(f"Could not read config from SD: {e}")
+    if active_config is None:
+        raise OSError("no configuration available")
+    return json.dumps(active_config.to_dict())
 
 def switch_to_layer(target_layer):
     """Switch to specified layer"""
-    global current_layer, keys_pressed
+    global current_layer
     try:
         if 1 <= target_layer <= max_layers:
             current_layer = target_layer
-            print(f"Switched to layer {current_layer}")
-            update_display_mode()
-            # Reload button configuration for new layer
-            keys_pressed = read_json_file(file_path, current_layer)
+            if log_events:
+                print(f"Switched to layer {current_layer}")
+            apply_layers()
         else:
             print(f"Invalid layer: {target_layer} (max: {max_layers})")
     except Exception as e:
         print(f"Error switching to layer {target_layer}: {e}")
 
+def apply_layers():
+    """Re-resolve the serving layer of every binding after the base layer or the layer stack changed"""
+    global keys_pressed, knob_bindings
+    mem_monitor.begin("layers")
+    layer_stack.resolve(active_config, current_layer)
+    update_display_mode()
+    # Reload button and knob configuration for the new layers
+    keys_pressed = get_layer_keys(active_config, current_layer)
+    knob_bindings = compile_knob_bindings(active_config)
+    compile_press_tables(active_config)
+    mem_monitor.end("layers")
+
+def release_momentary_layer(source):
+    """Drop the momentary layer the binding `source` pushed, once its key is up"""
+    if layer_stack.release(source):
+        if log_events:
+            print("Momentary layer released")
+        apply_layers()
+
 def execute_key_combo(key_combo_string):
     """Execute key combination from string like 'Ctrl+C' or 'Alt+Tab'"""
     try:
         if not key_combo_string:
             print("Empty key combo string")
             return
-            
-        # Parse the key combination (e.g., "Ctrl+C" -> ["Ctrl", "C"])
-        keys = [k.strip() for k in key_combo_string.split('+') if k.strip()]
-        
-        if not keys:
+
+        # Keycodes compiled at config load, strings from elsewhere are parsed now
+        keycodes = key_combos.get(key_combo_string)
+        if keycodes is None:
+            try:
+                keycodes = tuple(parse_key_combo(key_combo_string))
+            except ValueError as e:
+                print(e)
+                return
+        if not keycodes:
             print("No valid keys in combo")
             return
-            
-        print(f"Executing key combo: {key_combo_string} -> {keys}")
-        
-        # Convert string keys to HID keycodes
-        keycodes = []
-        for key in keys:
-            key_upper = key.upper()
-            if key_upper in key_mapping:
-                keycodes.append(key_mapping[key_upper])
-            else:
-                print(f"Unknown key in combo: {key}")
-                print(key_upper)
-                return
-        
+
         # Press all keys simultaneously
-        if keycodes:
-            keyboard.press(*keycodes)
-            keyboard.release_all()
-            print(f"Executed combo: {keycodes}")
+        nkro_keyboard.tap(keyboard, keycodes)
+        if log_events:
+            print(f"Executed combo: {key_combo_string} -> {keycodes}")
         
     except Exception as e:
         print(f"Error executing key combo '{key_combo_string}': {e}")
 
-def execute_button_action(button_id, key):
-    """Execute button action based on configuration"""
-    try:
-        # Load current button configuration
-        config = load_config()
-        if not config or "layers" not in config:
-            print("No configuration loaded")
-            return
-            
-        current_layer_config = None
-        for layer in config["layers"]:
-            if layer["id"] == current_layer:
-                current_layer_config = layer
-                break
-                
-        if not current_layer_config or "buttons" not in current_layer_config:
-            print(f"No button configuration for layer {current_layer}")
-            return
-            
-        button_config = current_layer_config["buttons"].get(button_id)
-        if not button_config:
-            print(f"No configuration for button {button_id}")
-            return
-            
-        action = button_config.get("action", "")
-        key_value = button_config.get("key", "")
-        enabled = button_config.get("enabled", True)
-        
-        if not enabled or action == "None":
-            print(f"Button {button_id} is disabled or has no action")
-            return
-            
-        print(f"Executing button {button_id}: {action} - {key_value}")
-        
-        if action == "Type Text":
-            # Type text (old Key Press)
-            if key_value:
-                keyboard_layout.write(key_value)
-                print(f"Typed text: {key_value}")
-                
-        elif action == "Special Key":
-            # Special key press
-            if key_value and key_value in key_mapping:
-                keyboard.press(key_mapping[key_value])
-                keyboard.release_all()
-                print(f"Pressed special key: {key_value}")
-            else:
-                print(f"Unknown special key: {key_value}")
-                
-        elif action == "Key combo":
-            # Key combination
-            execute_key_combo(key_value)
-            
-        elif action == "Volume Control":
-            # Volume/media control
-            if key_value and key_value in volume_mapping:
-                consumer_control.press(volume_mapping[key_value])
-                consumer_control.release()
-                print(f"Volume control: {key_value}")
-            else:
-                print(f"Unknown volume control: {key_value}")
-                
-        elif action == "Layer Switch":
-            # Switch to next layer automatically
-            next_layer = current_layer + 1
-            if next_layer > max_layers:
-                next_layer = 1
-            switch_to_layer(next_layer)
-            print(f"Switched to layer {next_layer}")
-            
-        else:
-            print(f"Unknown button action: {action}")
-            
-    except Exception as e:
-        print(f"Error executing button {button_id} action: {e}")
+# Action handlers - one per binconfig opcode, all take the binding argument string,
+# the binding extras (dict or None) and the binding source number.
+# Keys are released individually (not release_all) so keys held by a running macro stay down.
+def action_none(key_value, extras, source):
+    pass
+
+def action_type_text(key_value, extras, source):
+    if not key_value:
+        return
+    # A second press of the key that is still typing cancels it
+    if source is not None and typing_engine.busy() and typing_engine.owner == source:
+        typing_engine.cancel()
+        return
+    reports = text_macros.get(key_value)
+    if reports is not None:
+        # Typed over the next loop passes, paced per binding or by the "typing" settings
+        typing_engine.start(reports, source, extras.get("reportInterval") if extras else None)
+        if log_events:
+            print(f"Typing text: {key_value}")
+    else:
+        keyboard_layout.write(key_value)
+        if log_events:
+            print(f"Typed text: {key_value}")
+
+def action_special_key(key_value, extras, source):
+    if key_value and key_value in key_taps:
+        nkro_keyboard.tap(keyboard, key_taps[key_value])
+        if log_events:
+            print(f"Pressed special key: {key_value}")
+    else:
+        print(f"Unknown special key: {key_value}")
 
-def execute_knob_action(action, key_value=""):
-    """Execute a knob action"""
-    global current_layer, keys_pressed
-    try:
-        if action == "None" or not action:
-            return
+def action_key_combo(key_value, extras, source):
+    if key_value:
+        execute_key_combo(key_value)
+    else:
+        print("No key combo value provided")
+
+def action_volume_control(key_value, extras, source):
+    # Volume/media control named by the argument
+    if key_value and key_value in volume_mapping:
+        consumer_control.press(volume_mapping[key_value])
+        consumer_control.release()
+        if log_events:
+            print(f"Volume control: {key_value}")
+    else:
+        print(f"Unknown volume control: {key_value}")
+
+def action_layer_switch(key_value, extras, source):
+    # Switch to next layer automatically
+    if max_layers > 1:
+        next_layer = current_layer + 1
+        if next_layer > max_layers:
+            next_layer = 1
+        switch_to_layer(next_layer)
+
+def layer_argument(key_value):
+    """Layer number in the key of a layer stack action"""
+    layer = int(key_value)
+    if not 1 <= layer <= max_layers:
+        raise ValueError(f"no layer {layer} (max: {max_layers})")
+    return layer
+
+def action_layer_momentary(key_value, extras, source):
+    layer = layer_argument(key_value)
+    if layer_stack.push(layer, layer_stack.MOMENTARY, source):
+        if log_events:
+            print(f"Momentary layer {layer}")
+        apply_layers()
+
+def action_layer_toggle(key_value, extras, source):
+    layer = layer_argument(key_value)
+    if layer_stack.toggle(layer, source):
+        if log_events:
+            print(f"Toggled layer {layer}")
+        apply_layers()
+
+def action_layer_oneshot(key_value, extras, source):
+    layer = layer_argument(key_value)
+    if layer_stack.push(layer, layer_stack.ONESHOT, source):
+        if log_events:
+            print(f"One-shot layer {layer}")
+        apply_layers()
+
+def action_volume_up(key_value, extras, source):
+    consumer_control.press(ConsumerControlCode.VOLUME_INCREMENT)
+    consumer_control.release()
+
+def action_volume_down(key_value, extras, source):
+    consumer_control.press(ConsumerControlCode.VOLUME_DECREMENT)
+    consumer_control.release()
+
+# Scrolling goes out as mouse-wheel steps, batched into one report per loop pass.
+# Without a mouse interface (PADAWAN_HID_MOUSE = "none") the arrow keys are used as before.
+def action_scroll_up(key_value, extras, source):
+    if wheel_mouse.available():
+        wheel_mouse.scroll(1)
+    else:
+        nkro_keyboard.tap(keyboard, UP_ARROW_TAP)
 
-        if action == "Increase Volume":
-            consumer_control.press(ConsumerControlCode.VOLUME_INCREMENT)
-            consumer_control.release()
-        elif action == "Decrease Volume":
-            consumer_control.press(ConsumerControlCode.VOLUME_DECREMENT)
-            consumer_control.release()
-        elif action == "Scroll Up":
-            keyboard.press(KeycodeDE.UP_ARROW)
-            keyboard.release_all()
-        elif action == "Scroll Down":
-            keyboard.press(KeycodeDE.DOWN_ARROW)
-            keyboard.release_all()
-        elif action == "Layer Switch" or action == "Switch Layer":
-            # Support both "Layer Switch" (new) and "Switch Layer" (old) for compatibility
-            if max_layers > 1:
-                next_layer = current_layer + 1
-                if next_layer > max_layers:
-                    next_layer = 1
-                switch_to_layer(next_layer)
-                print(f"Switched to layer {next_layer}")
-        elif action == "Type Text":
-            # Type text
-            if key_value:
-                keyboard_layout.write(key_value)
-                print(f"Typed text: {key_value}")
-        elif action == "Special Key":
-            # Special key press
-            if key_value and key_value in key_mapping:
-                keyboard.press(key_mapping[key_value])
-                keyboard.release_all()
-                print(f"Pressed special key: {key_value}")
-            else:
-                print(f"Unknown special key: {key_value}")
-        elif action == "Key combo":
-            # Parse and execute key combination
-            if key_value:
-                execute_key_combo(key_value)
-            else:
-                print("No key combo value provided")
-        elif action == "Key Press":
-            # Legacy support - for now, just send Enter
-            keyboard.press(KeycodeDE.ENTER)
-            keyboard.release_all()
-        else:
-            print(f"Unknown knob action: {action}")
+def action_scroll_down(key_value, extras, source):
+    if wheel_mouse.available():
+        wheel_mouse.scroll(-1)
+    else:
+        nkro_keyboard.tap(keyboard, DOWN_ARROW_TAP)
+
+def action_scroll_left(key_value, extras, source):
+    if wheel_mouse.available():
+        wheel_mouse.pan(-1)
+    else:
+        nkro_keyboard.tap(keyboard, LEFT_ARROW_TAP)
+
+def action_scroll_right(key_value, extras, source):
+    if wheel_mouse.available():
+        wheel_mouse.pan(1)
+    else:
+        nkro_keyboard.tap(keyboard, RIGHT_ARROW_TAP)
+
+def action_key_press(key_value, extras, source):
+    # Legacy support - for now, just send Enter
+    nkro_keyboard.tap(keyboard, ENTER_TAP)
+
+def action_macro(key_value, extras, source):
+    # A second press of a macro that is still playing stops it
+    job = macro_engine.find(source) if source is not None else None
+    if job is not None:
+        macro_engine.stop(job)
+        if log_events:
+            print("Macro stopped")
+        return
+    steps = macros.get(source)
+    if steps:
+        macro_engine.start(steps, source)
+        if log_events:
+            print(f"Macro started ({len(steps)} steps)")
+    elif log_events:
+        print("Macro has no valid steps")
+
+def macro_switch_layer(layer):
+    if layer:
+        switch_to_layer(layer)
+    else:
+        action_layer_switch("", None, None)
+
+# Indexed by opcode - must follow the OP_* numbering in binconfig
+action_handlers = (
+    action_none,            # OP_NONE
+    action_type_text,       # OP_TYPE_TEXT
+    action_special_key,     # OP_SPECIAL_KEY
+    action_key_combo,       # OP_KEY_COMBO
+    action_volume_control,  # OP_VOLUME_CONTROL
+    action_layer_switch,    # OP_LAYER_SWITCH
+    action_volume_up,       # OP_VOLUME_UP
+    action_volume_down,     # OP_VOLUME_DOWN
+    action_scroll_up,       # OP_SCROLL_UP
+    action_scroll_down,     # OP_SCROLL_DOWN
+    action_key_press,       # OP_KEY_PRESS
+    action_scroll_left,     # OP_SCROLL_LEFT
+    action_scroll_right,    # OP_SCROLL_RIGHT
+    action_macro,           # OP_MACRO
+    action_none,            # OP_TRANSPARENT (resolved by layer_stack, never runs)
+    action_layer_momentary, # OP_LAYER_MOMENTARY
+    action_layer_toggle,    # OP_LAYER_TOGGLE
+    action_layer_oneshot,   # OP_LAYER_ONESHOT
+)
+
+macro_engine.set_hooks(keyboard, consumer_control, macro_switch_layer)
+
+def execute_action(opcode, key_value="", extras=None, source=None):
+    """Run the handler of an opcode - shared by buttons and knobs"""
+    event_trace.begin(event_trace.ACTION, opcode)
+    try:
+        action_handlers[opcode](key_value, extras, source)
     except Exception as e:
-        print(f"Error executing knob action '{action}': {e}")
+        print(f"Error executing action '{binconfig.ACTION_NAMES[opcode]}': {e}")
+    event_trace.end(event_trace.ACTION, opcode)
+    # A one-shot layer lasts for exactly one other action
+    if layer_stack.oneshot_pending() and opcode != binconfig.OP_NONE and opcode not in binconfig.LAYER_OPCODES:
+        if layer_stack.consume_oneshot():
+            apply_layers()
+
+def button_binding(button_index):
+    """(binding, hold/double-tap variants) of a button in the active layers for held_keys.HeldKey.press.
+    The binding is (opcode, key, extras, source), None if the button has no action."""
+    if button_index >= len(button_presses):
+        if log_events:
+            print(f"No configuration for button {button_index + 1} in layer {current_layer}")
+        return NO_PRESS
+    press = button_presses[button_index]
+    if log_events:
+        if press is NO_PRESS:
+            print(f"Button {button_index + 1} is disabled or has no action")
+        elif press[0] is not None:
+            print(f"Button {button_index + 1}: {binconfig.ACTION_NAMES[press[0][0]]} - {press[0][1]}")
+    return press
+
+def service_key_events(next_event, keys, active, lookup, now, trace_base=0):
+    """Feed the events of a keypad scanner into `keys` (HeldKey per key number), then poll the
+    keys in `active` (held_keys.ActiveKeys) that still have a hold / double tap / repeat pending.
+    Returns True if there was anything to do."""
+    event = next_event()
+    busy = event is not None or active.count > 0
+    while event is not None:
+        i = event.key_number
+        event_trace.instant(event_trace.KEY_DOWN if event.pressed else event_trace.KEY_UP, trace_base + i)
+        held = keys[i]
+        edge = held.update(event.pressed)
+        if edge == held_keys.PRESSED:
+            stats.note_press(event.timestamp)
+        service_held_key(held, edge, now, lookup, i)
+        active.add(i)
+        event = next_event()
+    j = 0
+    while j < active.count:
+        i = active.keys[j]
+        held = keys[i]
+        if held.idle():
+            active.remove_at(j)
+            continue
+        service_held_key(held, 0, now, lookup, i)
+        j += 1
+    return busy
+
+def service_held_key(held, edge, now, lookup, lookup_arg):
+    """Feed one key edge (0 = no change) into its tap/hold state machine and run what it resolves to.
+    lookup(lookup_arg) provides (binding, variants) on press."""
+    if edge == held_keys.PRESSED:
+        mem_monitor.begin("press")
+        press = lookup(lookup_arg)
+        binding = held.press(press[0], press[1], now)
+    elif edge == held_keys.RELEASED:
+        binding = held.release(now)
+    else:
+        binding = held.poll(now)
+    if edge:
+        power.note_activity(now)
+    if binding is not None:
+        power.note_activity(now)
+        execute_action(binding[0], binding[1], binding[2], binding[3])
+        if not held.down:
+            # Resolved after the release (tap, end of the double-tap window) - nothing holds it
+            release_momentary_layer(binding[3])
+    if edge == held_keys.RELEASED and held.fired is not None:
+        release_momentary_layer(held.fired[3])
+    if edge == held_keys.PRESSED:
+        mem_monitor.end("press")
 
 
 def handle_command(command):
     """Handle commands from the GUI"""
+    global log_events
     command = command.strip()
-    print(f"Processing command: {command}")  # Debug: Zeige verarbeitete Befehle
+    if log_events:
+        print(f"Processing command: {command}")  # Debug: Zeige verarbeitete Befehle
 
     if command == "PING":
-        print("CODE.PY: Received PING command - sending PONG response")  # Debug: Zeige PONG-Antwort
         usb.write(b"PONG\n")
         time.sleep(0.01)  # Small delay to ensure data is sent
-        print("CODE.PY: PONG sent successfully")
         return True
     elif command == "DOWNLOAD_CONFIG":
         print("Processing DOWNLOAD_CONFIG")  # Debug: Zeige Download-Verarbeitung
-        if sd_available:
-            try:
-                with open(file_path, "r") as f:
-                    config_data = f.read()
-                usb.write(f"CONFIG:{config_data}\n".encode())
-                return True
-            except Exception as e:
-                usb.write(f"DOWNLOAD_ERROR: {e}\n".encode())
-                return False
-        else:
-            usb.write(b"DOWNLOAD_ERROR: SD card not available\n")
+        try:
+            config_data = read_config_text()
+            usb.write(f"CONFIG:{config_data}\n".encode())
+            return True
+        except Exception as e:
+            usb.write(f"DOWNLOAD_ERROR: {e}\n".encode())
             return False
     elif command == "BATTERY_STATUS":
-        print("Processing BATTERY_STATUS")  # Debug: Zeige Batterie-Status
         try:
             battery_info = feathers3.get_battery_status()
             battery_response = f"BATTERY:{battery_info['percentage']},{battery_info['voltage']},{battery_info['status']}\n"
             usb.write(battery_response.encode())
-            print(f"Battery response: {battery_response.strip()}")
+            if log_events:
+                print(f"Battery response: {battery_response.strip()}")
             return True
         except Exception as e:
             print(f"Battery status error: {e}")
             usb.write(f"BATTERY_ERROR: {e}\n".encode())
             return False
+    elif command == "BOOT_PROFILE":
+        usb.write((boot_profile.format_report() + "\n").encode())
+        return True
+    elif command == "STATS":
+        usb.write((stats.format_report() + "\n").encode())
+        return True
+    elif command == "STATS_RESET":
+        stats.reset()
+        usb.write(b"STATS_RESET_OK\n")
+        return True
+    elif command == "MEM":
+        config_bytes = len(active_config.buffer) if active_config is not None else 0
+        usb.write((mem_monitor.format_report(config_bytes) + "\n").encode())
+        return True
+    elif command == "MEM_RESET":
+        mem_monitor.collect()
+        mem_monitor.reset()
+        usb.write(b"MEM_RESET_OK\n")
+        return True
+    elif command.startswith("ALLOC_CHECK"):
+        # Format: ALLOC_CHECK[:passes] - measure the next main loop passes, the ALLOC_CHECK: result
+        # line follows when they are done (press keys / turn knobs meanwhile to check input passes)
+        try:
+            passes = int(command.split(":", 1)[1]) if ":" in command else ALLOC_CHECK_PASSES
+            mem_monitor.start_check(passes)
+            usb.write(f"ALLOC_CHECK_STARTED:{mem_monitor.check_remaining}\n".encode())
+            return True
+        except ValueError as e:
+            usb.write(f"ALLOC_CHECK_ERROR: {e}\n".encode())
+            return False
+    elif command.startswith("TRACE:"):
+        # Format: TRACE:1|0 - 1 clears the trace buffer and starts recording
+        if command.split(":", 1)[1].strip() == "1":
+            event_trace.start()
+        else:
+            event_trace.stop()
+        usb.write(b"TRACE:1\n" if event_trace.enabled else b"TRACE:0\n")
+        return True
+    elif command == "TRACE_DUMP":
+        event_trace.dump(usb.write, binconfig.ACTION_NAMES, HOST_COMMANDS + HOST_COMMAND_PREFIXES)
+        return True
+    elif command.startswith("LOG_EVENTS:"):
+        # Format: LOG_EVENTS:1|0 - per-event debug output on the console
+        log_events = command.split(":", 1)[1].strip() == "1"
+        usb.write(b"LOG_EVENTS:1\n" if log_events else b"LOG_EVENTS:0\n")
+        return True
+    elif command.startswith("MEM_TRACK:"):
+        # Format: MEM_TRACK:1|0 - measure allocation per code region (costs a heap walk per region)
+        mem_monitor.tracking = command.split(":", 1)[1].strip() == "1"
+        usb.write(b"MEM_TRACK:1\n" if mem_monitor.tracking else b"MEM_TRACK:0\n")
+        return True
+    elif command == "BATTERY_HISTORY":
+        print("Processing BATTERY_HISTORY")
+        try:
+            feathers3.write_battery_history(usb)
+            return True
+        except Exception as e:
+            print(f"Battery history error: {e}")
+            usb.write(f"BATTERY_ERROR: {e}\n".encode())
+            return False
+    elif command.startswith("SET_BATTERY_CAL:"):
+        # Format: SET_BATTERY_CAL:divisor,offset_mv,charge_offset_mv (stored in NVM)
+        try:
+            parts = command.split(":", 1)[1].split(",")
+            divisor = int(parts[0])
+            offset_mv = int(parts[1]) if len(parts) > 1 else 0
+            charge_offset = int(parts[2]) if len(parts) > 2 else feathers3.DEFAULT_CHARGE_OFFSET_MV
+            feathers3.save_battery_calibration(divisor, offset_mv, charge_offset)
+            print(f"Battery calibration saved: {divisor}, {offset_mv} mV, {charge_offset} mV")
+            usb.write(b"BATTERY_CAL_SET\n")
+            return True
+        except Exception as e:
+            usb.write(f"BATTERY_CAL_ERROR: {e}\n".encode())
+            return False
+    elif command.startswith("TYPING_BENCHMARK:"):
+        # Format: TYPING_BENCHMARK:interval_ms[,repeats] - types the benchmark pattern into the
+        # focused window, answers TYPING_BENCHMARK:interval_ms,characters,elapsed_ms,completed
+        try:
+            parts = command.split(":", 1)[1].split(",")
+            interval = max(0, int(parts[0]))
+            repeats = max(1, int(parts[1])) if len(parts) > 1 else 1
+            text = typing_engine.benchmark_text(repeats)
+            reports = text_reports.encode(keyboard_layout, text)
+
+            def benchmark_done(elapsed_ms, completed):
+                usb.write(f"TYPING_BENCHMARK:{interval},{len(text)},{elapsed_ms},{int(completed)}\n".encode())
+
+            typing_engine.start(reports, "benchmark", interval, benchmark_done)
+            power.note_activity()
+            return True
+        except Exception as e:
+            usb.write(f"TYPING_BENCHMARK_ERROR: {e}\n".encode())
+            return False
     elif command == "UPLOAD_LAYER_CONFIG":
         print("Processing UPLOAD_LAYER_CONFIG")  # Debug: Zeige Layer-Config-Upload
         usb.write(b"READY_FOR_LAYER_CONFIG\n")
         return True
     elif command == "GET_CURRENT_CONFIG":
         print("Processing GET_CURRENT_CONFIG")  # Debug: Zeige Current-Config-Abfrage
-        if sd_available:
-            try:
-                with open(file_path, "r") as f:
-                    config_data = f.read()
-                usb.write(f"CURRENT_CONFIG:{config_data}\n".encode())
-                return True
-            except Exception as e:
-                usb.write(f"CONFIG_ERROR: {e}\n".encode())
-                return False
-        else:
-            usb.write(b"CONFIG_ERROR: SD card not available\n")
+        try:
+            config_data = read_config_text()
+            usb.write(f"CURRENT_CONFIG:{config_data}\n".encode())
+            return True
+        except Exception as e:
+            usb.write(f"CONFIG_ERROR: {e}\n".encode())
             return False
     elif command.startswith("SET_DISPLAY_MODE:"):
         # Format: SET_DISPLAY_MODE:mode,enabled
@@ -950,9 +1476,30 @@ def handle_command(command):
         usb.write(f"UNKNOWN_COMMAND: {command}\n".encode())
         return False
 
-uploading = False
 json_lines = []
 
+# Lines answered by handle_command - tuples built once, not a list literal rebuilt for every line
+HOST_COMMANDS = ("PING", "DOWNLOAD_CONFIG", "BATTERY_STATUS", "BATTERY_HISTORY", "BOOT_PROFILE", "STATS",
+                 "STATS_RESET", "MEM", "MEM_RESET", "ALLOC_CHECK", "UPLOAD_LAYER_CONFIG", "GET_CURRENT_CONFIG",
+                 "TRACE_DUMP")
+HOST_COMMAND_PREFIXES = ("SET_DISPLAY_MODE:", "SET_TIME:", "SET_BATTERY_CAL:", "TYPING_BENCHMARK:",
+                         "MEM_TRACK:", "ALLOC_CHECK:", "LOG_EVENTS:", "TRACE:")
+
+def host_command_id(line):
+    """Index of the command in HOST_COMMANDS + HOST_COMMAND_PREFIXES (names the trace events), -1 if none"""
+    for i in range(len(HOST_COMMANDS)):
+        if line == HOST_COMMANDS[i]:
+            return i
+    for i in range(len(HOST_COMMAND_PREFIXES)):
+        if line.startswith(HOST_COMMAND_PREFIXES[i]):
+            return len(HOST_COMMANDS) + i
+    return -1
+
+# Passes measured by ALLOC_CHECK without a count (~2 s at full scan rate)
+ALLOC_CHECK_PASSES = 2000
+# What the current main loop pass did (mem_monitor.WORK_* bits), for ALLOC_CHECK
+pass_work = 0
+
 # Display already initialized after config loading
 
 # Display update counter for time mode
@@ -961,53 +1508,131 @@ display_update_counter = 0
 # Heartbeat counter to show FeatherS3 is alive
 heartbeat_counter = 0
 
+# Battery history sample check counter (the first sample is taken by the deferred init)
+battery_sample_counter = 0
+
+def announce_ready():
+    """Tell the host we're up (was a blocking test write with sleeps before)"""
+    if usb:
+        try:
+            usb.write(b"CODE.PY: FeatherS3 ready\n")
+            print("CODE.PY: USB test write successful")
+        except Exception as e:
+            print(f"CODE.PY: USB test write failed: {e}")
+
+def finish_boot():
+    boot_profile.mark("deferred_init")
+    boot_profile.print_report()
+
+# Non-critical start-up work, run one step per main loop pass once the keys already work
+deferred_init = [announce_ready, mount_sd, init_display, feathers3.record_battery_sample, finish_boot]
+
 print("CODE.PY: Entering main loop...")
+boot_profile.mark("main_loop")
 
 while True:
-    # Small delay to prevent overwhelming the system
-    time.sleep(0.001)  # 1ms delay
+    # Small delay to prevent overwhelming the system (1ms while active, longer when idle)
+    # Pass duration for STATS is measured without this sleep
+    event_trace.end_pass(pass_work)
+    if mem_monitor.end_pass(pass_work) and usb:
+        usb.write((mem_monitor.format_check() + "\n").encode())
+    stats.end_pass()
+    time.sleep(power.loop_interval)
+    stats.start_pass()
+    mem_monitor.start_pass()
+    event_trace.start_pass()
+    pass_work = 0
+    power.update()
+
+    # Advance running macros, then stream the running text - keeps the loop at full rate until done
+    if macro_engine.busy():
+        pass_work |= mem_monitor.WORK_INPUT
+        macro_engine.poll()
+        power.note_activity()
+    if typing_engine.busy():
+        pass_work |= mem_monitor.WORK_INPUT
+        typing_engine.poll()
+        power.note_activity()
+
+    # Send the scroll steps queued by the knobs during the last pass as one wheel report
+    wheel_mouse.check_usb()
+    if wheel_mouse.pending():
+        pass_work |= mem_monitor.WORK_INPUT
+        wheel_mouse.flush()
+
+    # Finish non-critical start-up work one step per pass
+    if deferred_init:
+        pass_work |= mem_monitor.WORK_TIMER
+        try:
+            deferred_init.pop(0)()
+        except Exception as e:
+            print(f"Deferred init error: {e}")
     
     # Heartbeat every 10 seconds to show we're alive
     heartbeat_counter += 1
     if heartbeat_counter >= 10000:  # ~10 s
         heartbeat_counter = 0
-        print("CODE.PY: Heartbeat - FeatherS3 is running")
+        pass_work |= mem_monitor.WORK_TIMER
+        if log_events:
+            print("CODE.PY: Heartbeat - FeatherS3 is running")
         try:
             if display is not None and layer_text is not None:
                 layer_text.text = layer_text.text  # refresh tick
-                print("Forced display refresh")
         except Exception as e:
             print(f"Display refresh failed: {e}")
 
+    # Check once per second whether a battery history sample is due
+    if not power.timers_paused():
+        battery_sample_counter += 1
+    if battery_sample_counter >= 1000:  # ~1 s
+        battery_sample_counter = 0
+        pass_work |= mem_monitor.WORK_TIMER
+        try:
+            feathers3.update_battery_history()
+        except Exception as e:
+            print(f"Battery history error: {e}")
+
     # Update display periodically (every 100 loops for time mode, every 1000 loops for other modes)
     # Skip display updates during upload to avoid "Layer: xyz" spam
-    if not uploading:
+    if not uploading and not power.timers_paused():
         display_update_counter += 1
         if display_mode == "time":
             if display_update_counter >= 100:   # ~0.1 s bei 1ms sleep
                 display_update_counter = 0
+                pass_work |= mem_monitor.WORK_TIMER
                 update_display_mode()
         else:
             if display_update_counter >= 1000:  # ~1 s
                 display_update_counter = 0
+                pass_work |= mem_monitor.WORK_TIMER
                 update_display_mode()
 
 
     # USB-Daten vom Host-PC empfangen
     if usb and usb.in_waiting > 0:
+        pass_work |= mem_monitor.WORK_HOST
         try:
             line = usb.readline().decode("utf-8").strip()
-            print(f"USB received: {line}")  # Debug: Zeige alle empfangenen Befehle
-            
+            # Host polling (battery, time) must not keep the pad awake, but uploads need the full loop rate
+            if uploading or line == "BEGIN_JSON":
+                power.note_activity()
+            if log_events:
+                print(f"USB received: {line}")  # Debug: Zeige alle empfangenen Befehle
+
             # Handle commands first
-            if line in ["PING", "DOWNLOAD_CONFIG", "BATTERY_STATUS", "UPLOAD_LAYER_CONFIG", "GET_CURRENT_CONFIG"] or line.startswith("SET_DISPLAY_MODE:") or line.startswith("SET_TIME:"):
-                print(f"Handling command: {line}")  # Debug: Zeige behandelte Befehle
+            command_id = host_command_id(line)
+            if command_id >= 0:
+                mem_monitor.begin("command")
+                event_trace.begin(event_trace.COMMAND, command_id)
                 handle_command(line)
+                event_trace.end(event_trace.COMMAND, command_id)
+                mem_monitor.end("command")
                 continue
 
             if line == "BEGIN_JSON":
                 uploading = True
                 json_lines = []
+                event_trace.begin(event_trace.UPLOAD)
                 print("JSON upload started")  # Debug: Zeige JSON-Upload-Start
                 print(f"Will save to: {file_path}")  # Debug: Show target file
                 show_receiving_feedback()  # Show "Receiving..." on display
@@ -1015,48 +1640,61 @@ while True:
 
             elif line == "END_JSON":
                 uploading = False
+                mem_monitor.begin("upload")
+                # Counted before json_lines is dropped to free the heap for parsing
+                line_count = len(json_lines)
                 json_string = "\n".join(json_lines)
                 print("JSON upload ended")  # Debug: Zeige JSON-Upload-Ende
                 print(f"JSON length: {len(json_string)} characters")  # Debug: Show JSON length
                 print(f"Will save to: {file_path}")  # Debug: Show target file
 
-                if sd_available:
-                    try:
-                        json_object = json.loads(json_string)
-
-                        # Update dynamic limits based on new configuration
-                        update_config_limits(json_object)
-
-                        # Extract system time if available
-                        if "systemTime" in json_object:
-                            system_time_data = json_object["systemTime"]
-                            system_time = system_time_data.get("currentTime")
-                            system_date = system_time_data.get("currentDate")
-                            print(f"System time received: {system_time}, date: {system_date}")
-                        else:
-                            print("No system time in configuration")
-
-                        # Save to the main config file
-                        print(f"Saving configuration to {file_path}")  # Debug: Show save action
-                        with open(file_path, "w") as f:
-                            json.dump(json_object, f)
-                        print(f"Main config file saved successfully")  # Debug: Confirm save
-
-                        # Reload the current layer configuration
-                        keys_pressed = read_json_file(file_path, current_layer)
-                        usb.write(b"UPLOAD_OK\n")
-                        print(f"CODE.PY: Configuration saved successfully to {file_path}")
-
-                        # Show done feedback with layer info
-                        layer_count = len(json_object.get("layers", []))
-                        config_info = f"Saved {layer_count} layers"
-                        print(f"CODE.PY: Reloaded configuration with {layer_count} layers")
-                        show_done_feedback(config_info)
-                    except Exception as e:
-                        usb.write(f"UPLOAD_FAIL: {repr(e)}\n".encode())
-                        show_done_feedback("Save failed!")
-                else:
-                    usb.write(b"UPLOAD_FAIL: SD card not available\n")
+                try:
+                    json_object = json.loads(json_string)
+                    json_lines = []
+                    json_string = None
+
+                    # Extract system time if available
+                    if "systemTime" in json_object:
+                        system_time_data = json_object["systemTime"]
+                        system_time = system_time_data.get("currentTime")
+                        system_date = system_time_data.get("currentDate")
+                        print(f"System time received: {system_time}, date: {system_date}")
+                    else:
+                        print("No system time in configuration")
+
+                    # Save the JSON interchange file (pick up a card inserted since boot)
+                    json_saved = False
+                    if mount_sd():
+                        try:
+                            print(f"Saving configuration to {file_path}")  # Debug: Show save action
+                            with open(file_path, "w") as f:
+                                json.dump(json_object, f)
+                            json_saved = True
+                            print(f"Main config file saved successfully")  # Debug: Confirm save
+                        except Exception as e:
+                            print(f"Could not save config to SD: {e}")
+
+                    # Compile once - NVM cache and SD get the binary the next boot loads
+                    layer_count = len(json_object.get("layers", []))
+                    compiled, cached, saved = compile_and_store(json_object)
+                    json_object = None
+                    if not cached and not saved:
+                        raise OSError("config too large for the NVM cache and SD card not available")
+
+                    # Update dynamic limits and reload the current layer configuration
+                    set_active_config(compiled)
+                    usb.write(b"UPLOAD_OK\n")
+                    print(f"CODE.PY: Configuration saved successfully (SD: {json_saved}/{saved}, cache: {cached})")
+
+                    # Show done feedback with layer info
+                    config_info = f"Saved {layer_count} layers"
+                    print(f"CODE.PY: Reloaded configuration with {layer_count} layers")
+                    show_done_feedback(config_info)
+                except Exception as e:
+                    usb.write(f"UPLOAD_FAIL: {repr(e)}\n".encode())
+                    show_done_feedback("Save failed!")
+                mem_monitor.end("upload")
+                event_trace.end(event_trace.UPLOAD, line_count)
 
             elif uploading:
                 json_lines.append(line)
@@ -1065,69 +1703,24 @@ while True:
             continue
 
 
-    # Check individual buttons
-    buttons = [button_1, button_2, button_3, button_4, button_5, button_6]
-    for i, button_pin in enumerate(buttons):
-        if not button_pin.value:  # Is it grounded?
-            while not button_pin.value:
-                pass
-
-            if i < len(keys_pressed):
-                key = keys_pressed[i]
-
-                # Skip empty or disabled keys
-                if not key or key == "":
-                    continue
-
-                # Check for special layer switching action
-                if key == "LAYER_SWITCH" and max_layers > 1:
-                    print(f"Layer switch button pressed - current layer: {current_layer}")
-                    current_layer += 1
-                    if current_layer > max_layers:
-                        current_layer = 1
-                    print(f"Switched to layer {current_layer} (max: {max_layers})")
-                    update_display_mode()
-                    keys_pressed = read_json_file(file_path, current_layer)
-                    continue
-
-                # Execute button action based on configuration
-                button_id = str(i + 1)  # Convert 0-based index to 1-based button ID
-                execute_button_action(button_id, key)
-
-    # Check rotary encoder buttons
-    if not rotary_a_button.value:  # Rotary A button pressed
-        while not rotary_a_button.value:
-            pass
-        print("Rotary A - Press")
-        handle_rotary_press("A")
-
-    if not rotary_b_button.value:  # Rotary B button pressed
-        while not rotary_b_button.value:
-            pass
-        print("Rotary B - Press")
-        handle_rotary_press("B")
-
-    # Handle rotary encoder rotation detection using CircuitPython rotaryio
-    # Rotary A encoder
-    if rotary_a is not None:
-        rotary_a_position = rotary_a.position
-        if rotary_a_position != rotary_a_last_position:
-            if rotary_a_position > rotary_a_last_position:
-                print("Rotary A - Clockwise")
-                handle_rotary_rotation("A", "cw")
-            else:
-                print("Rotary A - Counter-clockwise")
-                handle_rotary_rotation("A", "ccw")
-            rotary_a_last_position = rotary_a_position
-
-    # Rotary B encoder
-    if rotary_b is not None:
-        rotary_b_position = rotary_b.position
-        if rotary_b_position != rotary_b_last_position:
-            if rotary_b_position > rotary_b_last_position:
-                print("Rotary B - Clockwise")
-                handle_rotary_rotation("B", "cw")
-            else:
-                print("Rotary B - Counter-clockwise")
-                handle_rotary_rotation("B", "ccw")
-            rotary_b_last_position = rotary_b_position
+    # Button and encoder press events from the keypad scanners - plain actions fire on press and
+    # repeat while held, keys with a hold / double-tap action resolve through their held_keys
+    # state machine. Only keys with an event or a pending timer are looked at.
+    now = feathers3.ticks_ms()
+    if key_scanner.overflowed():
+        pass_work |= mem_monitor.WORK_INPUT
+        print("Key events lost - resetting key states")
+        for held in button_keys:
+            if held.fired is not None:
+                release_momentary_layer(held.fired[3])
+            held.reset()
+        active_buttons.clear()
+    if service_key_events(key_scanner.next_event, button_keys, active_buttons, button_binding, now):
+        pass_work |= mem_monitor.WORK_INPUT
+    if knob_keys and service_key_events(encoders.next_press_event, knob_keys, active_knobs, rotary_press_binding, now,
+                                        event_trace.KNOB_PRESS_BASE):
+        pass_work |= mem_monitor.WORK_INPUT
+
+    # Encoder rotation - one pass over all knobs
+    if encoders.poll(handle_rotary_rotation):
+        pass_work |= mem_monitor.WORK_INPUT
@@ -0,0 +1,62 @@
+"""
+Config Cache
+Mirrors the compiled configuration into microcontroller.nvm so the pad can boot (and keep
+working) without waiting for - or even having - the SD card
+"""
+
+import binascii
+import struct
+import microcontroller
+import binconfig
+
+# NVM layout: bytes 0-15 are reserved for feathers3 battery calibration, the cache follows.
+NVM_CACHE_OFFSET = 16
+
+# Header: magic, cache version, flags, reserved, payload length, CRC32 of the payload.
+# The payload is a binconfig blob.
+HEADER_FORMAT = "<4sBBHII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAGIC = b"PCFG"
+VERSION = 2
+
+def capacity():
+    """Largest payload that fits into NVM"""
+    return len(microcontroller.nvm) - NVM_CACHE_OFFSET - HEADER_SIZE
+
+def save(payload):
+    """Write a compiled config into NVM. Returns False if it does not fit - the cache is emptied
+    then, so the next boot doesn't run the config it replaced."""
+    if len(payload) > capacity():
+        print(f"Config cache: {len(payload)} bytes exceed NVM capacity of {capacity()} bytes")
+        invalidate()
+        return False
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, 0, 0, len(payload), binascii.crc32(payload))
+    # Only rewrite NVM if the content changed - saves flash wear on repeated uploads
+    start = NVM_CACHE_OFFSET
+    end = start + HEADER_SIZE + len(payload)
+    blob = header + payload
+    if microcontroller.nvm[start:end] != blob:
+        microcontroller.nvm[start:end] = blob
+    print(f"Config cache: saved {len(payload)} bytes")
+    return True
+
+def load():
+    """Read the cached config from NVM as a BinaryConfig (None if there is no valid cache)"""
+    try:
+        start = NVM_CACHE_OFFSET
+        magic, version, _, _, length, crc = struct.unpack(HEADER_FORMAT, microcontroller.nvm[start:start + HEADER_SIZE])
+        if magic != MAGIC or version != VERSION or length > capacity():
+            return None
+        payload = microcontroller.nvm[start + HEADER_SIZE:start + HEADER_SIZE + length]
+        if binascii.crc32(payload) != crc:
+            print("Config cache: CRC mismatch - ignoring cache")
+            return None
+        return binconfig.BinaryConfig(payload)
+    except Exception as e:
+        print(f"Config cache: load failed: {e}")
+        return None
+
+def invalidate():
+    """Mark the cache as empty"""
+    start = NVM_CACHE_OFFSET
+    microcontroller.nvm[start:start + 4] = b"\x00\x00\x00\x00"
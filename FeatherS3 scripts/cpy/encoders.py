@@ -0,0 +1,170 @@
+"""
+Encoders
+Rotary encoders declared in the settings.toml hardware profile (knob A, B, C, ... in order).
+All knob positions are read in one pass over an array of last positions and the press buttons
+come from a keypad scanner, so another knob costs a list entry instead of more code.
+Divisor, direction and step scale per knob can be changed by the config at runtime
+"""
+
+import os
+import array
+import board
+import digitalio
+import keypad
+import rotaryio
+
+# "pin a:pin b[:press pin[:divisor]]" per knob, comma separated
+DEFAULT_ENCODERS = "IO10:IO11:IO7,IO1:IO3:IO33"
+# divisor: 1 = no detents or 4 detents per cycle, 2 = 2 detents per cycle, 4 = 1 detent per cycle
+DEFAULT_DIVISOR = 4
+
+count = 0
+specs = []            # (pin a, pin b, press pin or None, divisor) per knob
+press_knob = ()       # Knob index of each press scanner key number
+divisors = []         # Divisor in use per knob (profile, overridden by the "encoders" config section)
+
+VALID_DIVISORS = (1, 2, 4)
+
+_encoders = []
+_last = array.array("l")
+_factors = array.array("l")   # Steps per count, negative = inverted direction
+_press_scanner = None
+_event = keypad.Event()
+
+def _pin(name):
+    pin = getattr(board, name.strip(), None)
+    if pin is None:
+        raise ValueError(f"unknown pin: {name}")
+    return pin
+
+def load_profile():
+    """Read PADAWAN_ENCODERS / PADAWAN_ENCODER_DIVISOR from settings.toml"""
+    global count, _factors
+    text = os.getenv("PADAWAN_ENCODERS")
+    if text is None:
+        text = DEFAULT_ENCODERS
+    default_divisor = int(os.getenv("PADAWAN_ENCODER_DIVISOR") or DEFAULT_DIVISOR)
+    specs.clear()
+    for entry in text.split(","):
+        fields = entry.strip().split(":")
+        if len(fields) < 2:
+            continue
+        try:
+            press = _pin(fields[2]) if len(fields) > 2 and fields[2].strip() not in ("", "-") else None
+            divisor = int(fields[3]) if len(fields) > 3 else default_divisor
+            specs.append((_pin(fields[0]), _pin(fields[1]), press, divisor))
+        except ValueError as e:
+            print(f"Encoder '{entry.strip()}' ignored: {e}")
+    count = len(specs)
+    divisors[:] = [spec[3] for spec in specs]
+    _factors = array.array("l", [1] * count)
+
+def _create(index):
+    pin_a, pin_b, _, _ = specs[index]
+    try:
+        return rotaryio.IncrementalEncoder(pin_a, pin_b, divisor=divisors[index])
+    except Exception as e:
+        print(f"CODE.PY: Failed to initialize Rotary {chr(65 + index)} encoder: {e}")
+        return None
+
+def start():
+    """Create the encoders and the press scanner (again, after light sleep)"""
+    global _last, _press_scanner, press_knob
+    _encoders.clear()
+    for index in range(count):
+        _encoders.append(_create(index))
+    _last = array.array("l", [0] * count)
+    press_pins = []
+    knobs = []
+    for index in range(count):
+        if specs[index][2] is not None:
+            press_pins.append(specs[index][2])
+            knobs.append(index)
+    press_knob = tuple(knobs)
+    _press_scanner = keypad.Keys(press_pins, value_when_pressed=False, pull=True) if press_pins else None
+    print(f"CODE.PY: {count} rotary encoders, {len(press_pins)} with press buttons")
+
+def configure(encoder_config):
+    """Apply the "encoders" section of the config, e.g. {"A": {"detents": 2, "invert": true, "scale": 1}}.
+    detents = detents per quadrature cycle (1, 2 or 4), or "divisor" directly; scale = actions per detent.
+    Knobs not listed go back to the profile. Encoders whose divisor changes are recreated."""
+    encoder_config = encoder_config or {}
+    for index in range(count):
+        letter = chr(65 + index)
+        knob = encoder_config.get(letter) or {}
+        divisor = specs[index][3]
+        try:
+            if "detents" in knob:
+                detents = int(knob["detents"])
+                if detents not in VALID_DIVISORS:
+                    raise ValueError(f"{detents} detents per cycle (must be 1, 2 or 4)")
+                divisor = 4 // detents
+            divisor = int(knob.get("divisor", divisor))
+            if divisor not in VALID_DIVISORS:
+                raise ValueError(f"divisor {divisor} (must be 1, 2 or 4)")
+            factor = max(1, int(knob.get("scale", 1)))
+        except (ValueError, TypeError) as e:
+            print(f"Encoder {letter} settings ignored: {e}")
+            divisor = specs[index][3]
+            factor = 1
+        _factors[index] = -factor if knob.get("invert") else factor
+        if divisor != divisors[index]:
+            divisors[index] = divisor
+            if index < len(_encoders):
+                if _encoders[index] is not None:
+                    _encoders[index].deinit()
+                _encoders[index] = _create(index)
+                _last[index] = 0
+            print(f"Encoder {letter}: divisor {divisor}")
+    if encoder_config:
+        print(f"Encoder settings - Divisors: {divisors}, Steps per detent: {list(_factors)}")
+
+def stop():
+    global _press_scanner
+    for encoder in _encoders:
+        if encoder is not None:
+            encoder.deinit()
+    _encoders.clear()
+    if _press_scanner is not None:
+        _press_scanner.deinit()
+        _press_scanner = None
+
+def _rests_high(pin):
+    with digitalio.DigitalInOut(pin) as channel:
+        channel.switch_to_input(pull=digitalio.Pull.UP)
+        return channel.value
+
+def wake_pins():
+    """Press pins and the encoder channels that rest high, for light sleep alarms (call after stop()).
+    A channel resting low on its detent would wake the board at once - turning the knob drops the
+    other channel within a detent, so a turn still wakes it"""
+    pins = []
+    for pin_a, pin_b, press, _ in specs:
+        for pin in (pin_a, pin_b):
+            if _rests_high(pin):
+                pins.append(pin)
+        if press is not None:
+            pins.append(press)
+    return tuple(pins)
+
+def next_press_event():
+    """The next press button event (key_number -> press_knob, pressed) or None. The event object is reused."""
+    if _press_scanner is None or not _press_scanner.events.get_into(_event):
+        return None
+    return _event
+
+def poll(handler):
+    """Call handler(knob_index, detents) for every knob that moved since the last pass,
+    returns True if any did"""
+    moved = False
+    for index in range(len(_encoders)):
+        encoder = _encoders[index]
+        if encoder is None:
+            continue
+        position = encoder.position
+        delta = position - _last[index]
+        if delta:
+            _last[index] = position
+            handler(index, delta * _factors[index])
+            moved = True
+    return moved
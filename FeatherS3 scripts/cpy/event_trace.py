@@ -0,0 +1,130 @@
+"""
+Event Trace
+Compact binary ring buffer of timestamped events (inputs, actions, HID reports, serial commands,
+SD I/O, display updates, garbage collections) - started with TRACE:1, dumped with TRACE_DUMP and
+turned into a Chrome / Perfetto timeline by trace_export.py on the host
+"""
+
+import binascii
+import struct
+import time
+
+# Record: timestamp in microseconds (u32, wraps after ~71 min), event type, phase, argument
+RECORD_FORMAT = "<IBBH"
+RECORD_SIZE = 8
+CAPACITY = 1024         # Records kept (8 KB, allocated on the first TRACE:1)
+DUMP_RECORDS = 32       # Records per TRACE_DATA line
+FORMAT_VERSION = 1
+
+# Event types - the names go out in the dump header, so the host tool needs no copy of this list
+PASS = 0            # Main loop pass that had work, arg = mem_monitor.WORK_* bits
+KEY_DOWN = 1        # arg = key number (KNOB_PRESS_BASE + key number for knob press buttons)
+KEY_UP = 2
+KNOB = 3            # arg = knob index << 8 | detents (signed byte)
+ACTION = 4          # arg = opcode
+HID_REPORT = 5      # arg = HID usage (6 keyboard, 1 consumer, 2 mouse)
+COMMAND = 6         # arg = index into the command names of the dump
+SD_READ = 7
+SD_WRITE = 8
+DISPLAY = 9         # Label text re-rendered
+GC = 10             # Collection detected (or forced by collect())
+UPLOAD = 11         # BEGIN_JSON .. END_JSON handled, arg = config lines
+TYPE_NAMES = ("pass", "key_down", "key_up", "knob", "action", "hid_report", "command",
+              "sd_read", "sd_write", "display", "gc", "upload")
+
+KNOB_PRESS_BASE = 0x100
+
+# Phases (as in the Chrome trace format)
+BEGIN = ord("B")
+END = ord("E")
+INSTANT = ord("i")
+
+enabled = False
+count = 0           # Records in the buffer
+overwritten = 0     # Oldest records lost to the ring wrapping
+
+_buffer = None
+_head = 0
+_pass_start = None
+
+def now_us():
+    """Microsecond timestamp of a record. monotonic_ns() returns a long int - one small allocation
+    per event, which is why tracing is off unless asked for."""
+    return (time.monotonic_ns() // 1000) & 0xFFFFFFFF
+
+def start():
+    """Clear the buffer and start recording"""
+    global enabled, _buffer, _head, count, overwritten, _pass_start
+    if _buffer is None:
+        _buffer = bytearray(CAPACITY * RECORD_SIZE)
+    _pass_start = None
+    _head = 0
+    count = 0
+    overwritten = 0
+    enabled = True
+
+def stop():
+    global enabled
+    enabled = False
+
+def record(kind, phase, arg=0, timestamp=None):
+    """Append one event (no-op unless tracing)"""
+    global _head, count, overwritten
+    if not enabled:
+        return
+    if timestamp is None:
+        timestamp = now_us()
+    struct.pack_into(RECORD_FORMAT, _buffer, _head * RECORD_SIZE, timestamp, kind, phase, arg & 0xFFFF)
+    _head = (_head + 1) % CAPACITY
+    if count < CAPACITY:
+        count += 1
+    else:
+        overwritten += 1
+
+def begin(kind, arg=0):
+    record(kind, BEGIN, arg)
+
+def end(kind, arg=0):
+    record(kind, END, arg)
+
+def instant(kind, arg=0):
+    record(kind, INSTANT, arg)
+
+def start_pass():
+    """Call at the start of the work of a main loop pass"""
+    global _pass_start
+    _pass_start = now_us() if enabled else None
+
+def end_pass(work):
+    """Record the pass as a span if it did anything (idle passes would flush the buffer in a second)"""
+    if enabled and work and _pass_start is not None:
+        record(PASS, BEGIN, work, _pass_start)
+        record(PASS, END, work)
+
+def dump(write, action_names=(), command_names=()):
+    """Send the buffer, oldest record first, as text lines through write(bytes):
+    TRACE_BEGIN:version=..,records=..,overwritten=..,clock=us,now=..,types=a|b|..,actions=..,commands=..
+    TRACE_DATA:<hex of up to DUMP_RECORDS records>
+    TRACE_END
+    Recording pauses meanwhile."""
+    global enabled
+    was_enabled = enabled
+    enabled = False
+    header = (f"TRACE_BEGIN:version={FORMAT_VERSION},records={count},overwritten={overwritten},clock=us,"
+              f"now={now_us()},types={'|'.join(TYPE_NAMES)},actions={'|'.join(action_names)},"
+              f"commands={'|'.join(command_names)}\n")
+    write(header.encode())
+    if count:
+        chunk = bytearray(DUMP_RECORDS * RECORD_SIZE)
+        view = memoryview(_buffer)
+        first = (_head - count) % CAPACITY
+        sent = 0
+        while sent < count:
+            n = min(DUMP_RECORDS, count - sent)
+            for i in range(n):
+                slot = (first + sent + i) % CAPACITY * RECORD_SIZE
+                chunk[i * RECORD_SIZE:(i + 1) * RECORD_SIZE] = view[slot:slot + RECORD_SIZE]
+            write(b"TRACE_DATA:" + binascii.hexlify(memoryview(chunk)[:n * RECORD_SIZE]) + b"\n")
+            sent += n
+    write(b"TRACE_END\n")
+    enabled = was_enabled
@@ -5,7 +5,11 @@ Contains all helper functions for battery monitoring, charging detection, and ot
 
 import board
 import analogio
+import array
 import digitalio
+import microcontroller
+import struct
+import supervisor
 import time
 
 # Setup the BATTERY voltage sense pin
@@ -15,6 +19,81 @@ vbat_voltage = analogio.AnalogIn(board.BATTERY)
 vbus_sense = digitalio.DigitalInOut(board.VBUS_SENSE)
 vbus_sense.direction = digitalio.Direction.INPUT
 
+# supervisor.ticks_ms() wraps around at 2**29 ms
+TICKS_PERIOD = 1 << 29
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+def ticks_ms():
+    """Millisecond tick counter (small int, no allocation)"""
+    return supervisor.ticks_ms()
+
+def ticks_diff(end, start):
+    """Signed difference end - start between two ticks_ms() values, correct across wraparound"""
+    diff = (end - start) & TICKS_MAX
+    return ((diff + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+def ticks_add(ticks, delta):
+    """Add delta milliseconds to a ticks_ms() value"""
+    return (ticks + delta) & TICKS_MAX
+
+# Default ADC divisor for the onboard VBAT divider (raw ADC value / 5371 = volts)
+DEFAULT_VBAT_DIVISOR = 5371
+
+# While VBUS is present the charger lifts the terminal voltage above the resting
+# voltage of the cell, so we subtract this before looking up the discharge curve
+DEFAULT_CHARGE_OFFSET_MV = 120
+
+# Per-board calibration lives in the first bytes of microcontroller.nvm (0-15 reserved, config_cache follows):
+# magic "PB", version, reserved, divisor (uint16), offset mV (int16), charge offset mV (int16)
+NVM_CAL_OFFSET = 0
+NVM_CAL_FORMAT = "<2sBBHhh"
+NVM_CAL_SIZE = struct.calcsize(NVM_CAL_FORMAT)
+NVM_CAL_MAGIC = b"PB"
+NVM_CAL_VERSION = 1
+
+# Resting voltage curve of a typical 1S LiPo cell (mV, ascending) and the matching charge in %
+LIPO_CURVE_MV = (3270, 3610, 3690, 3710, 3730, 3750, 3770, 3790, 3800, 3820,
+                 3840, 3850, 3870, 3910, 3950, 3980, 4020, 4080, 4110, 4150, 4200)
+LIPO_CURVE_PERCENT = (0, 5, 10, 15, 20, 25, 30, 35, 40, 45,
+                      50, 55, 60, 65, 70, 75, 80, 85, 90, 95, 100)
+
+vbat_divisor = DEFAULT_VBAT_DIVISOR
+vbat_offset_mv = 0
+charge_offset_mv = DEFAULT_CHARGE_OFFSET_MV
+
+def load_battery_calibration():
+    """Load per-board battery calibration from NVM (keeps defaults if none is stored)"""
+    global vbat_divisor, vbat_offset_mv, charge_offset_mv
+    try:
+        raw = microcontroller.nvm[NVM_CAL_OFFSET:NVM_CAL_OFFSET + NVM_CAL_SIZE]
+        magic, version, _, divisor, offset, charge_offset = struct.unpack(NVM_CAL_FORMAT, raw)
+        if magic == NVM_CAL_MAGIC and version == NVM_CAL_VERSION and divisor > 0:
+            vbat_divisor = divisor
+            vbat_offset_mv = offset
+            charge_offset_mv = charge_offset
+            return True
+    except Exception as e:
+        print(f"Battery calibration not loaded: {e}")
+    return False
+
+def save_battery_calibration(divisor, offset_mv=0, charge_offset=DEFAULT_CHARGE_OFFSET_MV):
+    """Store per-board battery calibration in NVM and apply it immediately"""
+    global vbat_divisor, vbat_offset_mv, charge_offset_mv
+    if divisor <= 0:
+        raise ValueError("divisor must be positive")
+    microcontroller.nvm[NVM_CAL_OFFSET:NVM_CAL_OFFSET + NVM_CAL_SIZE] = struct.pack(
+        NVM_CAL_FORMAT, NVM_CAL_MAGIC, NVM_CAL_VERSION, 0, divisor, offset_mv, charge_offset)
+    vbat_divisor = divisor
+    vbat_offset_mv = offset_mv
+    charge_offset_mv = charge_offset
+
+load_battery_calibration()
+
+def get_battery_millivolts():
+    """Get the calibrated battery voltage in mV (integer math, no allocation)"""
+    return vbat_voltage.value * 1000 // vbat_divisor + vbat_offset_mv
+
 def get_battery_voltage():
     """Get the approximate battery voltage."""
     # I don't really understand what CP is doing under the hood here for the ADC range & calibration,
@@ -22,23 +101,38 @@ def get_battery_voltage():
     # default factory configuration.
     # This forumla should show the nominal 4.2V max capacity (approximately) when 5V is present and the
     # VBAT is in charge state for a 1S LiPo battery with a max capacity of 4.2V
-    global vbat_voltage
-    return (vbat_voltage.value / 5371)
+    return get_battery_millivolts() / 1000
 
 def get_vbus_present():
     """Detect if VBUS (5V) power source is present"""
     global vbus_sense
     return vbus_sense.value
 
+def millivolts_to_percent(millivolts, charging=False):
+    """Map a cell voltage to charge % via binary search + linear interpolation on the LiPo curve"""
+    if charging:
+        millivolts -= charge_offset_mv
+    curve = LIPO_CURVE_MV
+    if millivolts <= curve[0]:
+        return 0
+    last = len(curve) - 1
+    if millivolts >= curve[last]:
+        return 100
+    # Find the segment curve[lo] <= millivolts < curve[lo + 1]
+    lo = 0
+    hi = last
+    while hi - lo > 1:
+        mid = (lo + hi) >> 1
+        if curve[mid] <= millivolts:
+            lo = mid
+        else:
+            hi = mid
+    p0 = LIPO_CURVE_PERCENT[lo]
+    return p0 + (millivolts - curve[lo]) * (LIPO_CURVE_PERCENT[hi] - p0) // (curve[hi] - curve[lo])
+
 def get_battery_percent():
     """Get battery percentage (0-100)"""
-    battery_percent = int(get_battery_voltage() * 100 - 320)
-    # Clamp to valid range
-    if battery_percent < 0:
-        battery_percent = 0
-    elif battery_percent > 100:
-        battery_percent = 100
-    return battery_percent
+    return millivolts_to_percent(get_battery_millivolts(), vbus_sense.value)
 
 def get_battery_status():
     """Get comprehensive battery status including voltage, percentage, and charging state"""
@@ -62,6 +156,108 @@ def is_low_battery():
     """Check if battery is low (< 20%)"""
     return get_battery_percent() < 20
 
+# === Battery history ===
+# Fixed-size ring buffer of periodic samples, preallocated so sampling never grows the heap.
+# Percent samples carry the charging state in the top bit.
+BATTERY_HISTORY_SIZE = 240          # 4 hours at the default interval
+BATTERY_SAMPLE_INTERVAL = 60        # seconds between samples
+BATTERY_CHARGING_FLAG = 0x80
+
+# Binary record streamed by BATTERY_HISTORY: uptime s (uint32), mV (uint16), percent|flag (uint8)
+BATTERY_RECORD_FORMAT = "<IHB"
+BATTERY_RECORD_SIZE = struct.calcsize(BATTERY_RECORD_FORMAT)
+
+history_seconds = array.array("L", [0] * BATTERY_HISTORY_SIZE)
+history_millivolts = array.array("H", [0] * BATTERY_HISTORY_SIZE)
+history_percent = array.array("B", [0] * BATTERY_HISTORY_SIZE)
+history_head = 0    # Next slot to write
+history_count = 0
+last_sample_time = None
+_record_buffer = bytearray(BATTERY_RECORD_SIZE)
+
+def record_battery_sample(now=None):
+    """Store the current battery state in the history ring buffer"""
+    global history_head, history_count, last_sample_time
+    if now is None:
+        now = time.monotonic()
+    millivolts = get_battery_millivolts()
+    charging = vbus_sense.value
+    percent = millivolts_to_percent(millivolts, charging)
+    history_seconds[history_head] = int(now)
+    history_millivolts[history_head] = max(0, min(millivolts, 0xFFFF))
+    history_percent[history_head] = percent | BATTERY_CHARGING_FLAG if charging else percent
+    history_head = (history_head + 1) % BATTERY_HISTORY_SIZE
+    if history_count < BATTERY_HISTORY_SIZE:
+        history_count += 1
+    last_sample_time = now
+
+def update_battery_history(now=None):
+    """Take a sample if the sample interval has elapsed (call periodically from the main loop)"""
+    if now is None:
+        now = time.monotonic()
+    if last_sample_time is None or now - last_sample_time >= BATTERY_SAMPLE_INTERVAL:
+        record_battery_sample(now)
+        return True
+    return False
+
+def clear_battery_history():
+    """Drop all stored samples"""
+    global history_head, history_count, last_sample_time
+    history_head = 0
+    history_count = 0
+    last_sample_time = None
+
+def _history_index(i):
+    """Ring buffer slot of the i-th oldest sample"""
+    return (history_head - history_count + i) % BATTERY_HISTORY_SIZE
+
+def estimate_discharge_rate():
+    """Estimate discharge in %/hour from the most recent uninterrupted discharge run (None if unknown)"""
+    # Walk back from the newest sample until the pad was last on USB power
+    n = 0
+    while n < history_count and not history_percent[_history_index(history_count - 1 - n)] & BATTERY_CHARGING_FLAG:
+        n += 1
+    if n < 2:
+        return None
+    # Least-squares slope of percent over time
+    first = history_count - n
+    t0 = history_seconds[_history_index(first)]
+    sum_t = sum_p = sum_tt = sum_tp = 0
+    for i in range(first, history_count):
+        idx = _history_index(i)
+        t = history_seconds[idx] - t0
+        p = history_percent[idx]
+        sum_t += t
+        sum_p += p
+        sum_tt += t * t
+        sum_tp += t * p
+    denominator = n * sum_tt - sum_t * sum_t
+    if denominator == 0:
+        return None
+    slope = (n * sum_tp - sum_t * sum_p) / denominator  # %/s, negative while discharging
+    return -slope * 3600
+
+def estimate_time_to_empty():
+    """Estimate remaining runtime in minutes (None while charging or without enough samples)"""
+    rate = estimate_discharge_rate()
+    if rate is None or rate <= 0 or history_count == 0:
+        return None
+    percent = history_percent[_history_index(history_count - 1)] & ~BATTERY_CHARGING_FLAG
+    return int(percent / rate * 60)
+
+def write_battery_history(stream):
+    """Stream the history as BATTERY_HISTORY:<count>,<record size>,<%/h x100>,<minutes to empty>
+    followed by <count> packed records, oldest first"""
+    rate = estimate_discharge_rate()
+    minutes = estimate_time_to_empty()
+    rate_x100 = int(rate * 100) if rate is not None else -1
+    stream.write(f"BATTERY_HISTORY:{history_count},{BATTERY_RECORD_SIZE},{rate_x100},{minutes if minutes is not None else -1}\n".encode())
+    for i in range(history_count):
+        idx = _history_index(i)
+        struct.pack_into(BATTERY_RECORD_FORMAT, _record_buffer, 0,
+                         history_seconds[idx], history_millivolts[idx], history_percent[idx])
+        stream.write(_record_buffer)
+
 def get_system_info():
     """Get general system information"""
     import microcontroller
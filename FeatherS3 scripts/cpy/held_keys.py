@@ -0,0 +1,193 @@
+"""
+Held Keys
+Press/release edges, hold-to-repeat and tap/hold/double-tap resolution for buttons and encoder
+presses, driven by the main loop clock instead of waiting for the key to come up. The keypad
+scanners debounce - every event they queue is a real edge
+"""
+
+import feathers3
+import binconfig
+
+PRESSED = 1
+RELEASED = 2
+
+# Tap/hold state of a key
+STATE_IDLE = 0
+STATE_DOWN = 1         # Pressed, tap or hold not decided yet
+STATE_WAIT_DOUBLE = 2  # Tapped once, waiting whether a second tap follows
+STATE_CONSUMED = 3     # Action already fired, waiting for the release
+
+# Defaults, overridable through the "repeat" section of the config
+repeat_delay_ms = 500
+repeat_interval_ms = 50    # 20 repeats per second
+
+# Defaults, overridable through the "tapHold" section of the config
+hold_time_ms = 300
+double_tap_time_ms = 250
+
+def configure(repeat_config):
+    """Apply the "repeat" section of the config (delay in ms, rate in repeats per second)"""
+    global repeat_delay_ms, repeat_interval_ms
+    if not repeat_config:
+        return
+    repeat_delay_ms = max(0, int(repeat_config.get("delay", repeat_delay_ms)))
+    if repeat_config.get("rate"):
+        repeat_interval_ms = max(1, 1000 // int(repeat_config["rate"]))
+    print(f"Repeat settings - Delay: {repeat_delay_ms}ms, Interval: {repeat_interval_ms}ms")
+
+def configure_tap_hold(tap_hold_config):
+    """Apply the "tapHold" section of the config (holdTime / doubleTapTime in ms)"""
+    global hold_time_ms, double_tap_time_ms
+    if not tap_hold_config:
+        return
+    hold_time_ms = max(1, int(tap_hold_config.get("holdTime", hold_time_ms)))
+    double_tap_time_ms = max(1, int(tap_hold_config.get("doubleTapTime", double_tap_time_ms)))
+    print(f"Tap/hold settings - Hold: {hold_time_ms}ms, Double tap: {double_tap_time_ms}ms")
+
+def repeat_delay(opcode, extras):
+    """Delay in ms before a binding starts repeating, -1 if it does not repeat.
+    Per binding: "repeat": true/false, "repeatDelay": ms, "repeatRate": repeats per second."""
+    if opcode not in binconfig.REPEATABLE_OPCODES:
+        return -1
+    enabled = opcode in binconfig.AUTO_REPEAT_OPCODES
+    if not extras:
+        return repeat_delay_ms if enabled else -1
+    if not extras.get("repeat", enabled):
+        return -1
+    return max(0, int(extras.get("repeatDelay", repeat_delay_ms)))
+
+def repeat_interval(extras):
+    """Interval in ms between the repeats of a binding"""
+    if extras and extras.get("repeatRate"):
+        return max(1, 1000 // int(extras["repeatRate"]))
+    return repeat_interval_ms
+
+class ActiveKeys:
+    """Key numbers that still need polling (hold, double-tap window, repeat) in preallocated
+    buffers - adding and dropping keys never allocates, unlike a list that grows and shrinks"""
+
+    def __init__(self, size):
+        self.keys = bytearray(size)
+        self.count = 0
+        self._member = bytearray(size)
+
+    def add(self, key_number):
+        if self._member[key_number]:
+            return
+        self._member[key_number] = 1
+        self.keys[self.count] = key_number
+        self.count += 1
+
+    def remove_at(self, i):
+        """Drop the i-th entry (the last one takes its place)"""
+        self._member[self.keys[i]] = 0
+        self.count -= 1
+        self.keys[i] = self.keys[self.count]
+
+    def clear(self):
+        for i in range(self.count):
+            self._member[self.keys[i]] = 0
+        self.count = 0
+
+class HeldKey:
+    """State of one physical key.
+    Bindings are (opcode, key, extras, source) tuples, variants are
+    (hold binding, double-tap binding, hold ms, double-tap ms) or None for a plain key."""
+
+    def __init__(self):
+        self.down = False
+        self.state = STATE_IDLE
+        self.binding = None
+        self.fired = None      # Binding run by the current / last press, e.g. to release a momentary layer
+        self.variants = None
+        self.pressed_at = 0
+        self.released_at = 0
+        self.repeat_binding = None
+        self.repeat_at = 0
+        self.repeat_interval = 0
+
+    def update(self, pressed):
+        """Feed the raw key state, returns PRESSED, RELEASED or 0"""
+        if pressed == self.down:
+            return 0
+        self.down = pressed
+        return PRESSED if pressed else RELEASED
+
+    def reset(self):
+        """Forget the key state (the scanner lost events and reports held keys again)"""
+        self.down = False
+        self.state = STATE_IDLE
+        self.fired = None
+        self.repeat_binding = None
+
+    def idle(self):
+        """True when the key is up with nothing pending (no double-tap window, no repeat)"""
+        return not self.down and self.state != STATE_WAIT_DOUBLE
+
+    def press(self, binding, variants, now):
+        """Key went down - returns the binding to run right away (or None)"""
+        self.repeat_binding = None
+        self.fired = None
+        if self.state == STATE_WAIT_DOUBLE:
+            # Second tap inside the window
+            self.state = STATE_CONSUMED
+            return self._fire(self.variants[1], now)
+        self.binding = binding
+        self.variants = variants
+        if variants is None:
+            # Nothing to wait for - tap fires immediately
+            self.state = STATE_CONSUMED
+            return self._fire(binding, now)
+        self.state = STATE_DOWN
+        self.pressed_at = now
+        return None
+
+    def release(self, now):
+        """Key came up - returns the binding to run right away (or None)"""
+        self.repeat_binding = None
+        if self.state == STATE_DOWN:
+            if self.variants[1] is not None:
+                self.state = STATE_WAIT_DOUBLE
+                self.released_at = now
+                return None
+            self.state = STATE_IDLE
+            return self.binding
+        if self.state != STATE_WAIT_DOUBLE:
+            self.state = STATE_IDLE
+        return None
+
+    def poll(self, now):
+        """Hold timeout, end of the double-tap window and repeats - the binding to run now (or None)"""
+        if self.state == STATE_DOWN:
+            hold = self.variants[0]
+            if hold is not None and feathers3.ticks_diff(now, self.pressed_at) >= self.variants[2]:
+                self.state = STATE_CONSUMED
+                return self._fire(hold, now)
+            return None
+        if self.state == STATE_WAIT_DOUBLE:
+            if feathers3.ticks_diff(now, self.released_at) >= self.variants[3]:
+                self.state = STATE_IDLE
+                return self.binding
+            return None
+        return self._repeat_due(now)
+
+    def _fire(self, binding, now):
+        """Run `binding` now and repeat it while the key stays down (if it repeats)"""
+        self.fired = binding
+        delay = repeat_delay(binding[0], binding[2]) if binding else -1
+        if delay < 0:
+            self.repeat_binding = None
+        else:
+            self.repeat_binding = binding
+            self.repeat_at = feathers3.ticks_add(now, delay)
+            self.repeat_interval = repeat_interval(binding[2])
+        return binding
+
+    def _repeat_due(self, now):
+        if self.repeat_binding is None or feathers3.ticks_diff(now, self.repeat_at) < 0:
+            return None
+        self.repeat_at = feathers3.ticks_add(self.repeat_at, self.repeat_interval)
+        # After a long pass (display refresh, upload) don't replay the backlog
+        if feathers3.ticks_diff(now, self.repeat_at) > 0:
+            self.repeat_at = feathers3.ticks_add(now, self.repeat_interval)
+        return self.repeat_binding
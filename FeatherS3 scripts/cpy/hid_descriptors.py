@@ -0,0 +1,154 @@
+"""
+HID Descriptors
+Custom USB HID devices enabled by boot.py: an N-key-rollover bitmap keyboard and a
+high-resolution mouse (16 bit axes, wheel and horizontal pan with resolution multipliers)
+"""
+
+import usb_hid
+
+# Same report IDs as CircuitPython's default devices
+KEYBOARD_REPORT_ID = 1
+MOUSE_REPORT_ID = 2
+
+# NKRO keyboard report: modifier byte + one bit per keycode 0x00-0xDF (modifiers are 0xE0-0xE7)
+NKRO_BITMAP_KEYS = 0xE0
+NKRO_REPORT_SIZE = 1 + NKRO_BITMAP_KEYS // 8
+
+NKRO_KEYBOARD_DESCRIPTOR = bytes((
+    0x05, 0x01,        # Usage Page (Generic Desktop)
+    0x09, 0x06,        # Usage (Keyboard)
+    0xA1, 0x01,        # Collection (Application)
+    0x85, KEYBOARD_REPORT_ID,
+    # Modifiers: 8 x 1 bit
+    0x05, 0x07,        #   Usage Page (Keyboard/Keypad)
+    0x19, 0xE0,        #   Usage Minimum (Left Control)
+    0x29, 0xE7,        #   Usage Maximum (Right GUI)
+    0x15, 0x00,        #   Logical Minimum (0)
+    0x25, 0x01,        #   Logical Maximum (1)
+    0x75, 0x01,        #   Report Size (1)
+    0x95, 0x08,        #   Report Count (8)
+    0x81, 0x02,        #   Input (Data, Variable, Absolute)
+    # Key bitmap: 224 x 1 bit
+    0x19, 0x00,        #   Usage Minimum (0)
+    0x29, NKRO_BITMAP_KEYS - 1,  # Usage Maximum (0xDF)
+    0x95, NKRO_BITMAP_KEYS,      # Report Count (224)
+    0x81, 0x02,        #   Input (Data, Variable, Absolute)
+    # LEDs: 5 x 1 bit + 3 bit padding
+    0x05, 0x08,        #   Usage Page (LEDs)
+    0x19, 0x01,        #   Usage Minimum (Num Lock)
+    0x29, 0x05,        #   Usage Maximum (Kana)
+    0x95, 0x05,        #   Report Count (5)
+    0x91, 0x02,        #   Output (Data, Variable, Absolute)
+    0x75, 0x03,        #   Report Size (3)
+    0x95, 0x01,        #   Report Count (1)
+    0x91, 0x01,        #   Output (Constant)
+    0xC0,              # End Collection
+))
+
+# Mouse report: buttons, X, Y (16 bit), wheel (16 bit), AC pan (16 bit)
+HIRES_MOUSE_REPORT_SIZE = 9
+# Feature report: wheel and pan resolution multiplier (2 bit each) + padding
+HIRES_MOUSE_FEATURE_SIZE = 1
+# Counts per detent when the host enabled the multiplier (physical maximum below)
+WHEEL_MULTIPLIER = 120
+
+_MULTIPLIER_FEATURE = (
+    0x09, 0x48,        #     Usage (Resolution Multiplier)
+    0x15, 0x00,        #     Logical Minimum (0)
+    0x25, 0x01,        #     Logical Maximum (1)
+    0x35, 0x01,        #     Physical Minimum (1)
+    0x45, WHEEL_MULTIPLIER,  # Physical Maximum (120)
+    0x75, 0x02,        #     Report Size (2)
+    0x95, 0x01,        #     Report Count (1)
+    0xB1, 0x02,        #     Feature (Data, Variable, Absolute)
+    0x35, 0x00,        #     Physical Minimum (0)
+    0x45, 0x00,        #     Physical Maximum (0)
+)
+
+_AXIS_16 = (
+    0x16, 0x01, 0x80,  # Logical Minimum (-32767)
+    0x26, 0xFF, 0x7F,  # Logical Maximum (32767)
+    0x75, 0x10,        # Report Size (16)
+)
+
+HIRES_MOUSE_DESCRIPTOR = bytes((
+    0x05, 0x01,        # Usage Page (Generic Desktop)
+    0x09, 0x02,        # Usage (Mouse)
+    0xA1, 0x01,        # Collection (Application)
+    0x85, MOUSE_REPORT_ID,
+    0x09, 0x01,        #   Usage (Pointer)
+    0xA1, 0x00,        #   Collection (Physical)
+    # Buttons: 5 x 1 bit + 3 bit padding
+    0x05, 0x09,        #     Usage Page (Buttons)
+    0x19, 0x01,        #     Usage Minimum (1)
+    0x29, 0x05,        #     Usage Maximum (5)
+    0x15, 0x00,        #     Logical Minimum (0)
+    0x25, 0x01,        #     Logical Maximum (1)
+    0x75, 0x01,        #     Report Size (1)
+    0x95, 0x05,        #     Report Count (5)
+    0x81, 0x02,        #     Input (Data, Variable, Absolute)
+    0x75, 0x03,        #     Report Size (3)
+    0x95, 0x01,        #     Report Count (1)
+    0x81, 0x01,        #     Input (Constant)
+    # X, Y
+    0x05, 0x01,        #     Usage Page (Generic Desktop)
+    0x09, 0x30,        #     Usage (X)
+    0x09, 0x31,        #     Usage (Y)
+) + _AXIS_16 + (
+    0x95, 0x02,        #     Report Count (2)
+    0x81, 0x06,        #     Input (Data, Variable, Relative)
+    # Vertical wheel with its resolution multiplier
+    0xA1, 0x02,        #     Collection (Logical)
+) + _MULTIPLIER_FEATURE + (
+    0x09, 0x38,        #       Usage (Wheel)
+) + _AXIS_16 + (
+    0x95, 0x01,        #       Report Count (1)
+    0x81, 0x06,        #       Input (Data, Variable, Relative)
+    0xC0,              #     End Collection
+    # Horizontal pan with its resolution multiplier
+    0xA1, 0x02,        #     Collection (Logical)
+) + _MULTIPLIER_FEATURE + (
+    0x75, 0x04,        #       Report Size (4)
+    0x95, 0x01,        #       Report Count (1)
+    0xB1, 0x01,        #       Feature (Constant) - pad to a full byte
+    0x05, 0x0C,        #       Usage Page (Consumer)
+    0x0A, 0x38, 0x02,  #       Usage (AC Pan)
+) + _AXIS_16 + (
+    0x95, 0x01,        #       Report Count (1)
+    0x81, 0x06,        #       Input (Data, Variable, Relative)
+    0xC0,              #     End Collection
+    0xC0,              #   End Collection
+    0xC0,              # End Collection
+))
+
+def nkro_keyboard():
+    return usb_hid.Device(
+        report_descriptor=NKRO_KEYBOARD_DESCRIPTOR,
+        usage_page=0x01,
+        usage=0x06,
+        report_ids=(KEYBOARD_REPORT_ID,),
+        in_report_lengths=(NKRO_REPORT_SIZE,),
+        out_report_lengths=(1,),
+    )
+
+def hires_mouse():
+    # The "out" report receives the feature report the host writes to enable the multipliers
+    return usb_hid.Device(
+        report_descriptor=HIRES_MOUSE_DESCRIPTOR,
+        usage_page=0x01,
+        usage=0x02,
+        report_ids=(MOUSE_REPORT_ID,),
+        in_report_lengths=(HIRES_MOUSE_REPORT_SIZE,),
+        out_report_lengths=(HIRES_MOUSE_FEATURE_SIZE,),
+    )
+
+def build_devices(keyboard="nkro", mouse="hires"):
+    """HID devices for usb_hid.enable() - keyboard "nkro" or "boot", mouse "hires", "standard" or "none".
+    Consumer control is always included."""
+    devices = [nkro_keyboard() if keyboard == "nkro" else usb_hid.Device.KEYBOARD]
+    devices.append(usb_hid.Device.CONSUMER_CONTROL)
+    if mouse == "hires":
+        devices.append(hires_mouse())
+    elif mouse == "standard":
+        devices.append(usb_hid.Device.MOUSE)
+    return tuple(devices)
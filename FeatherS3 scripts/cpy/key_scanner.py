@@ -0,0 +1,123 @@
+"""
+Key Scanner
+Scans the buttons with keypad (direct pins, KeyMatrix or ShiftRegisterKeys) as declared in the
+settings.toml hardware profile - key events come from the background scanner instead of a
+Python loop over every pin, so 16-25 keys cost the main loop no more than 6
+"""
+
+import os
+import board
+import digitalio
+import keypad
+
+LAYOUT_DIRECT = "direct"    # One pin per key, shorted to ground
+LAYOUT_MATRIX = "matrix"    # keypad.KeyMatrix, key number = row * columns + column
+LAYOUT_SHIFT = "shift"      # keypad.ShiftRegisterKeys (74HC165 chain), key number = bit
+
+# The original six-button PadAwan wiring
+DEFAULT_PINS = "IO14,IO18,IO5,IO17,IO6,IO12"
+
+layout = LAYOUT_DIRECT
+key_count = 0
+
+_scanner = None
+_event = keypad.Event()   # Reused for every event - no allocation per key press
+_wake_outputs = []        # Matrix rows held low during light sleep
+_direct_pins = ()
+
+def _pin(name):
+    pin = getattr(board, name.strip(), None)
+    if pin is None:
+        raise ValueError(f"unknown pin: {name}")
+    return pin
+
+def _pins(names):
+    return tuple(_pin(name) for name in names.split(",") if name.strip())
+
+def _setting(name, default=None):
+    value = os.getenv(name)
+    return default if value is None else value
+
+def _create(kind):
+    """The keypad scanner of the settings.toml hardware profile:
+    PADAWAN_KEY_LAYOUT = "direct" | "matrix" | "shift"
+    direct: PADAWAN_KEY_PINS = "IO14,IO18,..."
+    matrix: PADAWAN_KEY_ROWS, PADAWAN_KEY_COLUMNS (pin lists), PADAWAN_KEY_DIODES = "col2row" | "row2col"
+    shift:  PADAWAN_KEY_CLOCK, PADAWAN_KEY_DATA, PADAWAN_KEY_LATCH, PADAWAN_KEY_COUNT,
+            PADAWAN_KEY_ACTIVE_HIGH = 0 | 1"""
+    if kind == LAYOUT_MATRIX:
+        return keypad.KeyMatrix(
+            _pins(_setting("PADAWAN_KEY_ROWS", "")),
+            _pins(_setting("PADAWAN_KEY_COLUMNS", "")),
+            columns_to_anodes=_setting("PADAWAN_KEY_DIODES", "col2row") != "row2col")
+    if kind == LAYOUT_SHIFT:
+        return keypad.ShiftRegisterKeys(
+            clock=_pin(_setting("PADAWAN_KEY_CLOCK", "")),
+            data=_pin(_setting("PADAWAN_KEY_DATA", "")),
+            latch=_pin(_setting("PADAWAN_KEY_LATCH", "")),
+            key_count=int(_setting("PADAWAN_KEY_COUNT", 8)),
+            value_when_pressed=bool(int(_setting("PADAWAN_KEY_ACTIVE_HIGH", 0))))
+    if kind != LAYOUT_DIRECT:
+        raise ValueError(f"unknown key layout: {kind}")
+    return _direct(_setting("PADAWAN_KEY_PINS", DEFAULT_PINS))
+
+def _direct(names):
+    global _direct_pins
+    pins = _pins(names)
+    scanner = keypad.Keys(pins, value_when_pressed=False, pull=True)
+    _direct_pins = pins
+    return scanner
+
+def start():
+    """Start scanning (again, after light sleep)"""
+    global _scanner, layout, key_count
+    for output in _wake_outputs:
+        output.deinit()
+    _wake_outputs.clear()
+    layout = _setting("PADAWAN_KEY_LAYOUT", LAYOUT_DIRECT)
+    try:
+        _scanner = _create(layout)
+    except Exception as e:
+        print(f"Key layout '{layout}' failed ({e}) - using the default pins")
+        layout = LAYOUT_DIRECT
+        _scanner = _direct(DEFAULT_PINS)
+    key_count = _scanner.key_count
+    print(f"Key scanner: {layout}, {key_count} keys")
+
+def stop():
+    global _scanner
+    if _scanner is not None:
+        _scanner.deinit()
+        _scanner = None
+
+def next_event():
+    """The next key event (key_number, pressed) or None. The event object is reused -
+    read it before asking for the next one."""
+    if _scanner is None or not _scanner.events.get_into(_event):
+        return None
+    return _event
+
+def overflowed():
+    """True (once) if key events were lost because the main loop fell behind"""
+    if _scanner is None or not _scanner.events.overflowed:
+        return False
+    _scanner.events.clear()
+    _scanner.reset()
+    return True
+
+def wake_pins():
+    """Pins that go low on a key press while the scanner is stopped, for light sleep alarms.
+    A matrix has its driven side held low until start(), shift registers cannot wake the board."""
+    if layout == LAYOUT_DIRECT:
+        return _direct_pins
+    if layout == LAYOUT_MATRIX:
+        rows = _pins(_setting("PADAWAN_KEY_ROWS", ""))
+        columns = _pins(_setting("PADAWAN_KEY_COLUMNS", ""))
+        if _setting("PADAWAN_KEY_DIODES", "col2row") == "row2col":
+            rows, columns = columns, rows
+        for pin in rows:
+            output = digitalio.DigitalInOut(pin)
+            output.switch_to_output(value=False)
+            _wake_outputs.append(output)
+        return columns
+    return ()
@@ -0,0 +1,108 @@
+"""
+Layer Stack
+Momentary, toggle and one-shot layers stacked on top of the base layer. The layer that serves
+each binding slot is resolved whenever the stack changes, so a key press is one list lookup
+no matter how many layers are active ("Transparent" bindings fall through to the layer below)
+"""
+
+import binconfig
+
+# How a layer got onto the stack
+MOMENTARY = 0   # Until the key that pushed it comes up
+TOGGLE = 1      # Until toggled off again
+ONESHOT = 2     # For the next action only
+
+MAX_DEPTH = 8
+
+# (layer, kind, owner) from bottom to top, layers are 1-based like current_layer in code.py
+entries = []
+# Index of the layer serving each binding slot, from the last resolve()
+effective = []
+_oneshot = False
+
+def clear():
+    global _oneshot
+    entries.clear()
+    _oneshot = False
+
+def _remove(i):
+    global _oneshot
+    entries.pop(i)
+    _oneshot = False
+    for entry in entries:
+        if entry[1] == ONESHOT:
+            _oneshot = True
+
+def push(layer, kind, owner=None):
+    """Put `layer` on top of the stack, returns True if the stack changed"""
+    global _oneshot
+    if len(entries) >= MAX_DEPTH:
+        print(f"Layer stack full - layer {layer} not activated")
+        return False
+    entries.append((layer, kind, owner))
+    if kind == ONESHOT:
+        _oneshot = True
+    return True
+
+def toggle(layer, owner=None):
+    """Remove a toggled `layer` from the stack or put it on top, returns True if the stack changed"""
+    for i in range(len(entries)):
+        if entries[i][0] == layer and entries[i][1] == TOGGLE:
+            _remove(i)
+            return True
+    return push(layer, TOGGLE, owner)
+
+def release(owner):
+    """Drop the momentary layers pushed by `owner`, returns True if the stack changed"""
+    changed = False
+    i = len(entries) - 1
+    while i >= 0:
+        if entries[i][1] == MOMENTARY and entries[i][2] == owner:
+            _remove(i)
+            changed = True
+        i -= 1
+    return changed
+
+def oneshot_pending():
+    return _oneshot
+
+def consume_oneshot():
+    """Drop the one-shot layers after the action they were for, returns True if the stack changed"""
+    changed = False
+    i = len(entries) - 1
+    while i >= 0:
+        if entries[i][1] == ONESHOT:
+            _remove(i)
+            changed = True
+        i -= 1
+    return changed
+
+def top(base_layer):
+    """Layer number shown to the user: the top of the stack or the base layer"""
+    return entries[-1][0] if entries else base_layer
+
+def resolve(config, base_layer):
+    """Recompute the serving layer index of every slot for base_layer plus the stack"""
+    effective.clear()
+    if config is None:
+        return
+    base_index = base_layer - 1
+    indices = [base_index]
+    for layer, _, _ in entries:
+        if 0 <= layer - 1 < config.layer_count and layer - 1 not in indices:
+            indices.append(layer - 1)
+    for slot in range(config.slots_per_layer):
+        serving = base_index
+        i = len(indices) - 1
+        while i > 0:
+            if config.binding_raw(indices[i], slot)[0] != binconfig.OP_TRANSPARENT:
+                serving = indices[i]
+                break
+            i -= 1
+        effective.append(serving)
+
+def layer_of(slot, default):
+    """Index of the layer serving `slot` (default if nothing has been resolved yet)"""
+    if slot < len(effective):
+        return effective[slot]
+    return default
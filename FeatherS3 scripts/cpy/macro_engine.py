@@ -0,0 +1,209 @@
+"""
+Macro Engine
+Plays multi-step macros (press, release, tap, type, wait, consumer code, layer switch) as
+cooperative jobs that advance on every main loop pass - several at once, without time.sleep
+"""
+
+import feathers3
+import nkro_keyboard
+import typing_engine
+
+# Step kinds of a compiled macro, each step is a (kind, argument) tuple
+STEP_PRESS = 0      # keycode tuple, held until released (or the macro ends)
+STEP_RELEASE = 1    # keycode tuple, empty = everything this macro holds
+STEP_TAP = 2        # keycode tuple, pressed and released
+STEP_TYPE = 3       # pre-encoded text reports, streamed through typing_engine
+STEP_WAIT = 4       # milliseconds
+STEP_CONSUMER = 5   # consumer control code
+STEP_LAYER = 6      # layer number, 0 = next layer
+
+STEP_NAMES = ("press", "release", "tap", "type", "wait", "consumer", "layer")
+
+MAX_JOBS = 8
+MAX_STEPS_PER_PASS = 32   # Immediate steps run back to back up to this limit
+
+# Hooks provided by code.py
+_keyboard = None
+_consumer_control = None
+_switch_layer = None
+
+def set_hooks(keyboard, consumer_control, switch_layer):
+    """switch_layer(layer) with layer 0 meaning "next layer" """
+    global _keyboard, _consumer_control, _switch_layer
+    _keyboard = keyboard
+    _consumer_control = consumer_control
+    _switch_layer = switch_layer
+
+def parse_steps(text):
+    """Steps from the compact form "press:Ctrl; tap:C; wait:100; type:Hallo" (the key field)"""
+    steps = []
+    for part in text.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, value = part.partition(":")
+        steps.append({name.strip().lower(): value.strip()})
+    return steps
+
+def compile_steps(steps, resolve_keys, resolve_consumer, encode_text):
+    """Turn JSON steps ([{"tap": "Ctrl+C"}, {"wait": 100}, ...]) into (kind, argument) tuples.
+    The resolvers raise ValueError for names they don't know."""
+    compiled = []
+    for step in steps:
+        if len(step) != 1:
+            raise ValueError(f"macro step needs exactly one entry: {step}")
+        for name, value in step.items():
+            if name not in STEP_NAMES:
+                raise ValueError(f"unknown macro step: {name}")
+            kind = STEP_NAMES.index(name)
+            if kind in (STEP_PRESS, STEP_TAP):
+                argument = tuple(resolve_keys(value))
+            elif kind == STEP_RELEASE:
+                argument = tuple(resolve_keys(value)) if value else ()
+            elif kind == STEP_TYPE:
+                argument = encode_text(str(value))
+                if argument is None:
+                    raise ValueError(f"text cannot be typed: {value!r}")
+            elif kind == STEP_WAIT:
+                argument = max(0, int(value))
+            elif kind == STEP_CONSUMER:
+                argument = resolve_consumer(value)
+            else:
+                argument = int(value) if value not in ("", "next") else 0
+            compiled.append((kind, argument))
+    return tuple(compiled)
+
+class MacroJob:
+    """One playing macro slot - steps is None while the slot is free"""
+
+    def __init__(self):
+        self.held = []
+        self.reset(None, None, 0)
+
+    def reset(self, steps, owner, started):
+        self.steps = steps
+        self.owner = owner
+        self.started = started
+        self.index = 0
+        self.wait_until = None
+        self.typing = False
+        self.held.clear()
+
+    def _release(self, keycodes):
+        nkro_keyboard.release(_keyboard, keycodes)
+        if keycodes is self.held:
+            self.held.clear()
+            return
+        for keycode in keycodes:
+            if keycode in self.held:
+                self.held.remove(keycode)
+
+    def finish(self):
+        """Release whatever this macro still holds"""
+        if self.typing and typing_engine.owner is self:
+            typing_engine.cancel()
+        if self.held:
+            self._release(self.held)
+
+    def advance(self, now):
+        """Run steps until one has to wait. Returns False when the macro is done."""
+        if self.wait_until is not None:
+            if feathers3.ticks_diff(now, self.wait_until) < 0:
+                return True
+            self.wait_until = None
+        if self.typing:
+            if typing_engine.owner is self:
+                return True
+            self.typing = False
+
+        budget = MAX_STEPS_PER_PASS
+        while self.index < len(self.steps) and budget:
+            kind, argument = self.steps[self.index]
+            if kind == STEP_TYPE:
+                if typing_engine.busy():
+                    # Another text is still typing - the keyboard report can only carry one
+                    return True
+                typing_engine.start(argument, self)
+                self.typing = True
+                self.index += 1
+                return True
+            self.index += 1
+            budget -= 1
+            if kind == STEP_PRESS:
+                for keycode in argument:
+                    self.held.append(keycode)
+                nkro_keyboard.press(_keyboard, argument)
+            elif kind == STEP_RELEASE:
+                self._release(argument or self.held)
+            elif kind == STEP_TAP:
+                nkro_keyboard.tap(_keyboard, argument)
+            elif kind == STEP_WAIT:
+                if argument:
+                    self.wait_until = feathers3.ticks_add(now, argument)
+                    return True
+            elif kind == STEP_CONSUMER:
+                _consumer_control.press(argument)
+                _consumer_control.release()
+            elif kind == STEP_LAYER:
+                _switch_layer(argument)
+        return self.index < len(self.steps)
+
+# Fixed slots instead of a growing list - starting and stopping a macro allocates nothing
+jobs = tuple(MacroJob() for _ in range(MAX_JOBS))
+_running = 0
+_started = 0
+
+def find(owner):
+    for job in jobs:
+        if job.steps is not None and job.owner == owner:
+            return job
+    return None
+
+def start(steps, owner=None):
+    """Start playing a compiled macro next to the ones already running"""
+    global _running, _started
+    if _running >= MAX_JOBS:
+        print("Macro limit reached - stopping the oldest macro")
+        oldest = None
+        for job in jobs:
+            if oldest is None or job.started < oldest.started:
+                oldest = job
+        stop(oldest)
+    for job in jobs:
+        if job.steps is None:
+            _started += 1
+            job.reset(steps, owner, _started)
+            _running += 1
+            return
+
+def stop(job):
+    global _running
+    job.finish()
+    job.reset(None, None, 0)
+    _running -= 1
+
+def stop_all():
+    for job in jobs:
+        if job.steps is not None:
+            stop(job)
+
+def busy():
+    return _running > 0
+
+def poll(now=None):
+    """Advance all running macros. Call once per main loop pass, returns True while any is running."""
+    if not _running:
+        return False
+    if now is None:
+        now = feathers3.ticks_ms()
+    for job in jobs:
+        if job.steps is None:
+            continue
+        try:
+            running = job.advance(now)
+        except Exception as e:
+            print(f"Macro step failed: {e}")
+            running = False
+        if not running:
+            stop(job)
+    return _running > 0
@@ -0,0 +1,167 @@
+"""
+Memory Monitor
+Heap low-water marks, garbage collection count and allocation per named code region
+(begin/end brackets) - reported by the MEM command to find allocating hot paths and to size
+the largest config a pad can hold. ALLOC_CHECK measures whole main loop passes and fails if an
+idle pass or a pass that only handled input allocated anything
+"""
+
+import array
+import gc
+import event_trace
+
+# gc.mem_alloc()/mem_free() walk the heap - regions are only measured while tracking is on
+tracking = False
+
+heap_size = 0
+min_free = 0
+max_alloc = 0
+collections = 0     # Detected by mem_alloc going down between samples (plus collect() calls)
+samples = 0
+
+_last_alloc = 0
+# name -> [runs, total bytes, max bytes, runs spoiled by a collection]
+regions = {}
+_open = {}
+
+# What a main loop pass did (bits, code.py sets them) - ALLOC_CHECK judges idle and input passes,
+# timer and host passes (display text, battery sample, serial lines) are only reported
+WORK_INPUT = 1      # Key / knob events, held keys, typing, macros, scrolling
+WORK_TIMER = 2      # Display, battery or heartbeat timer
+WORK_HOST = 4       # Serial command or upload line
+PASS_KINDS = ("idle", "input", "timer", "host")
+
+check_remaining = 0     # Passes the running ALLOC_CHECK still measures
+# passes, allocating passes, max bytes per pass - for each of PASS_KINDS
+check_results = array.array("L", [0] * (3 * len(PASS_KINDS)))
+_pass_start = None
+
+def reset():
+    global heap_size, min_free, max_alloc, collections, samples, _last_alloc
+    free = gc.mem_free()
+    alloc = gc.mem_alloc()
+    heap_size = free + alloc
+    min_free = free
+    max_alloc = alloc
+    collections = 0
+    samples = 0
+    _last_alloc = alloc
+    regions.clear()
+    _open.clear()
+
+def sample():
+    """Update the watermarks, returns True if a collection ran since the last sample"""
+    global min_free, max_alloc, collections, samples, _last_alloc
+    alloc = gc.mem_alloc()
+    free = gc.mem_free()
+    samples += 1
+    if free < min_free:
+        min_free = free
+    if alloc > max_alloc:
+        max_alloc = alloc
+    collected = alloc < _last_alloc
+    if collected:
+        collections += 1
+        event_trace.instant(event_trace.GC)
+    _last_alloc = alloc
+    return collected
+
+def collect():
+    """gc.collect() that is counted"""
+    global collections, _last_alloc
+    event_trace.begin(event_trace.GC)
+    gc.collect()
+    event_trace.end(event_trace.GC)
+    collections += 1
+    _last_alloc = gc.mem_alloc()
+
+def begin(name):
+    """Start measuring the allocations of region `name` (no-op unless tracking)"""
+    if tracking:
+        _open[name] = gc.mem_alloc()
+
+def end(name):
+    """Finish region `name` started by begin()"""
+    if not tracking:
+        return
+    start = _open.pop(name, None)
+    if start is None:
+        return
+    _record(name, gc.mem_alloc() - start)
+
+def _record(name, used):
+    region = regions.get(name)
+    if region is None:
+        region = [0, 0, 0, 0]
+        regions[name] = region
+    region[0] += 1
+    if used < 0:
+        # A collection ran inside the region - the difference means nothing
+        region[3] += 1
+        return
+    region[1] += used
+    if used > region[2]:
+        region[2] = used
+
+def start_check(passes):
+    """Measure the next `passes` main loop passes"""
+    global check_remaining
+    for i in range(len(check_results)):
+        check_results[i] = 0
+    check_remaining = max(1, passes)
+
+def start_pass():
+    """Call at the start of the work of a main loop pass (the "pass" region while tracking)"""
+    global _pass_start
+    _pass_start = gc.mem_alloc() if tracking or check_remaining else None
+
+def _kind(work):
+    if work & WORK_HOST:
+        return 3
+    if work & WORK_TIMER:
+        return 2
+    return 1 if work & WORK_INPUT else 0
+
+def end_pass(work):
+    """Call when the pass is over with its WORK_* bits, returns True when an ALLOC_CHECK just finished"""
+    global check_remaining
+    if _pass_start is None:
+        return False
+    used = gc.mem_alloc() - _pass_start
+    if tracking:
+        _record("pass", used)
+    if not check_remaining:
+        return False
+    i = 3 * _kind(work)
+    check_results[i] += 1
+    if used:
+        # Negative: a collection ran, which only an allocation can trigger
+        check_results[i + 1] += 1
+        if used > check_results[i + 2]:
+            check_results[i + 2] = used
+    check_remaining -= 1
+    return check_remaining == 0
+
+def check_passed():
+    """No idle pass and no input pass allocated"""
+    return check_results[1] == 0 and check_results[4] == 0
+
+def format_check():
+    """ALLOC_CHECK:result=PASS|FAIL,idle=<passes>/<allocating>/<max bytes>,input=..,timer=..,host=.."""
+    parts = ["result=" + ("PASS" if check_passed() else "FAIL")]
+    for k in range(len(PASS_KINDS)):
+        i = 3 * k
+        parts.append(f"{PASS_KINDS[k]}={check_results[i]}/{check_results[i + 1]}/{check_results[i + 2]}")
+    return "ALLOC_CHECK:" + ",".join(parts)
+
+def format_report(config_bytes=0):
+    """MEM:free=..,alloc=..,heap=..,min_free=..,max_alloc=..,collections=..,config_bytes=..,tracking=0|1,
+    regions=<name>:<runs>/<total bytes>/<max bytes>/<spoiled runs>|..."""
+    sample()
+    parts = [f"free={gc.mem_free()}", f"alloc={gc.mem_alloc()}", f"heap={heap_size}",
+             f"min_free={min_free}", f"max_alloc={max_alloc}", f"collections={collections}",
+             f"config_bytes={config_bytes}", f"tracking={int(tracking)}"]
+    parts.append("regions=" + "|".join(f"{name}:{r[0]}/{r[1]}/{r[2]}/{r[3]}" for name, r in regions.items()))
+    return "MEM:" + ",".join(parts)
+
+reset()
@@ -0,0 +1,103 @@
+"""
+NKRO Keyboard
+Drop-in replacement for adafruit_hid.keyboard.Keyboard that drives the bitmap keyboard from
+hid_descriptors, so any number of keys can be down at once
+"""
+
+import os
+import time
+from adafruit_hid import find_device
+from adafruit_hid.keyboard import Keyboard
+import hid_descriptors
+
+REPORT_SIZE = hid_descriptors.NKRO_REPORT_SIZE
+
+class NKROKeyboard:
+    """Same press/release/send API as adafruit_hid's Keyboard"""
+
+    REPORT_SIZE = REPORT_SIZE
+
+    def __init__(self, devices):
+        self._keyboard_device = find_device(devices, usage_page=0x1, usage=0x06)
+        # Byte 0: modifier bits, bytes 1..: one bit per keycode
+        self.report = bytearray(REPORT_SIZE)
+        try:
+            self.release_all()
+        except OSError:
+            # Host not ready yet
+            time.sleep(1)
+            self.release_all()
+
+    def _set(self, keycode, down):
+        if 0xE0 <= keycode <= 0xE7:
+            index, bit = 0, 1 << (keycode - 0xE0)
+        elif keycode < hid_descriptors.NKRO_BITMAP_KEYS:
+            index, bit = 1 + (keycode >> 3), 1 << (keycode & 7)
+        else:
+            raise ValueError(f"Keycode {keycode} not supported")
+        if down:
+            self.report[index] |= bit
+        else:
+            self.report[index] &= ~bit
+
+    def press(self, *keycodes):
+        self.press_keys(keycodes)
+
+    def release(self, *keycodes):
+        self.release_keys(keycodes)
+
+    def press_keys(self, keycodes):
+        """press() for a prebuilt keycode tuple - no *keycodes tuple is allocated per call"""
+        for keycode in keycodes:
+            self._set(keycode, True)
+        self._keyboard_device.send_report(self.report)
+
+    def release_keys(self, keycodes):
+        for keycode in keycodes:
+            self._set(keycode, False)
+        self._keyboard_device.send_report(self.report)
+
+    def release_all(self):
+        for i in range(REPORT_SIZE):
+            self.report[i] = 0
+        self._keyboard_device.send_report(self.report)
+
+    def send(self, *keycodes):
+        self.press(*keycodes)
+        self.release_all()
+
+    @property
+    def led_status(self):
+        return self._keyboard_device.last_received_report
+
+    def led_on(self, led_code):
+        status = self.led_status
+        return bool(status and status[0] & led_code)
+
+def press(keyboard, keycodes):
+    """Press a keycode tuple (without allocating on an NKROKeyboard)"""
+    if isinstance(keyboard, NKROKeyboard):
+        keyboard.press_keys(keycodes)
+    else:
+        keyboard.press(*keycodes)
+
+def release(keyboard, keycodes):
+    if isinstance(keyboard, NKROKeyboard):
+        keyboard.release_keys(keycodes)
+    else:
+        keyboard.release(*keycodes)
+
+def tap(keyboard, keycodes):
+    """Press and release a keycode tuple (without allocating on an NKROKeyboard)"""
+    press(keyboard, keycodes)
+    release(keyboard, keycodes)
+
+def create_keyboard(devices):
+    """NKROKeyboard when boot.py enabled the bitmap keyboard, otherwise the standard 6KRO Keyboard"""
+    if os.getenv("PADAWAN_HID_KEYBOARD", "nkro") == "nkro":
+        try:
+            return NKROKeyboard(devices)
+        except ValueError as e:
+            # Report length mismatch - boot.py fell back to the default keyboard (or was not reloaded yet)
+            print(f"NKRO keyboard not available ({e}) - using 6-key rollover")
+    return Keyboard(devices)
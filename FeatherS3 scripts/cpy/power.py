@@ -0,0 +1,125 @@
+"""
+Idle Power Management
+Stretches the main loop interval, lowers the CPU clock, sleeps the display and finally
+enters light sleep when the pad has not been touched for a while
+"""
+
+import microcontroller
+import feathers3
+
+# Idle stages (each one includes the savings of the previous ones)
+STAGE_ACTIVE = 0      # Full scan rate
+STAGE_IDLE = 1        # Longer loop interval
+STAGE_LOW_POWER = 2   # Reduced CPU clock, display asleep, battery/display timers paused
+STAGE_SLEEP = 3       # Light sleep until a button or encoder pin changes (battery only)
+
+STAGE_NAMES = ("active", "idle", "low_power", "sleep")
+# Built once - a key press that wakes the pad must not format a string
+_STAGE_MESSAGES = tuple(tuple(f"Power: {old} -> {new}" for new in STAGE_NAMES) for old in STAGE_NAMES)
+
+# Defaults, overridable through the "power" section of the config
+enabled = True
+idle_after_ms = 30 * 1000
+low_power_after_ms = 2 * 60 * 1000
+sleep_after_ms = 10 * 60 * 1000
+sleep_on_usb = False   # Light sleep drops the USB connection, so only sleep on battery by default
+
+# Main loop sleep per stage in seconds (STAGE_SLEEP never gets here, it blocks in light sleep)
+LOOP_INTERVALS = (0.001, 0.01, 0.05, 0.05)
+LOW_POWER_CPU_FREQUENCY = 80000000
+
+stage = STAGE_ACTIVE
+loop_interval = LOOP_INTERVALS[STAGE_ACTIVE]
+last_activity = feathers3.ticks_ms()
+full_cpu_frequency = None
+
+# Hooks provided by code.py
+_display_sleep = None
+_display_wake = None
+_light_sleep = None
+
+def set_hooks(display_sleep=None, display_wake=None, light_sleep=None):
+    """Register the callbacks used to sleep/wake the display and to enter light sleep.
+    light_sleep() must block until an input alarm fires."""
+    global _display_sleep, _display_wake, _light_sleep
+    _display_sleep = display_sleep
+    _display_wake = display_wake
+    _light_sleep = light_sleep
+
+def configure(power_config):
+    """Apply the "power" section of the config (timeouts in seconds, 0 disables a stage)"""
+    global enabled, idle_after_ms, low_power_after_ms, sleep_after_ms, sleep_on_usb
+    if not power_config:
+        return
+    enabled = power_config.get("enabled", enabled)
+    if "idleAfter" in power_config:
+        idle_after_ms = int(power_config["idleAfter"] * 1000)
+    if "lowPowerAfter" in power_config:
+        low_power_after_ms = int(power_config["lowPowerAfter"] * 1000)
+    if "sleepAfter" in power_config:
+        sleep_after_ms = int(power_config["sleepAfter"] * 1000)
+    sleep_on_usb = power_config.get("sleepOnUsb", sleep_on_usb)
+    print(f"Power settings - Enabled: {enabled}, Idle: {idle_after_ms}ms, Low power: {low_power_after_ms}ms, Sleep: {sleep_after_ms}ms")
+    note_activity()
+
+def _set_cpu_frequency(frequency):
+    try:
+        if microcontroller.cpu.frequency != frequency:
+            microcontroller.cpu.frequency = frequency
+    except Exception as e:
+        # Not every port allows changing the clock at runtime
+        print(f"CPU frequency change failed: {e}")
+
+def _enter_stage(new_stage):
+    global stage, loop_interval, full_cpu_frequency
+    old_stage = stage
+    stage = new_stage
+    loop_interval = LOOP_INTERVALS[new_stage]
+
+    if new_stage >= STAGE_LOW_POWER > old_stage:
+        if full_cpu_frequency is None:
+            full_cpu_frequency = microcontroller.cpu.frequency
+        _set_cpu_frequency(LOW_POWER_CPU_FREQUENCY)
+        if _display_sleep is not None:
+            _display_sleep()
+    elif old_stage >= STAGE_LOW_POWER > new_stage:
+        if full_cpu_frequency is not None:
+            _set_cpu_frequency(full_cpu_frequency)
+        if _display_wake is not None:
+            _display_wake()
+    print(_STAGE_MESSAGES[old_stage][new_stage])
+
+def note_activity(now=None):
+    """Call on every input event - restores full scan rate immediately"""
+    global last_activity
+    last_activity = feathers3.ticks_ms() if now is None else now
+    if stage != STAGE_ACTIVE:
+        _enter_stage(STAGE_ACTIVE)
+
+def _sleep_allowed():
+    return _light_sleep is not None and sleep_after_ms > 0 and (sleep_on_usb or not feathers3.get_vbus_present())
+
+def update(now=None):
+    """Advance the idle governor, returns the current stage. Call once per main loop pass."""
+    if not enabled:
+        return stage
+    if now is None:
+        now = feathers3.ticks_ms()
+    idle_ms = feathers3.ticks_diff(now, last_activity)
+
+    if sleep_after_ms > 0 and idle_ms >= sleep_after_ms and _sleep_allowed():
+        _enter_stage(STAGE_SLEEP)
+        _light_sleep()
+        # Whatever woke us counts as activity
+        note_activity()
+    elif low_power_after_ms > 0 and idle_ms >= low_power_after_ms:
+        if stage != STAGE_LOW_POWER:
+            _enter_stage(STAGE_LOW_POWER)
+    elif idle_after_ms > 0 and idle_ms >= idle_after_ms:
+        if stage != STAGE_IDLE:
+            _enter_stage(STAGE_IDLE)
+    return stage
+
+def timers_paused():
+    """Battery and display timers are paused while the display is asleep"""
+    return stage >= STAGE_LOW_POWER
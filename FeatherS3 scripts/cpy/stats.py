@@ -0,0 +1,176 @@
+"""
+Runtime Statistics
+Main loop pass durations and press-to-report latency as fixed-bucket histograms in preallocated
+arrays, plus counters for HID reports, USB bytes, SD reads and GC runs - dumped by STATS
+"""
+
+import array
+import supervisor
+import event_trace
+import mem_monitor
+
+# supervisor.ticks_ms() wraps around at 2**29 ms - elapsed times are masked to stay positive
+_TICKS_MASK = (1 << 29) - 1
+
+# Histogram bucket i counts values <= BUCKET_LIMITS_MS[i], the last bucket everything above
+BUCKET_LIMITS_MS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+_BUCKETS = len(BUCKET_LIMITS_MS) + 1
+
+# A report this long after a press is not its answer (the press didn't send anything)
+LATENCY_TIMEOUT_MS = 1000
+# mem_monitor.sample() walks the heap - look for collections only every few passes
+GC_CHECK_PASSES = 16
+
+pass_hist = array.array("L", [0] * _BUCKETS)
+latency_hist = array.array("L", [0] * _BUCKETS)
+# passes, pass max ms, latency samples, latency max ms, HID reports, USB rx bytes, USB tx bytes, SD reads, GC runs
+counters = array.array("L", [0] * 9)
+PASSES = 0
+PASS_MAX = 1
+LATENCIES = 2
+LATENCY_MAX = 3
+HID_REPORTS = 4
+USB_RX = 5
+USB_TX = 6
+SD_READS = 7
+GC_RUNS = 8
+COUNTER_NAMES = ("passes", "pass_max_ms", "latencies", "latency_max_ms", "hid_reports",
+                 "usb_rx_bytes", "usb_tx_bytes", "sd_reads", "gc_runs")
+
+_reset_at = supervisor.ticks_ms()
+_pass_start = None
+_press_at = None
+
+def _bucket(ms):
+    for i in range(_BUCKETS - 1):
+        if ms <= BUCKET_LIMITS_MS[i]:
+            return i
+    return _BUCKETS - 1
+
+def reset():
+    global _reset_at, _pass_start, _press_at
+    for i in range(_BUCKETS):
+        pass_hist[i] = 0
+        latency_hist[i] = 0
+    for i in range(len(counters)):
+        counters[i] = 0
+    _reset_at = supervisor.ticks_ms()
+    _pass_start = None
+    _press_at = None
+
+def start_pass():
+    """Call at the start of the work of a main loop pass (after its sleep)"""
+    global _pass_start
+    _pass_start = supervisor.ticks_ms()
+
+def end_pass():
+    """Call when the pass is over (before the next sleep)"""
+    if _pass_start is None:
+        return
+    ms = (supervisor.ticks_ms() - _pass_start) & _TICKS_MASK
+    pass_hist[_bucket(ms)] += 1
+    counters[PASSES] += 1
+    if ms > counters[PASS_MAX]:
+        counters[PASS_MAX] = ms
+    if counters[PASSES] % GC_CHECK_PASSES == 0 and mem_monitor.sample():
+        counters[GC_RUNS] += 1
+
+def note_press(timestamp):
+    """A key went down at `timestamp` (ticks_ms, e.g. keypad Event.timestamp)"""
+    global _press_at
+    _press_at = timestamp
+
+def note_report():
+    """A HID report went out - the first one after a press closes its latency sample"""
+    global _press_at
+    counters[HID_REPORTS] += 1
+    if _press_at is None:
+        return
+    ms = (supervisor.ticks_ms() - _press_at) & _TICKS_MASK
+    _press_at = None
+    if ms > LATENCY_TIMEOUT_MS:
+        return
+    latency_hist[_bucket(ms)] += 1
+    counters[LATENCIES] += 1
+    if ms > counters[LATENCY_MAX]:
+        counters[LATENCY_MAX] = ms
+
+def note_sd_read():
+    counters[SD_READS] += 1
+
+def _format_hist(hist):
+    parts = []
+    for i in range(_BUCKETS):
+        if hist[i]:
+            label = BUCKET_LIMITS_MS[i] if i < _BUCKETS - 1 else "inf"
+            parts.append(f"{label}:{hist[i]}")
+    return "|".join(parts)
+
+def format_report():
+    """STATS:uptime_ms=..,passes=..,...,pass_hist=<limit ms>:<count>|..,latency_hist=.."""
+    parts = [f"uptime_ms={(supervisor.ticks_ms() - _reset_at) & _TICKS_MASK}"]
+    for i in range(len(counters)):
+        parts.append(f"{COUNTER_NAMES[i]}={counters[i]}")
+    parts.append("pass_hist=" + _format_hist(pass_hist))
+    parts.append("latency_hist=" + _format_hist(latency_hist))
+    return "STATS:" + ",".join(parts)
+
+class CountingDevice:
+    """usb_hid.Device wrapper that counts the reports it sends"""
+
+    def __init__(self, device):
+        self._device = device
+        self.usage_page = device.usage_page
+        self.usage = device.usage
+
+    def send_report(self, report, report_id=None):
+        if report_id is None:
+            self._device.send_report(report)
+        else:
+            self._device.send_report(report, report_id)
+        note_report()
+        event_trace.instant(event_trace.HID_REPORT, self.usage)
+
+    def get_last_received_report(self, report_id=None):
+        if report_id is None:
+            return self._device.get_last_received_report()
+        return self._device.get_last_received_report(report_id)
+
+    @property
+    def last_received_report(self):
+        # Keyboard.led_status / NKROKeyboard.led_status read the LED report through this
+        return self._device.last_received_report
+
+def count_devices(devices):
+    """The HID devices wrapped to count reports (pass these to Keyboard, ConsumerControl, ...)"""
+    return [CountingDevice(device) for device in devices]
+
+class CountingSerial:
+    """usb_cdc.Serial wrapper that counts the bytes read and written"""
+
+    def __init__(self, serial):
+        self._serial = serial
+
+    @property
+    def in_waiting(self):
+        return self._serial.in_waiting
+
+    def readline(self):
+        line = self._serial.readline()
+        if line:
+            counters[USB_RX] += len(line)
+        return line
+
+    def read(self, size=1):
+        data = self._serial.read(size)
+        if data:
+            counters[USB_RX] += len(data)
+        return data
+
+    def write(self, data):
+        written = self._serial.write(data)
+        counters[USB_TX] += written or 0
+        return written
+
+    def flush(self):
+        self._serial.flush()
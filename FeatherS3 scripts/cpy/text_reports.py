@@ -0,0 +1,69 @@
+"""
+Text Report Encoder
+Turns "Type Text" macros into ready-made keyboard reports once at config load, so a key
+press only streams bytes to the host instead of looking up every character again
+"""
+
+# Boot keyboard report: modifier byte, reserved byte, six key slots.
+# Keyboards with a REPORT_SIZE attribute (nkro_keyboard) use modifier byte + key bitmap instead.
+REPORT_SIZE = 8
+
+def report_size(keyboard):
+    return getattr(keyboard, "REPORT_SIZE", REPORT_SIZE)
+
+def _modifier_bit(keycode):
+    return 1 << (keycode - 0xE0)
+
+def _append(layout, reports, size, keycode, altgr):
+    """Append one press report and the release report - same keys as KeyboardLayoutBase._write"""
+    if keycode == 0:
+        raise ValueError("No keycode available for character.")
+    modifier = 0
+    if altgr:
+        modifier |= _modifier_bit(layout.RIGHT_ALT_CODE)
+    if keycode & layout.SHIFT_FLAG:
+        keycode &= ~layout.SHIFT_FLAG
+        modifier |= _modifier_bit(layout.SHIFT_CODE)
+    start = len(reports)
+    reports.extend(bytes(2 * size))
+    reports[start] = modifier
+    if size == REPORT_SIZE:
+        reports[start + 2] = keycode
+    else:
+        reports[start + 1 + (keycode >> 3)] = 1 << (keycode & 7)
+
+def encode(layout, text):
+    """Press/release report stream for `text` (None if a character cannot be typed with `layout`).
+    Follows the character handling of KeyboardLayoutBase.write including AltGr and dead keys."""
+    size = report_size(layout.keyboard)
+    reports = bytearray()
+    try:
+        for char in text:
+            keycode = layout._char_to_keycode(char)
+            if keycode > 0:
+                _append(layout, reports, size, keycode, char in layout.NEED_ALTGR)
+            elif ord(char) in layout.COMBINED_KEYS:
+                # Dead key first, then the base character
+                cchar = layout.COMBINED_KEYS[ord(char)]
+                _append(layout, reports, size, cchar >> 8, cchar & layout.ALTGR_FLAG)
+                char = chr(cchar & 0xFF & (~layout.ALTGR_FLAG))
+                _append(layout, reports, size, layout._char_to_keycode(char), False)
+            else:
+                return None
+    except ValueError:
+        return None
+    return reports
+
+def split(reports, size):
+    """The report stream as a tuple of one memoryview per report - built once at config load, so
+    sending a report needs no slice (each slice of a memoryview is a new heap object)"""
+    view = memoryview(reports)
+    return tuple(view[start:start + size] for start in range(0, len(reports), size))
+
+def send(keyboard, reports):
+    """Stream a pre-encoded report sequence to the keyboard device"""
+    device = keyboard._keyboard_device
+    size = report_size(keyboard)
+    view = memoryview(reports)
+    for start in range(0, len(reports), size):
+        device.send_report(view[start:start + size])
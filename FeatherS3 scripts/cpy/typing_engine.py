@@ -0,0 +1,151 @@
+"""
+Typing Engine
+Streams pre-encoded keyboard reports (see text_reports) over several main loop passes with a
+configurable pace, so long text macros neither block the pad nor overrun slow hosts.
+Report streams split with text_reports.split are sent without allocating anything
+"""
+
+import feathers3
+import text_reports
+
+
+# Defaults, overridable through the "typing" section of the config
+report_interval_ms = 0   # Pause between two reports, 0 = as fast as the host polls the endpoint
+reports_per_pass = 16    # Reports sent per main loop pass when unpaced (keeps the inputs responsive)
+
+# Text used by the host benchmark - same keys on DE and US layouts (no y/z, no symbols)
+BENCHMARK_PATTERN = "abcdefghijklmnopqrstuvwx0123456789"
+
+_device = None
+_report_size = text_reports.REPORT_SIZE
+_release_report = bytes(_report_size)
+# The keyboard's own report (keys held by other bindings, hold-to-repeat) and the buffer a text
+# report is merged into - a text report alone would release them on the host
+_keyboard_report = bytearray(_report_size)
+_merged = bytearray(_report_size)
+
+# The running job: one report per entry, _position = index of the next report
+_reports = None
+_position = 0
+_interval_ms = 0
+_next_due = 0
+_started = 0
+_on_done = None
+owner = None
+
+def set_keyboard(keyboard):
+    """Send through the HID device of this adafruit_hid Keyboard"""
+    global _device, _report_size, _release_report, _keyboard_report, _merged
+    _device = keyboard._keyboard_device
+    _report_size = text_reports.report_size(keyboard)
+    _release_report = bytes(_report_size)
+    _keyboard_report = keyboard.report
+    _merged = bytearray(_report_size)
+
+def _send(report):
+    """Send a text report with the keys the keyboard holds merged in"""
+    if _keyboard_report == _release_report:
+        _device.send_report(report)
+        return
+    for i in range(_report_size):
+        _merged[i] = _keyboard_report[i]
+    _merged[0] |= report[0]
+    if _report_size == text_reports.REPORT_SIZE:
+        # Boot report: the text key goes into a free slot (unless it is held already)
+        keycode = report[2]
+        if keycode:
+            for i in range(2, _report_size):
+                if _merged[i] == keycode:
+                    break
+                if not _merged[i]:
+                    _merged[i] = keycode
+                    break
+    else:
+        for i in range(1, _report_size):
+            _merged[i] |= report[i]
+    _device.send_report(_merged)
+
+def configure(typing_config):
+    """Apply the "typing" section of the config"""
+    global report_interval_ms, reports_per_pass
+    if not typing_config:
+        return
+    report_interval_ms = max(0, int(typing_config.get("reportInterval", report_interval_ms)))
+    reports_per_pass = max(1, int(typing_config.get("reportsPerPass", reports_per_pass)))
+    print(f"Typing settings - Report interval: {report_interval_ms}ms, Reports per pass: {reports_per_pass}")
+
+def busy():
+    return _reports is not None
+
+def prepare(reports):
+    """Split an encoded report stream (text_reports.encode) for start() - do it at config load"""
+    return text_reports.split(reports, _report_size)
+
+def start(reports, owner_id=None, interval_ms=None, on_done=None):
+    """Start typing a report stream (from prepare(), or the encoded bytes), replacing a running one.
+    on_done(elapsed_ms, completed) is called when the stream ends or gets cancelled."""
+    global _reports, _position, _interval_ms, _next_due, _started, _on_done, owner
+    if _reports is not None:
+        cancel()
+    if not isinstance(reports, tuple):
+        reports = prepare(reports)
+    _reports = reports
+    _position = 0
+    _interval_ms = report_interval_ms if interval_ms is None else max(0, int(interval_ms))
+    _started = _next_due = feathers3.ticks_ms()
+    _on_done = on_done
+    owner = owner_id
+
+def _finish(completed):
+    global _reports, _on_done, owner
+    callback = _on_done
+    elapsed = feathers3.ticks_diff(feathers3.ticks_ms(), _started)
+    _reports = _on_done = owner = None
+    if callback is not None:
+        callback(elapsed, completed)
+
+def cancel():
+    """Stop the running stream - releases a key that is still down"""
+    if _reports is None:
+        return
+    if _position % 2:
+        try:
+            _send(_release_report)
+        except OSError as e:
+            print(f"Typing release failed: {e}")
+    print(f"Typing cancelled after {_position // 2} characters")
+    _finish(False)
+
+def poll(now=None):
+    """Send the reports that are due. Call once per main loop pass, returns True while typing."""
+    global _position, _next_due
+    if _reports is None:
+        return False
+    if now is None:
+        now = feathers3.ticks_ms()
+    length = len(_reports)
+    try:
+        if _interval_ms:
+            # Paced: one report per interval
+            if feathers3.ticks_diff(now, _next_due) >= 0:
+                _send(_reports[_position])
+                _position += 1
+                _next_due = feathers3.ticks_add(now, _interval_ms)
+        else:
+            end = min(length, _position + reports_per_pass)
+            while _position < end:
+                _send(_reports[_position])
+                _position += 1
+    except OSError as e:
+        # Host went away (USB unplugged/suspended)
+        print(f"Typing stopped: {e}")
+        _finish(False)
+        return False
+    if _position >= length:
+        _finish(True)
+        return False
+    return True
+
+def benchmark_text(repeats=1):
+    """Benchmark pattern repeated `repeats` times, newline terminated"""
+    return BENCHMARK_PATTERN * repeats + "\n"
@@ -0,0 +1,122 @@
+"""
+Wheel Mouse
+Scrolls with real HID mouse-wheel reports instead of arrow keys. Knob steps are batched and
+sent once per main loop pass, in high resolution when the host enabled the wheel multiplier
+of the hid_descriptors mouse
+"""
+
+import os
+import struct
+import supervisor
+from adafruit_hid import find_device
+import hid_descriptors
+
+# Defaults, overridable through the "scroll" section of the config
+lines_per_step = 1     # Wheel detents per knob step (standard resolution)
+hires_step = 120       # Counts per knob step when the multiplier is on (120 = one line, 30 = a quarter)
+
+MODE_NONE = 0          # No mouse interface - callers fall back to arrow keys
+MODE_STANDARD = 1      # CircuitPython mouse: buttons, x, y, wheel (8 bit), no pan
+MODE_HIRES = 2         # hid_descriptors mouse: buttons, x, y, wheel, pan (16 bit each)
+
+_device = None
+_mode = MODE_NONE
+_report = None
+
+# Steps waiting for the next flush (positive = up / right)
+_pending_wheel = 0
+_pending_pan = 0
+
+# Multipliers negotiated by the host through the Resolution Multiplier feature report. The device
+# returns a report only once per SET_REPORT (None in between), so it is read on every flush and
+# the last value is kept - until USB connects anew, the next host may never set it (KVM, BIOS)
+_wheel_multiplier = 1
+_pan_multiplier = 1
+_usb_connected = True
+
+def configure(scroll_config):
+    """Apply the "scroll" section of the config"""
+    global lines_per_step, hires_step
+    if not scroll_config:
+        return
+    lines_per_step = max(1, int(scroll_config.get("linesPerStep", lines_per_step)))
+    hires_step = max(1, int(scroll_config.get("hiResStep", hires_step)))
+    print(f"Scroll settings - Lines per step: {lines_per_step}, Hi-res step: {hires_step}/{hid_descriptors.WHEEL_MULTIPLIER}")
+
+def init(devices):
+    """Use the mouse interface in `devices` (if boot.py enabled one). Which mouse it is comes from
+    the setting boot.py built the devices from - nothing is sent to the host to find out"""
+    global _device, _mode, _report
+    try:
+        _device = find_device(devices, usage_page=0x01, usage=0x02)
+    except ValueError:
+        _device = None
+        _mode = MODE_NONE
+        return
+    if os.getenv("PADAWAN_HID_MOUSE", "hires") == "hires":
+        _mode = MODE_HIRES
+        _report = bytearray(hid_descriptors.HIRES_MOUSE_REPORT_SIZE)
+    else:
+        _mode = MODE_STANDARD
+        _report = bytearray(4)
+    print(f"Wheel mouse: {'high resolution' if _mode == MODE_HIRES else 'standard'}")
+
+def available():
+    """True if scrolling goes out as mouse-wheel reports"""
+    return _mode != MODE_NONE
+
+def scroll(steps=1):
+    """Queue vertical knob steps (positive = up)"""
+    global _pending_wheel
+    _pending_wheel += steps
+
+def pan(steps=1):
+    """Queue horizontal knob steps (positive = right)"""
+    global _pending_pan
+    _pending_pan += steps
+
+def pending():
+    return bool(_pending_wheel or _pending_pan)
+
+def _update_multipliers():
+    """Wheel and pan counts per detent, updated when the host has set the feature report"""
+    global _wheel_multiplier, _pan_multiplier
+    report = _device.get_last_received_report(hid_descriptors.MOUSE_REPORT_ID)
+    if report is None:
+        return
+    _wheel_multiplier = hid_descriptors.WHEEL_MULTIPLIER if report[0] & 0x03 else 1
+    _pan_multiplier = hid_descriptors.WHEEL_MULTIPLIER if report[0] & 0x0C else 1
+
+def check_usb():
+    """Back to one count per detent when the USB connection comes or goes. Call once per main loop pass."""
+    global _usb_connected, _wheel_multiplier, _pan_multiplier
+    connected = supervisor.runtime.usb_connected
+    if connected != _usb_connected:
+        _usb_connected = connected
+        _wheel_multiplier = _pan_multiplier = 1
+
+def _counts(steps, multiplier):
+    if multiplier > 1:
+        return steps * hires_step
+    return steps * lines_per_step
+
+def flush():
+    """Send all queued steps as one report. Call once per main loop pass."""
+    global _pending_wheel, _pending_pan
+    if not (_pending_wheel or _pending_pan) or not available():
+        _pending_wheel = _pending_pan = 0
+        return
+    try:
+        if _mode == MODE_HIRES:
+            _update_multipliers()
+            wheel = max(-32767, min(32767, _counts(_pending_wheel, _wheel_multiplier)))
+            pan = max(-32767, min(32767, _counts(_pending_pan, _pan_multiplier)))
+            struct.pack_into("<Bhhhh", _report, 0, 0, 0, 0, wheel, pan)
+        else:
+            # No pan axis on the standard mouse - horizontal steps are dropped
+            wheel = max(-127, min(127, _pending_wheel * lines_per_step))
+            struct.pack_into("<Bbbb", _report, 0, 0, 0, 0, wheel)
+        _device.send_report(_report)
+    except OSError as e:
+        print(f"Scroll failed: {e}")
+    _pending_wheel = _pending_pan = 0
@@ -0,0 +1,11 @@
+"""
+PadAwan Host Simulator
+Runs the unmodified firmware (boot.py, code.py) under CPython on Linux: stubs for the CircuitPython
+modules in stubs/, the virtual board state in pad, and runner.run() to boot it and drive it with a
+script - loop rate, upload time and allocations can be measured without a pad attached
+
+    cd "FeatherS3 scripts"
+    python -m hostsim --passes 3000 -v          # boot and run 3000 main loop passes, show the console
+    python -m hostsim --bench --layers 50       # benchmark report as JSON
+    python -m hostsim.vpad --count 4            # 4 pads on pseudo-terminals for debug_serial.py / the app
+"""
@@ -0,0 +1,76 @@
+"""
+python -m hostsim - boot the firmware on the host simulator, or benchmark it
+
+    python -m hostsim --passes 3000 -v --config macropad_config.json
+    python -m hostsim --bench --layers 1,10,50,100 -o bench.json
+    python -m hostsim --bench --alloc --set PADAWAN_HID_KEYBOARD=boot
+    python -m hostsim --alloc-check             # exit code 1 unless idle and input passes allocate nothing
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from hostsim import bench, pad, runner
+
+def _setting(text):
+    key, _, value = text.partition("=")
+    return key, int(value) if value.lstrip("-").isdigit() else value
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m hostsim", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--firmware", default=runner.FIRMWARE_DIR, help="folder with boot.py / code.py")
+    parser.add_argument("--lib", help="CIRCUITPY lib folder (default: newest drive backup)")
+    parser.add_argument("--config", help="macropad_config.json to put on the SD card")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="settings.toml override")
+    parser.add_argument("--passes", type=int, default=1000, help="main loop passes to run (without --bench)")
+    parser.add_argument("--realtime", action="store_true", help="sleep for real instead of the virtual clock")
+    parser.add_argument("--alloc", action="store_true", help="track allocations (tracemalloc) for MEM / ALLOC_CHECK")
+    parser.add_argument("--no-sd", action="store_true", help="boot without an SD card")
+    parser.add_argument("--bench", action="store_true", help="benchmark and print the results as JSON")
+    parser.add_argument("--alloc-check", action="store_true", help="ALLOC_CHECK over idle and input passes, fail unless PASS")
+    parser.add_argument("--layers", default="1,10,50,100", help="config sizes to upload in the benchmark")
+    parser.add_argument("--loop-passes", type=int, default=bench.LOOP_PASSES, help="idle passes to time")
+    parser.add_argument("-o", "--output", help="write the benchmark JSON to this file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the firmware's console output")
+    args = parser.parse_args()
+
+    console = sys.stdout if args.verbose else bench.NullConsole()
+    settings = dict(_setting(text) for text in args.set)
+    pad.sd_present = not args.no_sd
+    options = {"firmware_dir": args.firmware, "lib": args.lib, "settings": settings}
+
+    if args.alloc_check:
+        # Console output to the terminal buffers inside print() - it would count as allocation
+        check = bench.alloc_check(realtime=args.realtime, **options)
+        passed = check.startswith("ALLOC_CHECK:result=PASS")
+        print(f"{'✅' if passed else '❌'} {check}")
+        return passed
+
+    if args.bench:
+        sizes = [int(size) for size in args.layers.split(",")]
+        results = bench.run(sizes, loop_passes=args.loop_passes, track_alloc=args.alloc,
+                            realtime=args.realtime, console=console, **options)
+        text = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+            print(f"📈 Results -> {args.output}")
+        else:
+            print(text)
+        return True
+
+    passes = runner.run(config=args.config and os.path.abspath(args.config), max_passes=args.passes,
+                        realtime=args.realtime, track_alloc=args.alloc, console=console, **options)
+    print(f"✅ {passes} passes, {len(pad.hid_reports)} HID reports, display: {pad.display_text[-1:]}")
+    serial = pad.read_serial().decode("utf-8", "replace").strip()
+    if serial:
+        print("Serial output:")
+        for line in serial.splitlines():
+            print("  <", line)
+    return True
+
+if __name__ == "__main__":
+    exit(0 if main() else 1)
@@ -0,0 +1,199 @@
+"""
+Benchmarks
+Boot time, main loop pass time, press-to-report latency, PING round trip, config upload and
+download time by config size and (with allocation tracking) ALLOC_CHECK / MEM of the firmware on
+the host simulator - one JSON-ready dict so runs can be compared across firmware versions.
+Times are given twice: "ms"/"us" = host CPU time of the firmware's work, "board_ms" = the virtual
+clock, which also counts the main loop sleeps the firmware asked for
+"""
+
+import json
+import platform
+import time
+
+from hostsim import pad, runner
+from hostsim.configs import sample_config
+
+WARMUP_PASSES = 50          # Deferred init and the first display refresh
+LOOP_PASSES = 5000
+LATENCY_SAMPLES = 20
+PING_SAMPLES = 50
+REPLY_PASSES = 20000        # Give up waiting for a reply after this many passes
+ALLOC_CHECK_PASSES = 500
+ALLOC_CHECK_IDLE = 100      # Idle passes of an ALLOC_CHECK before the inputs
+PRESS_PIN = "IO14"          # Button 1
+# Buttons 1-5 and the knob A press, then knob A turns: every action of sample_config but the Layer
+# Switch - apply_layers() rebuilds the key tables, a region of its own in MEM
+INPUT_PINS = ("IO14", "IO18", "IO5", "IO17", "IO6", "IO7")
+KNOB_PIN = "IO10"
+
+def percentiles(values):
+    """p50 / p90 / p99 / max of a list of numbers (empty dict for none)"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"n": len(ordered), "mean": round(sum(ordered) / len(ordered), 1), "p50": pick(0.5),
+            "p90": pick(0.9), "p99": pick(0.99), "max": ordered[-1]}
+
+class ReplyLog:
+    """Serial lines of the firmware with the wall / virtual nanoseconds they were written at"""
+
+    def __init__(self):
+        self.lines = []
+        self._partial = bytearray()
+
+    def poll(self):
+        if not pad.serial_out:
+            return
+        self._partial += pad.read_serial()
+        wall, board = time.perf_counter_ns(), pad.now_ns()
+        while b"\n" in self._partial:
+            line, _, rest = bytes(self._partial).partition(b"\n")
+            self._partial = bytearray(rest)
+            self.lines.append((line.decode("utf-8", "replace").strip(), wall, board))
+
+    def wait(self, prefix):
+        """Generator: yields passes until a line starting with prefix arrives, returns (line, wall, board)"""
+        for _ in range(REPLY_PASSES):
+            self.poll()
+            for i, entry in enumerate(self.lines):
+                if entry[0].startswith(prefix):
+                    del self.lines[:i + 1]
+                    return entry
+            yield 1
+        raise TimeoutError(f"no {prefix} reply")
+
+class NullConsole:
+    """print() target that drops the output - a StringIO grows inside the firmware's print() calls,
+    which allocation tracking would count against the firmware"""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+def _ms(ns):
+    return round(ns / 1_000_000, 3)
+
+def _script(results, sizes, loop_passes, track_alloc):
+    replies = ReplyLog()
+    pad.on_serial(replies.poll)
+    results["boot_board_ms"] = _ms(pad.now_ns())
+    yield WARMUP_PASSES
+    replies.lines.clear()
+
+    # Idle main loop: host time between two resumptions of the script = one pass
+    times = []
+    last = time.perf_counter_ns()
+    for _ in range(loop_passes):
+        yield 1
+        now = time.perf_counter_ns()
+        times.append((now - last) // 1000)
+        last = now
+    loop = percentiles(times)
+    loop["passes_per_s"] = round(1_000_000 / loop["mean"]) if loop["mean"] else None
+    results["loop_us"] = loop
+
+    # Press-to-report latency of button 1 (a key combo in sample_config)
+    latency, latency_passes = [], []
+    for _ in range(LATENCY_SAMPLES):
+        reports = len(pad.hid_reports)
+        start, passes = time.perf_counter_ns(), pad.passes
+        pad.press(PRESS_PIN)
+        while len(pad.hid_reports) == reports:
+            yield 1
+        latency.append((time.perf_counter_ns() - start) // 1000)
+        latency_passes.append(pad.passes - passes)
+        pad.release(PRESS_PIN)
+        yield 20
+    results["press_to_report_us"] = percentiles(latency)
+    results["press_to_report_passes"] = percentiles(latency_passes)
+
+    rtt = []
+    for _ in range(PING_SAMPLES):
+        start = time.perf_counter_ns()
+        pad.write_serial(b"PING\n")
+        _, wall, _ = yield from replies.wait("PONG")
+        rtt.append((wall - start) // 1000)
+        yield 2
+    results["ping_rtt_us"] = percentiles(rtt)
+
+    results["config"] = []
+    for layers in sizes:
+        text = json.dumps(sample_config(layers), indent=2)
+        lines = text.split("\n")
+        start, board_start = time.perf_counter_ns(), pad.now_ns()
+        pad.write_serial("BEGIN_JSON\n" + text + "\n")
+        while pad.serial_in:
+            yield 1
+        end, board_end = time.perf_counter_ns(), pad.now_ns()
+        pad.write_serial(b"END_JSON\n")
+        reply, wall, board = yield from replies.wait("UPLOAD_")
+        yield 5
+        download, board_download = time.perf_counter_ns(), pad.now_ns()
+        pad.write_serial(b"DOWNLOAD_CONFIG\n")
+        config_line, download_wall, download_board = yield from replies.wait("CONFIG:")
+        results["config"].append({
+            "layers": layers, "json_bytes": len(text), "lines": len(lines), "result": reply,
+            "upload_ms": _ms(wall - start), "upload_board_ms": _ms(board - board_start),
+            "end_json_to_upload_ok_ms": _ms(wall - end), "end_json_to_upload_ok_board_ms": _ms(board - board_end),
+            "download_bytes": len(config_line), "download_ms": _ms(download_wall - download),
+            "download_board_ms": _ms(download_board - board_download),
+        })
+        yield 5
+
+    if track_alloc:
+        pad.write_serial(b"MEM_RESET\n")
+        yield from replies.wait("MEM_RESET_OK")
+        results["alloc_check"] = yield from _alloc_check(replies)
+        pad.write_serial(b"MEM\n")
+        mem, _, _ = yield from replies.wait("MEM:")
+        results["mem"] = mem
+
+def _alloc_check(replies):
+    """Generator: ALLOC_CHECK over idle passes, a press of every input pin and knob turns, returns the reply"""
+    pad.write_serial(f"ALLOC_CHECK:{ALLOC_CHECK_PASSES}\n".encode())
+    yield from replies.wait("ALLOC_CHECK_STARTED")
+    yield ALLOC_CHECK_IDLE
+    for pin in INPUT_PINS:
+        pad.press(pin)
+        yield 10
+        pad.release(pin)
+        # Macro and typed text finish before the next press
+        yield 40
+    for detents in (1, -1):
+        pad.turn(KNOB_PIN, detents)
+        yield 10
+    check, _, _ = yield from replies.wait("ALLOC_CHECK:")
+    return check
+
+def alloc_check(console=None, **kwargs):
+    """Boot the firmware with a sample_config(1) and allocation tracking, run an ALLOC_CHECK across
+    idle and input passes, returns its reply (ALLOC_CHECK:result=PASS|FAIL,...)"""
+    results = {}
+
+    def script():
+        replies = ReplyLog()
+        pad.on_serial(replies.poll)
+        yield WARMUP_PASSES
+        results["check"] = yield from _alloc_check(replies)
+
+    runner.run(script, config=sample_config(1), track_alloc=True, console=console or NullConsole(), **kwargs)
+    return results["check"]
+
+def run(sizes=(1, 10, 50, 100), loop_passes=LOOP_PASSES, track_alloc=False, realtime=False, console=None, **kwargs):
+    """Boot the firmware with a sample_config(sizes[0]) and benchmark it, returns the results dict"""
+    results = {
+        "python": platform.python_version(),
+        "realtime": realtime,
+        "track_alloc": track_alloc,
+    }
+    started = time.perf_counter()
+    runner.run(_script(results, sizes, loop_passes, track_alloc), config=sample_config(sizes[0]),
+               realtime=realtime, track_alloc=track_alloc, console=console, **kwargs)
+    results["passes"] = pad.passes
+    results["hid_reports"] = len(pad.hid_reports)
+    results["wall_s"] = round(time.perf_counter() - started, 2)
+    return results
@@ -0,0 +1,29 @@
+"""
+Sample Configs
+The synthetic config both benchmarks upload - hostsim.bench on the simulator and debug_serial.py
+--benchmark on a pad - so their numbers stay comparable. Imports nothing, debug_serial.py uses
+it without the simulator
+"""
+
+def sample_config(layers, buttons=6, knobs=2):
+    """A config like the desktop app writes: every layer with all buttons and knobs bound"""
+    actions = (("Key combo", "Ctrl+C"), ("Type Text", "Hallo Welt!"), ("Special Key", "ENTER"),
+               ("Volume Control", "Mute"), ("Macro", "tap:Ctrl+A; wait:20; tap:Ctrl+C"), ("Layer Switch", ""))
+    config = {
+        "version": "1.0",
+        "device": "FeatherS3",
+        "display": {"mode": "layer", "enabled": True},
+        "currentLayer": 1,
+        "layers": [],
+        "limits": {"maxLayers": layers, "maxButtons": buttons, "maxKnobs": knobs},
+    }
+    for index in range(layers):
+        layer = {"id": index + 1, "name": f"Layer {index + 1}", "buttons": {}, "knobs": {}}
+        for button in range(buttons):
+            action, key = actions[button % len(actions)]
+            layer["buttons"][str(button + 1)] = {"action": action, "key": key, "enabled": True}
+        for knob in range(knobs):
+            layer["knobs"][chr(65 + knob)] = {"ccwAction": "Decrease Volume", "cwAction": "Increase Volume",
+                                             "pressAction": "Special Key", "pressKey": "ENTER"}
+        config["layers"].append(layer)
+    return config
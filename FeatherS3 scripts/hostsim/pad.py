@@ -0,0 +1,163 @@
+"""
+Virtual Pad
+State shared by the hardware stubs: the inputs a script sets (pin levels, knob positions,
+analog values, serial input) and the outputs the firmware produced (HID reports, serial output,
+display text), plus the clock the firmware sees
+"""
+
+import time
+
+# FeatherS3 pins (board.<name>) and their aliases - levels are kept per GPIO name
+PINS = tuple(f"IO{n}" for n in range(19)) + ("IO21", "IO33", "IO34", "IO35", "IO36", "IO37", "IO38",
+                                             "IO39", "IO40", "IO43", "IO44")
+ALIASES = {
+    "A0": "IO17", "A1": "IO18", "A2": "IO14", "A3": "IO12", "A4": "IO6", "A5": "IO5",
+    "SCK": "IO36", "MOSI": "IO35", "MISO": "IO37", "SDA": "IO8", "SCL": "IO9", "TX": "IO43", "RX": "IO44",
+    "LED": "IO13", "BATTERY": "IO2", "VBUS_SENSE": "IO34", "LDO2": "IO39", "NEOPIXEL": "IO40",
+    "AMB": "IO4", "BOOT": "IO0",
+}
+
+HEAP_SIZE = 8 * 1024 * 1024     # What gc.mem_free() + gc.mem_alloc() add up to (PSRAM build)
+NVM_SIZE = 8192
+
+class Restart(BaseException):
+    """supervisor.reload() / microcontroller.reset() - ends the run (the firmware can't catch it)"""
+
+# --- Clock ---
+# Virtual by default: time.sleep() returns at once and only advances the clock, so passes run as
+# fast as the host allows and durations measure the firmware's own work. realtime = True sleeps.
+realtime = False
+passes = 0              # time.sleep() calls so far (one per main loop pass once it runs)
+_origin_ns = time.perf_counter_ns()
+_slept_ns = 0
+_sleep_hooks = []
+_serial_hooks = []
+real_sleep = time.sleep
+SERIAL_POLL_S = 0.001   # Serial hooks run at least this often during a realtime sleep
+
+def now_ns():
+    """Nanoseconds since the (virtual) power-on"""
+    return time.perf_counter_ns() - _origin_ns + _slept_ns
+
+def sleep(seconds):
+    """time.sleep() of the firmware"""
+    global passes, _slept_ns
+    passes += 1
+    if realtime:
+        # The USB stack keeps moving serial bytes while the firmware sleeps
+        end = time.perf_counter() + seconds
+        remaining = seconds
+        while remaining > 0:
+            real_sleep(min(remaining, SERIAL_POLL_S) if _serial_hooks else remaining)
+            poll_serial()
+            remaining = end - time.perf_counter()
+    else:
+        _slept_ns += int(seconds * 1_000_000_000)
+    for hook in _sleep_hooks:
+        hook()
+
+def on_sleep(hook):
+    """Call hook() after every time.sleep() of the firmware (script steps, serial links)"""
+    _sleep_hooks.append(hook)
+
+def on_serial(hook):
+    """Call hook() whenever the firmware looks at the data port (moves bytes to / from a real port)"""
+    _serial_hooks.append(hook)
+
+def poll_serial():
+    for hook in _serial_hooks:
+        hook()
+
+def restart_clock():
+    global passes, _origin_ns, _slept_ns
+    passes = 0
+    _origin_ns = time.perf_counter_ns()
+    _slept_ns = 0
+
+def clear_hooks():
+    _sleep_hooks.clear()
+    _serial_hooks.clear()
+
+# --- Inputs ---
+pin_levels = {}         # GPIO name -> level; unset input pins read their pull (pull-up = high)
+encoder_positions = {}  # GPIO name of pin A -> position in detents
+analog_values = {"IO2": 21500}  # GPIO name -> raw 16-bit value (BATTERY ~4.0 V at the default divisor)
+vbus = True             # USB power present (VBUS_SENSE)
+usb_connected = True    # Enumerated by a host (supervisor.runtime.usb_connected)
+sd_present = True
+keys_down = set()       # Pressed key numbers of a KeyMatrix / ShiftRegisterKeys layout
+serial_in = bytearray()
+
+# --- Outputs ---
+hid_reports = []        # (usage_page, usage, report bytes) in send order
+received_reports = {}   # (usage, report id) -> report the host set, until the firmware reads it
+display_text = []       # Every text a display label was set to
+serial_out = bytearray()
+nvm = bytearray(NVM_SIZE)
+light_sleeps = 0
+cpu_frequency = 240_000_000
+
+def gpio(name):
+    """GPIO name of a pin name or alias ("A2" -> "IO14")"""
+    return ALIASES.get(name, name)
+
+def press(pin):
+    """Pull a button pin low (buttons are wired to ground)"""
+    pin_levels[gpio(pin)] = False
+
+def release(pin):
+    pin_levels[gpio(pin)] = True
+
+def press_key(key_number):
+    """Press a key of a matrix or shift register layout (key number from 0)"""
+    keys_down.add(key_number)
+
+def release_key(key_number):
+    keys_down.discard(key_number)
+
+def turn(pin_a, detents):
+    """Turn the knob whose first pin is pin_a by detents (negative = counter-clockwise)"""
+    name = gpio(pin_a)
+    encoder_positions[name] = encoder_positions.get(name, 0) + detents
+
+def host_set_report(usage, report_id, data):
+    """The host sends an output / feature report - get_last_received_report() returns it once"""
+    received_reports[(usage, report_id)] = bytes(data)
+
+def set_battery(raw):
+    analog_values["IO2"] = raw
+
+def write_serial(data):
+    """Bytes the host sends on the CDC data port"""
+    serial_in.extend(data.encode() if isinstance(data, str) else data)
+
+def read_serial():
+    """Bytes the firmware wrote on the CDC data port since the last call"""
+    data = bytes(serial_out)
+    serial_out.clear()
+    return data
+
+def reports(usage=None):
+    """Captured HID reports, only those of one usage (6 keyboard, 1 consumer, 2 mouse) if given"""
+    return [report for report in hid_reports if usage is None or report[1] == usage]
+
+def reset():
+    """Forget all inputs and outputs (between runs - the runner restarts the clock)"""
+    global vbus, usb_connected, sd_present, light_sleeps, cpu_frequency
+    clear_hooks()
+    pin_levels.clear()
+    keys_down.clear()
+    encoder_positions.clear()
+    analog_values.clear()
+    analog_values["IO2"] = 21500
+    vbus = True
+    usb_connected = True
+    sd_present = True
+    serial_in.clear()
+    hid_reports.clear()
+    received_reports.clear()
+    display_text.clear()
+    serial_out.clear()
+    nvm[:] = bytes(NVM_SIZE)
+    light_sleeps = 0
+    cpu_frequency = 240_000_000
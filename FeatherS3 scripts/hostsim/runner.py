@@ -0,0 +1,233 @@
+"""
+Firmware Runner
+Runs boot.py and code.py of the firmware folder unmodified under CPython on the hardware stubs:
+/sd is a host folder, os.getenv() reads settings.toml, time.sleep() runs the pad clock and a
+script drives the inputs between main loop passes
+"""
+
+import builtins
+import contextlib
+import gc
+import glob
+import json
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+import tomllib
+import tracemalloc
+
+from hostsim import pad
+
+HOSTSIM_DIR = os.path.dirname(os.path.abspath(__file__))
+STUBS_DIR = os.path.join(HOSTSIM_DIR, "stubs")
+FIRMWARE_DIR = os.path.join(os.path.dirname(HOSTSIM_DIR), "cpy")
+CONFIG_NAME = "macropad_config.json"
+
+# Paths the firmware uses on the board that live in the runner's root folder
+DEVICE_PATHS = ("/sd",)
+_PATCHED_OS = ("stat", "listdir", "remove", "rename", "mkdir", "rmdir")
+
+# gc.mem_alloc() while allocations aren't tracked (tracemalloc makes the firmware 2-3x slower)
+UNTRACKED_ALLOC = 64 * 1024
+_gc_collect = gc.collect
+_traces = {}    # Firmware blocks at the last firmware_alloc() call
+_heap = 0       # What the board's gc.mem_alloc() would return
+
+# Traced blocks the board doesn't have: CPython boxes every int above 256 (28 bytes, 32 for the
+# result of arithmetic), CircuitPython keeps ints below 2**30 in the object pointer
+BOXED_INT_SIZES = (28, 32)
+
+class Stop(BaseException):
+    """Ends the run from a script - BaseException so the firmware's `except Exception` lets it through"""
+
+def find_lib(firmware_dir=FIRMWARE_DIR):
+    """The CIRCUITPY lib folder with the .py libraries (newest drive backup), None if there is none"""
+    candidates = [os.path.join(firmware_dir, "lib")]
+    candidates += sorted(glob.glob(os.path.join(firmware_dir, "*", "lib")), key=os.path.getmtime, reverse=True)
+    for folder in candidates:
+        if os.path.isfile(os.path.join(folder, "adafruit_hid", "keyboard_layout_win_de.py")):
+            return folder
+    return None
+
+def load_settings(path):
+    """settings.toml as a dict (empty if the file is missing)"""
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+def _script_step(script, max_passes):
+    """sleep hook: advance the script generator - each yield is the number of passes to wait"""
+    steps = script() if callable(script) else script
+    wait = 0
+
+    def step():
+        nonlocal wait
+        if max_passes is not None and pad.passes >= max_passes:
+            raise Stop()
+        if steps is None:
+            return
+        if wait > 1:
+            wait -= 1
+            return
+        try:
+            wait = next(steps) or 1
+        except StopIteration:
+            raise Stop() from None
+
+    return step
+
+def _firmware_traces():
+    """(size, traceback) -> count of the traced blocks the board has too: without those allocated
+    by hostsim (the stubs stand in for C drivers, the pad records what was sent) and boxed ints"""
+    # A full collection empties CPython's free lists (tuples, frames, method objects), otherwise
+    # their blocks come and go between two calls as if the firmware had allocated them
+    _gc_collect()
+    traces = {}
+    # The raw traces of take_snapshot() - building Trace objects makes a pass 10x slower
+    for _, size, frames, *_ in tracemalloc._get_traces():
+        if size in BOXED_INT_SIZES or not frames:
+            continue
+        filename = frames[0][0]
+        if not filename.startswith(HOSTSIM_DIR) and filename != tracemalloc.__file__:
+            key = (size, frames)
+            traces[key] = traces.get(key, 0) + 1
+    return traces
+
+def firmware_alloc():
+    """gc.mem_alloc() as the board counts it: CPython frees a block as soon as the last reference
+    goes, the board only in a collection - so blocks that are new since the last call add to the
+    heap, freed ones stay in it until firmware_collect()"""
+    global _traces, _heap
+    traces = _firmware_traces()
+    for key, count in traces.items():
+        new = count - _traces.get(key, 0)
+        if new > 0:
+            _heap += new * key[0]
+    _traces = traces
+    if _heap > pad.HEAP_SIZE:
+        # The board collects when the heap is full
+        firmware_collect()
+    return _heap
+
+def firmware_collect():
+    """gc.collect() of the firmware: only the live blocks stay on the heap"""
+    global _traces, _heap
+    _traces = _firmware_traces()
+    _heap = sum(size * count for (size, _), count in _traces.items())
+
+def _forget_modules(folders):
+    """Drop firmware and stub modules so the next run imports them fresh"""
+    folders = tuple(os.path.abspath(folder) + os.sep for folder in folders if folder)
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.abspath(path).startswith(folders):
+            del sys.modules[name]
+
+@contextlib.contextmanager
+def _patched(root, settings, track_alloc):
+    """Swap in the board's filesystem, getenv, clock and gc.mem_* for the duration of a run"""
+    global _traces, _heap
+    def device_path(path):
+        if isinstance(path, str) and (path in DEVICE_PATHS or path.startswith(tuple(p + "/" for p in DEVICE_PATHS))):
+            return os.path.join(root, path.lstrip("/"))
+        return path
+
+    saved_open = builtins.open
+    saved_os = {name: getattr(os, name) for name in _PATCHED_OS}
+    saved_time = (time.sleep, time.monotonic, time.monotonic_ns)
+    saved_getenv = os.getenv
+    saved_gc = (getattr(gc, "mem_alloc", None), getattr(gc, "mem_free", None))
+
+    builtins.open = lambda file, *args, **kwargs: saved_open(device_path(file), *args, **kwargs)
+    for name, function in saved_os.items():
+        setattr(os, name, lambda path, *args, _function=function, **kwargs:
+                _function(device_path(path), *(device_path(arg) for arg in args), **kwargs))
+    # CircuitPython's getenv() only reads settings.toml, and returns integers as int
+    os.getenv = lambda key, default=None: settings.get(key, default)
+    time.sleep = pad.sleep
+    time.monotonic = lambda: pad.now_ns() / 1_000_000_000
+    time.monotonic_ns = pad.now_ns
+    if track_alloc:
+        tracemalloc.start()
+        _traces, _heap = {}, 0
+        gc.mem_alloc = firmware_alloc
+        gc.collect = firmware_collect
+    else:
+        gc.mem_alloc = lambda: UNTRACKED_ALLOC
+    gc.mem_free = lambda: pad.HEAP_SIZE - gc.mem_alloc()
+    try:
+        yield
+    finally:
+        builtins.open = saved_open
+        for name, function in saved_os.items():
+            setattr(os, name, function)
+        time.sleep, time.monotonic, time.monotonic_ns = saved_time
+        os.getenv = saved_getenv
+        if track_alloc:
+            tracemalloc.stop()
+            gc.collect = _gc_collect
+        for name, function in zip(("mem_alloc", "mem_free"), saved_gc):
+            if function is None:
+                delattr(gc, name)
+            else:
+                setattr(gc, name, function)
+
+def run(script=None, *, firmware_dir=FIRMWARE_DIR, lib=None, root=None, config=None, settings=None,
+        max_passes=None, realtime=False, track_alloc=False, console=None, boot=True):
+    """Boot the firmware and run its main loop until the script ends, max_passes time.sleep() calls
+    have passed, or the firmware resets. Returns the number of passes.
+
+    script       generator (or function returning one), resumed after every time.sleep() of the
+                 firmware; it sets inputs / reads outputs through hostsim.pad and yields how many
+                 passes to wait before it is resumed again (None = 1)
+    lib          CIRCUITPY lib folder with the .py libraries (default: find_lib())
+    root         folder that is the board's drive (/sd is root/sd), a temporary one if None
+    config       dict or JSON file to put on the SD card as macropad_config.json
+    settings     settings.toml values that override the firmware folder's file
+    realtime     sleep for real instead of advancing the virtual clock
+    track_alloc  gc.mem_alloc() from tracemalloc - what the firmware keeps allocated, see
+                 firmware_alloc() (CPython frees by reference counting, so garbage the board
+                 collects later doesn't show up)
+    console      file the firmware's print() output goes to (default stdout)
+    boot         run boot.py first (it enables the HID devices from the settings)"""
+    lib = lib or find_lib(firmware_dir)
+    values = load_settings(os.path.join(firmware_dir, "settings.toml"))
+    values.update(settings or {})
+    temporary = root is None
+    root = tempfile.mkdtemp(prefix="padawan-") if temporary else root
+    os.makedirs(os.path.join(root, "sd"), exist_ok=True)
+    if config is not None:
+        target = os.path.join(root, "sd", CONFIG_NAME)
+        if isinstance(config, dict):
+            with open(target, "w") as f:
+                json.dump(config, f)
+        else:
+            shutil.copyfile(config, target)
+
+    folders = (STUBS_DIR, lib, firmware_dir)
+    _forget_modules(folders)
+    saved_path = sys.path[:]
+    sys.path[:0] = [folder for folder in folders if folder]
+    if os.path.dirname(HOSTSIM_DIR) not in sys.path:
+        sys.path.append(os.path.dirname(HOSTSIM_DIR))
+    pad.realtime = realtime
+    pad.restart_clock()
+    pad.on_sleep(_script_step(script, max_passes))
+    try:
+        with _patched(root, values, track_alloc), contextlib.redirect_stdout(console or sys.stdout):
+            if boot and os.path.isfile(os.path.join(firmware_dir, "boot.py")):
+                runpy.run_path(os.path.join(firmware_dir, "boot.py"), run_name="__main__")
+            runpy.run_path(os.path.join(firmware_dir, "code.py"), run_name="__main__")
+    except (Stop, pad.Restart):
+        pass
+    finally:
+        sys.path[:] = saved_path
+        pad.clear_hooks()
+        _forget_modules(folders)
+        if temporary:
+            shutil.rmtree(root, ignore_errors=True)
+    return pad.passes
@@ -0,0 +1,28 @@
+"""
+Pin bookkeeping shared by the stubs: a pin can only be claimed once until it is deinit()ed
+(the firmware gets the same "in use" error as on the board) and input levels come from pad
+"""
+
+from hostsim import pad
+
+claimed = set()
+
+def claim(pin):
+    if pin is None:
+        return
+    if pin.name in claimed:
+        raise ValueError(f"{pin.name} in use")
+    claimed.add(pin.name)
+
+def release(pin):
+    if pin is not None:
+        claimed.discard(pin.name)
+
+def level(pin, pull):
+    """Input level of a pin: scripted, VBUS sense, or the pull (floating reads high)"""
+    if pin.name == pad.gpio("VBUS_SENSE"):
+        return pad.vbus
+    level = pad.pin_levels.get(pin.name)
+    if level is None:
+        return pull != "DOWN"
+    return level
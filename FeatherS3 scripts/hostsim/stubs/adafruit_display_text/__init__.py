@@ -0,0 +1,4 @@
+"""
+adafruit_display_text (stub)
+Stands in for the .mpy library on the pad - only label.Label
+"""
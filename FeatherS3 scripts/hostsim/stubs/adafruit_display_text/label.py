@@ -0,0 +1,26 @@
+"""
+adafruit_display_text.label (stub)
+Every text a Label is given is appended to pad.display_text
+"""
+
+from hostsim import pad
+
+class Label:
+    def __init__(self, font, *, text="", color=0xFFFFFF, x=0, y=0, scale=1, **kwargs):
+        self.font = font
+        self.color = color
+        self.x = x
+        self.y = y
+        self.scale = scale
+        self.hidden = False
+        self._text = None
+        self.text = text
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        self._text = value
+        pad.display_text.append(value)
@@ -0,0 +1,23 @@
+"""
+adafruit_hid (stub)
+Stands in for the .mpy modules of the library on the pad (keyboard, layout base, consumer control,
+mouse). Modules only the lib folder has as .py (keycode_win_de, keyboard_layout_win_de) are
+loaded from there: every adafruit_hid folder further down sys.path joins this package
+"""
+
+import os
+import sys
+
+for _entry in sys.path:
+    _folder = os.path.join(_entry, "adafruit_hid")
+    if os.path.isdir(_folder) and os.path.abspath(_folder) not in map(os.path.abspath, __path__):
+        __path__.append(_folder)
+
+def find_device(devices, *, usage_page, usage, timeout=None):
+    """The device of the HID usage page and usage"""
+    if hasattr(devices, "send_report"):
+        devices = [devices]
+    for device in devices:
+        if device.usage_page == usage_page and device.usage == usage and hasattr(device, "send_report"):
+            return device
+    raise ValueError("Could not find matching HID device.")
@@ -0,0 +1,72 @@
+"""
+adafruit_hid.keyboard_layout_base (stub)
+Text -> keycodes for the generated layouts (keyboard_layout_win_de.py)
+"""
+
+class KeyboardLayoutBase:
+    SHIFT_FLAG = 0x80
+    ALTGR_FLAG = 0x80
+    SHIFT_CODE = 0xE1
+    RIGHT_ALT_CODE = 0xE6
+    ASCII_TO_KEYCODE = ()
+    NEED_ALTGR = ""
+    HIGHER_ASCII = {}
+    COMBINED_KEYS = {}
+
+    def __init__(self, keyboard):
+        self.keyboard = keyboard
+
+    def _write(self, keycode, altgr=False):
+        if keycode == 0:
+            raise ValueError("No keycode available for character.")
+        if altgr:
+            self.keyboard.press(self.RIGHT_ALT_CODE)
+        if keycode & self.SHIFT_FLAG:
+            keycode &= ~self.SHIFT_FLAG
+            self.keyboard.press(self.SHIFT_CODE)
+        self.keyboard.press(keycode)
+        self.keyboard.release_all()
+
+    def write(self, string, delay=None):
+        """Type the string, one press / release_all per character"""
+        import time
+        for char in string:
+            keycode = self._char_to_keycode(char)
+            if keycode > 0:
+                self._write(keycode, char in self.NEED_ALTGR)
+            elif ord(char) in self.COMBINED_KEYS:
+                cchar = self.COMBINED_KEYS[ord(char)]
+                self._write(cchar >> 8, cchar & self.ALTGR_FLAG)
+                char = chr(cchar & 0xFF & (~self.ALTGR_FLAG))
+                self._write(self._char_to_keycode(char), char in self.NEED_ALTGR)
+            else:
+                raise ValueError(f"No keycode available for character {char!r} ({ord(char)}).")
+            if delay:
+                time.sleep(delay)
+
+    def keycodes(self, char):
+        """The keycodes (modifiers first) that type char"""
+        keycode = self._char_to_keycode(char)
+        if keycode == 0:
+            raise ValueError(f"No keycode available for character {char!r} ({ord(char)}).")
+        codes = []
+        if char in self.NEED_ALTGR:
+            codes.append(self.RIGHT_ALT_CODE)
+        if keycode & self.SHIFT_FLAG:
+            codes.append(self.SHIFT_CODE)
+        codes.append(keycode & ~self.SHIFT_FLAG)
+        return codes
+
+    def _above128char_to_keycode(self, char):
+        value = ord(char)
+        if value in self.HIGHER_ASCII:
+            return self.HIGHER_ASCII[value]
+        if (value, 0) in self.HIGHER_ASCII:
+            return self.HIGHER_ASCII[(value, 0)]
+        return 0
+
+    def _char_to_keycode(self, char):
+        value = ord(char)
+        if value >= len(self.ASCII_TO_KEYCODE):
+            return self._above128char_to_keycode(char)
+        return self.ASCII_TO_KEYCODE[value]
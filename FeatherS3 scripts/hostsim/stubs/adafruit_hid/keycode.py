@@ -0,0 +1,26 @@
+"""
+adafruit_hid.keycode (stub)
+Modifier keycodes only
+"""
+
+class Keycode:
+    LEFT_CONTROL = 0xE0
+    CONTROL = 0xE0
+    LEFT_SHIFT = 0xE1
+    SHIFT = 0xE1
+    LEFT_ALT = 0xE2
+    ALT = 0xE2
+    OPTION = 0xE2
+    LEFT_GUI = 0xE3
+    GUI = 0xE3
+    WINDOWS = 0xE3
+    COMMAND = 0xE3
+    RIGHT_CONTROL = 0xE4
+    RIGHT_SHIFT = 0xE5
+    RIGHT_ALT = 0xE6
+    RIGHT_GUI = 0xE7
+
+    @classmethod
+    def modifier_bit(cls, keycode):
+        """Bit of a modifier keycode in the report's modifier byte, 0 for other keys"""
+        return 1 << (keycode - 0xE0) if cls.LEFT_CONTROL <= keycode <= cls.RIGHT_GUI else 0
@@ -0,0 +1,33 @@
+"""
+alarm (stub)
+light_sleep_until_alarms() returns at once (counted in pad.light_sleeps) with the first alarm
+"""
+
+import types
+from hostsim import pad
+
+class PinAlarm:
+    def __init__(self, pin, value, edge=False, pull=False):
+        self.pin = pin
+        self.value = value
+        self.edge = edge
+        self.pull = pull
+
+class TimeAlarm:
+    def __init__(self, *, monotonic_time=None, epoch_time=None):
+        self.monotonic_time = monotonic_time
+        self.epoch_time = epoch_time
+
+pin = types.SimpleNamespace(PinAlarm=PinAlarm)
+time = types.SimpleNamespace(TimeAlarm=TimeAlarm)
+wake_alarm = None
+sleep_memory = bytearray(8192)
+
+def light_sleep_until_alarms(*alarms):
+    global wake_alarm
+    pad.light_sleeps += 1
+    wake_alarm = alarms[0] if alarms else None
+    return wake_alarm
+
+def exit_and_deep_sleep_until_alarms(*alarms, preserve_dios=()):
+    raise pad.Restart("deep sleep")
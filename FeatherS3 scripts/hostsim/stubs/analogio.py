@@ -0,0 +1,27 @@
+"""
+analogio (stub)
+AnalogIn.value = pad.analog_values[pin]
+"""
+
+from hostsim import pad
+import _pins
+
+class AnalogIn:
+    reference_voltage = 3.3
+
+    def __init__(self, pin):
+        _pins.claim(pin)
+        self._pin = pin
+
+    @property
+    def value(self):
+        return pad.analog_values.get(self._pin.name, 0)
+
+    def deinit(self):
+        _pins.release(self._pin)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
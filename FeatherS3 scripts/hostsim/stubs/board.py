@@ -0,0 +1,38 @@
+"""
+board (stub)
+FeatherS3 pins - aliases are the same Pin object as their GPIO, unknown names don't exist
+"""
+
+from hostsim import pad
+
+board_id = "unexpectedmaker_feathers3"
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "board." + self.name
+
+for _name in pad.PINS:
+    globals()[_name] = Pin(_name)
+for _alias, _name in pad.ALIASES.items():
+    globals()[_alias] = globals()[_name]
+
+_i2c = None
+_spi = None
+
+def I2C():
+    """The board's shared I2C bus (SCL/SDA)"""
+    global _i2c
+    if _i2c is None:
+        import busio
+        _i2c = busio.I2C(SCL, SDA)
+    return _i2c
+
+def SPI():
+    global _spi
+    if _spi is None:
+        import busio
+        _spi = busio.SPI(SCK, MOSI=MOSI, MISO=MISO)
+    return _spi
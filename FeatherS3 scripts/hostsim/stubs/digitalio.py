@@ -0,0 +1,58 @@
+"""
+digitalio (stub)
+Inputs read pad.pin_levels (unset = the pull, VBUS_SENSE = pad.vbus), outputs keep their value
+"""
+
+from hostsim import pad
+import _pins
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+class DriveMode:
+    PUSH_PULL = "PUSH_PULL"
+    OPEN_DRAIN = "OPEN_DRAIN"
+
+class DigitalInOut:
+    def __init__(self, pin):
+        _pins.claim(pin)
+        self._pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self.drive_mode = DriveMode.PUSH_PULL
+        self._value = False
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        self.direction = Direction.OUTPUT
+        self.drive_mode = drive_mode
+        self._value = value
+
+    def switch_to_input(self, pull=None):
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    @property
+    def value(self):
+        if self.direction == Direction.OUTPUT:
+            return self._value
+        return _pins.level(self._pin, self.pull)
+
+    @value.setter
+    def value(self, value):
+        if self.direction != Direction.OUTPUT:
+            raise AttributeError("Cannot set value when direction is input.")
+        self._value = bool(value)
+
+    def deinit(self):
+        _pins.release(self._pin)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
@@ -0,0 +1,48 @@
+"""
+displayio (stub)
+Groups and the old display bus names - what ends up on the screen is the label text (pad.display_text)
+"""
+
+from i2cdisplaybus import I2CDisplayBus as I2CDisplay
+from fourwire import FourWire
+
+def release_displays():
+    pass
+
+class Group(list):
+    def __init__(self, *, scale=1, x=0, y=0):
+        super().__init__()
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self._pixels = bytearray(width * height)
+
+    def __getitem__(self, index):
+        x, y = index if isinstance(index, tuple) else (index % self.width, index // self.width)
+        return self._pixels[y * self.width + x]
+
+    def __setitem__(self, index, value):
+        x, y = index if isinstance(index, tuple) else (index % self.width, index // self.width)
+        self._pixels[y * self.width + x] = value
+
+    def fill(self, value):
+        for i in range(len(self._pixels)):
+            self._pixels[i] = value
+
+class Palette(list):
+    def __init__(self, color_count):
+        super().__init__([0] * color_count)
+
+class TileGrid:
+    def __init__(self, bitmap, *, pixel_shader, x=0, y=0, **kwargs):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.x = x
+        self.y = y
+        self.hidden = False
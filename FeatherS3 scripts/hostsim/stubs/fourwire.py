@@ -0,0 +1,14 @@
+"""
+fourwire (stub)
+Display bus on SPI - commands go nowhere
+"""
+
+class FourWire:
+    def __init__(self, spi_bus, *, command, chip_select, reset=None, baudrate=24000000, polarity=0, phase=0):
+        self.spi_bus = spi_bus
+
+    def reset(self):
+        pass
+
+    def send(self, command, data, *, toggle_every_byte=False):
+        pass
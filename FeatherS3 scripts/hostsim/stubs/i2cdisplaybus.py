@@ -0,0 +1,15 @@
+"""
+i2cdisplaybus (stub)
+Display bus on I2C - commands go nowhere
+"""
+
+class I2CDisplayBus:
+    def __init__(self, i2c_bus, *, device_address, reset=None):
+        self.i2c_bus = i2c_bus
+        self.device_address = device_address
+
+    def reset(self):
+        pass
+
+    def send(self, command, data):
+        pass
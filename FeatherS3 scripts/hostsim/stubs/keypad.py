@@ -0,0 +1,165 @@
+"""
+keypad (stub)
+The scanners look at their keys when the firmware reads events and `interval` has passed since the
+last scan (instead of in the background): Keys reads the pin levels, KeyMatrix / ShiftRegisterKeys
+read pad.keys_down
+"""
+
+import supervisor
+from hostsim import pad
+import _pins
+
+class Event:
+    def __init__(self, key_number=0, pressed=True, timestamp=None):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = supervisor.ticks_ms() if timestamp is None else timestamp
+
+    @property
+    def released(self):
+        return not self.pressed
+
+    def __eq__(self, other):
+        return self.key_number == other.key_number and self.pressed == other.pressed
+
+    def __repr__(self):
+        return f"<Event: key_number {self.key_number} {'pressed' if self.pressed else 'released'}>"
+
+class EventQueue:
+    def __init__(self, scanner, max_events):
+        self._scanner = scanner
+        self._max_events = max_events
+        self._events = []
+        self.overflowed = False
+
+    def _put(self, key_number, pressed):
+        if len(self._events) >= self._max_events:
+            self.overflowed = True
+            return
+        self._events.append((key_number, pressed, supervisor.ticks_ms()))
+
+    def get_into(self, event):
+        self._scanner._scan()
+        if not self._events:
+            return False
+        event.key_number, event.pressed, event.timestamp = self._events.pop(0)
+        return True
+
+    def get(self):
+        event = Event()
+        return event if self.get_into(event) else None
+
+    def clear(self):
+        self._events.clear()
+        self.overflowed = False
+
+    def __bool__(self):
+        self._scanner._scan()
+        return bool(self._events)
+
+    def __len__(self):
+        self._scanner._scan()
+        return len(self._events)
+
+class _Scanner:
+    def __init__(self, key_count, interval, max_events):
+        self.key_count = key_count
+        self._state = [False] * key_count
+        self._deinited = False
+        self._interval_ms = int(interval * 1000)
+        self._scanned_at = None
+        self.events = EventQueue(self, max_events)
+
+    def _scan(self):
+        if self._deinited:
+            raise ValueError("Object has been deinitialized and can no longer be used.")
+        now = supervisor.ticks_ms()
+        if self._scanned_at is not None and (now - self._scanned_at) & ((1 << 29) - 1) < self._interval_ms:
+            return
+        self._scanned_at = now
+        for key_number in range(self.key_count):
+            pressed = self._pressed(key_number)
+            if pressed != self._state[key_number]:
+                self._state[key_number] = pressed
+                self.events._put(key_number, pressed)
+
+    def reset(self):
+        """Forget the key states - keys held now come again as pressed events"""
+        self._state = [False] * self.key_count
+
+    def deinit(self):
+        self._deinited = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
+
+class Keys(_Scanner):
+    def __init__(self, pins, *, value_when_pressed, pull=True, interval=0.02, max_events=64,
+                 debounce_threshold=1):
+        claimed = []
+        try:
+            for pin in pins:
+                _pins.claim(pin)
+                claimed.append(pin)
+        except ValueError:
+            for pin in claimed:
+                _pins.release(pin)
+            raise
+        self._pins = tuple(pins)
+        self._value_when_pressed = value_when_pressed
+        self._pull = None if not pull else ("DOWN" if value_when_pressed else "UP")
+        super().__init__(len(self._pins), interval, max_events)
+
+    def _pressed(self, key_number):
+        return _pins.level(self._pins[key_number], self._pull) == self._value_when_pressed
+
+    def deinit(self):
+        if not self._deinited:
+            for pin in self._pins:
+                _pins.release(pin)
+        super().deinit()
+
+class KeyMatrix(_Scanner):
+    def __init__(self, row_pins, column_pins, columns_to_anodes=True, interval=0.02, max_events=64,
+                 debounce_threshold=1):
+        self._all_pins = tuple(row_pins) + tuple(column_pins)
+        for pin in self._all_pins:
+            _pins.claim(pin)
+        self.row_count = len(row_pins)
+        self.column_count = len(column_pins)
+        super().__init__(self.row_count * self.column_count, interval, max_events)
+
+    def _pressed(self, key_number):
+        return key_number in pad.keys_down
+
+    def key_number_to_row_column(self, key_number):
+        return divmod(key_number, self.column_count)
+
+    def row_column_to_key_number(self, row, column):
+        return row * self.column_count + column
+
+    def deinit(self):
+        if not self._deinited:
+            for pin in self._all_pins:
+                _pins.release(pin)
+        super().deinit()
+
+class ShiftRegisterKeys(_Scanner):
+    def __init__(self, *, clock, data, latch, value_to_latch=True, key_count, value_when_pressed,
+                 interval=0.02, max_events=64, debounce_threshold=1):
+        self._all_pins = (clock, latch) + (tuple(data) if isinstance(data, (tuple, list)) else (data,))
+        for pin in self._all_pins:
+            _pins.claim(pin)
+        super().__init__(key_count if isinstance(key_count, int) else sum(key_count), interval, max_events)
+
+    def _pressed(self, key_number):
+        return key_number in pad.keys_down
+
+    def deinit(self):
+        if not self._deinited:
+            for pin in self._all_pins:
+                _pins.release(pin)
+        super().deinit()
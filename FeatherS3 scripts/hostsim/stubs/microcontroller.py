@@ -0,0 +1,39 @@
+"""
+microcontroller (stub)
+CPU clock / temperature, the NVM byte array and reset
+"""
+
+from hostsim import pad
+
+class ResetReason:
+    POWER_ON = "POWER_ON"
+    SOFTWARE = "SOFTWARE"
+    RESET_PIN = "RESET_PIN"
+    WATCHDOG = "WATCHDOG"
+    BROWNOUT = "BROWNOUT"
+    UNKNOWN = "UNKNOWN"
+
+class Processor:
+    temperature = 35.0
+    voltage = 3.3
+    reset_reason = ResetReason.POWER_ON
+
+    @property
+    def frequency(self):
+        return pad.cpu_frequency
+
+    @frequency.setter
+    def frequency(self, value):
+        if value not in (80_000_000, 160_000_000, 240_000_000):
+            raise ValueError("Invalid frequency")
+        pad.cpu_frequency = value
+
+cpu = Processor()
+cpus = (cpu,)
+nvm = pad.nvm
+
+def reset():
+    raise pad.Restart("microcontroller.reset()")
+
+def on_next_reset(run_mode):
+    pass
@@ -0,0 +1,39 @@
+"""
+rotaryio (stub)
+IncrementalEncoder.position follows pad.encoder_positions[pin a] (in detents, the divisor is
+already applied), counted from when the encoder was created
+"""
+
+from hostsim import pad
+import _pins
+
+class IncrementalEncoder:
+    def __init__(self, pin_a, pin_b, divisor=4):
+        _pins.claim(pin_a)
+        try:
+            _pins.claim(pin_b)
+        except ValueError:
+            _pins.release(pin_a)
+            raise
+        self._pin_a = pin_a
+        self._pin_b = pin_b
+        self.divisor = divisor
+        self._base = pad.encoder_positions.get(pin_a.name, 0)
+
+    @property
+    def position(self):
+        return pad.encoder_positions.get(self._pin_a.name, 0) - self._base
+
+    @position.setter
+    def position(self, value):
+        self._base = pad.encoder_positions.get(self._pin_a.name, 0) - value
+
+    def deinit(self):
+        _pins.release(self._pin_a)
+        _pins.release(self._pin_b)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
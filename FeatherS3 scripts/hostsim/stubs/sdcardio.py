@@ -0,0 +1,32 @@
+"""
+sdcardio (stub)
+SDCard fails like a missing card unless pad.sd_present - the files live in the runner's /sd folder
+"""
+
+from hostsim import pad
+import _pins
+
+BLOCKS = 31116288   # 16 GB card
+
+class SDCard:
+    def __init__(self, spi, cs, baudrate=8000000):
+        if not pad.sd_present:
+            raise OSError(19, "no SD card")
+        _pins.claim(cs)
+        self._cs = cs
+
+    def count(self):
+        return BLOCKS
+
+    def readblocks(self, start_block, buf):
+        for i in range(len(buf)):
+            buf[i] = 0
+
+    def writeblocks(self, start_block, buf):
+        pass
+
+    def sync(self):
+        pass
+
+    def deinit(self):
+        _pins.release(self._cs)
@@ -0,0 +1,42 @@
+"""
+storage (stub)
+Mounts are only recorded - the runner maps /sd onto a host folder
+"""
+
+from hostsim import pad
+
+mounts = {}
+
+class VfsFat:
+    def __init__(self, block_device):
+        self.block_device = block_device
+        self.readonly = False
+        self.label = "SD"
+
+def mount(filesystem, mount_path, *, readonly=False):
+    if mount_path in mounts:
+        raise OSError(1, "Mount point already in use")
+    filesystem.readonly = readonly
+    mounts[mount_path] = filesystem
+
+def umount(mount):
+    for path, filesystem in list(mounts.items()):
+        if mount in (path, filesystem):
+            del mounts[path]
+            return
+    raise OSError(22, "Invalid argument")
+
+def getmount(mount_path):
+    return mounts[mount_path]
+
+def remount(mount_path, readonly=False, *, disable_concurrent_write_protection=False):
+    pass
+
+def disable_usb_drive():
+    pass
+
+def enable_usb_drive():
+    pass
+
+def erase_filesystem(extended=None):
+    raise pad.Restart("storage.erase_filesystem()")
@@ -0,0 +1,39 @@
+"""
+supervisor (stub)
+ticks_ms() on the virtual clock, runtime flags and reload
+"""
+
+from hostsim import pad
+
+class SafeModeReason:
+    NONE = None
+    BROWNOUT = "BROWNOUT"
+    HARD_FAULT = "HARD_FAULT"
+    WATCHDOG = "WATCHDOG"
+    USER = "USER"
+    string = {}
+
+class _Runtime:
+    serial_connected = True
+    safe_mode_reason = SafeModeReason.NONE
+    autoreload = False
+
+    @property
+    def usb_connected(self):
+        return pad.usb_connected
+
+    @property
+    def serial_bytes_available(self):
+        return 0
+
+runtime = _Runtime()
+
+def ticks_ms():
+    """Milliseconds since power-on, wraps around at 2**29 like the real one"""
+    return (pad.now_ns() // 1_000_000) & ((1 << 29) - 1)
+
+def reload():
+    raise pad.Restart("supervisor.reload()")
+
+def set_next_code_file(filename, **kwargs):
+    pass
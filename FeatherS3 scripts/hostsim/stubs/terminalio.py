@@ -0,0 +1,9 @@
+"""
+terminalio (stub)
+"""
+
+class _Font:
+    def get_bounding_box(self):
+        return (6, 12)
+
+FONT = _Font()
@@ -0,0 +1,83 @@
+"""
+usb_cdc (stub)
+The data port reads pad.serial_in and writes pad.serial_out. readline() returns a whole line when
+there is one; in realtime mode it waits up to timeout for the rest, like the board
+"""
+
+import time
+from hostsim import pad
+
+class Serial:
+    def __init__(self):
+        self.timeout = 1.0
+        self.write_timeout = None
+
+    @property
+    def connected(self):
+        return True
+
+    @property
+    def in_waiting(self):
+        pad.poll_serial()
+        return len(pad.serial_in)
+
+    def _wait(self, done):
+        if done() or not pad.realtime or not self.timeout:
+            return
+        deadline = time.perf_counter() + self.timeout
+        while not done() and time.perf_counter() < deadline:
+            pad.real_sleep(0.0005)
+            pad.poll_serial()
+
+    def read(self, size=1):
+        pad.poll_serial()
+        self._wait(lambda: len(pad.serial_in) >= size)
+        data = bytes(pad.serial_in[:size])
+        del pad.serial_in[:size]
+        return data
+
+    def readinto(self, buf):
+        data = self.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+    def readline(self, size=-1):
+        pad.poll_serial()
+        self._wait(lambda: b"\n" in pad.serial_in)
+        end = pad.serial_in.find(b"\n")
+        end = len(pad.serial_in) if end < 0 else end + 1
+        if size >= 0:
+            end = min(end, size)
+        data = bytes(pad.serial_in[:end])
+        del pad.serial_in[:end]
+        return data
+
+    def readlines(self):
+        lines = []
+        while pad.serial_in:
+            lines.append(self.readline())
+        return lines
+
+    def write(self, buf):
+        pad.serial_out.extend(buf)
+        pad.poll_serial()
+        return len(buf)
+
+    def flush(self):
+        pad.poll_serial()
+
+    def reset_input_buffer(self):
+        pad.serial_in.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+console = Serial()
+data = None
+
+def enable(*, console=True, data=False):
+    """boot.py: data is the port code.py talks to the host on (the console stays stdout)"""
+    globals()["data"] = Serial() if data else None
+
+def disable():
+    globals()["data"] = None
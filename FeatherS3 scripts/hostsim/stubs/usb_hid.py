@@ -0,0 +1,65 @@
+"""
+usb_hid (stub)
+Devices check the report length like the real ones and append what they send to pad.hid_reports
+"""
+
+from hostsim import pad
+
+class Device:
+    KEYBOARD = None
+    MOUSE = None
+    CONSUMER_CONTROL = None
+
+    def __init__(self, *, report_descriptor, usage_page, usage, report_ids, in_report_lengths,
+                 out_report_lengths):
+        self.report_descriptor = bytes(report_descriptor)
+        self.usage_page = usage_page
+        self.usage = usage
+        self.report_ids = tuple(report_ids)
+        self.in_report_lengths = tuple(in_report_lengths)
+        self.out_report_lengths = tuple(out_report_lengths)
+        self.last_received_report = None
+
+    def _index(self, report_id):
+        if report_id is None:
+            return 0
+        if report_id not in self.report_ids:
+            raise ValueError("Invalid report_id")
+        return self.report_ids.index(report_id)
+
+    def send_report(self, report, report_id=None):
+        length = self.in_report_lengths[self._index(report_id)]
+        if len(report) != length:
+            raise ValueError(f"Buffer incorrect size. Should be {length} bytes.")
+        pad.hid_reports.append((self.usage_page, self.usage, bytes(report)))
+
+    def get_last_received_report(self, report_id=None):
+        """Like CircuitPython 9: a report once per SET_REPORT of the host, None in between"""
+        self._index(report_id)
+        return pad.received_reports.pop((self.usage, report_id), None)
+
+Device.KEYBOARD = Device(report_descriptor=b"", usage_page=0x01, usage=0x06, report_ids=(1,),
+                         in_report_lengths=(8,), out_report_lengths=(1,))
+Device.MOUSE = Device(report_descriptor=b"", usage_page=0x01, usage=0x02, report_ids=(2,),
+                      in_report_lengths=(4,), out_report_lengths=(0,))
+Device.CONSUMER_CONTROL = Device(report_descriptor=b"", usage_page=0x0C, usage=0x01, report_ids=(3,),
+                                 in_report_lengths=(2,), out_report_lengths=(0,))
+
+devices = (Device.KEYBOARD, Device.MOUSE, Device.CONSUMER_CONTROL)
+_boot_device = 0
+
+def enable(devices_to_enable, boot_device=0):
+    """boot.py: the devices code.py gets (takes effect at once here, not after the next reset)"""
+    global devices, _boot_device
+    devices = tuple(devices_to_enable)
+    _boot_device = boot_device
+
+def disable():
+    global devices
+    devices = ()
+
+def get_boot_device():
+    return _boot_device
+
+def set_interface_name(interface_name):
+    pass
@@ -0,0 +1,181 @@
+"""
+Virtual Pad on a Pseudo-Terminal
+Runs the firmware on the host simulator (realtime clock) behind a Linux PTY, so pyserial,
+debug_serial.py and the desktop app see an ordinary serial port - PING, config upload / download,
+BATTERY_STATUS, SET_TIME, SET_DISPLAY_MODE and every other command are handled by the real
+code.py. The link adds latency and a throughput limit; several pads run as separate processes
+
+    cd "FeatherS3 scripts"
+    python -m hostsim.vpad                                  # one pad, prints its port (/dev/pts/N)
+    python -m hostsim.vpad --count 8 --link /tmp/padawan    # /tmp/padawan0 .. /tmp/padawan7
+    python -m hostsim.vpad --latency-ms 2 --bytes-per-s 64000 --layers 20
+"""
+
+import argparse
+import collections
+import io
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import tty
+
+from hostsim import bench, pad, runner
+
+# USB full speed bulk packets - the link delivers data in these steps
+PACKET_SIZE = 64
+# Output the host doesn't read is dropped beyond this (a full USB buffer on the board)
+MAX_PENDING = 64 * 1024
+
+class Pipe:
+    """One direction of the link: each packet arrives latency_s after it has crossed the wire at
+    bytes_per_s (0 = unlimited)"""
+
+    def __init__(self, latency_s=0.0, bytes_per_s=0):
+        self.latency_s = latency_s
+        self.bytes_per_s = bytes_per_s
+        self._packets = collections.deque()
+        self._free_at = 0.0
+
+    def push(self, data, now):
+        for start in range(0, len(data), PACKET_SIZE):
+            packet = data[start:start + PACKET_SIZE]
+            sent = max(now, self._free_at)
+            if self.bytes_per_s:
+                sent += len(packet) / self.bytes_per_s
+            self._free_at = sent
+            self._packets.append((sent + self.latency_s, packet))
+
+    def pull(self, now):
+        """Bytes that have arrived by now"""
+        data = bytearray()
+        while self._packets and self._packets[0][0] <= now:
+            data += self._packets.popleft()[1]
+        return bytes(data)
+
+class PtyLink:
+    """A PTY whose far end is the pad's CDC data port (pad.serial_in / pad.serial_out)"""
+
+    def __init__(self, latency_s=0.0, bytes_per_s=0, link=None):
+        self.master, self._slave = os.openpty()
+        # Raw: no echo, no CR/LF translation - the bytes pass through as they are
+        tty.setraw(self._slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self._slave)
+        self.link = link
+        if link:
+            if os.path.islink(link):
+                os.remove(link)
+            os.symlink(self.port, link)
+        self._to_pad = Pipe(latency_s, bytes_per_s)
+        self._to_host = Pipe(latency_s, bytes_per_s)
+        self._pending = b""
+
+    def poll(self):
+        """Move bytes between the PTY and the pad (pad.on_serial / on_sleep hook)"""
+        now = time.perf_counter()
+        try:
+            data = os.read(self.master, 4096)
+        except BlockingIOError:
+            data = b""
+        if data:
+            self._to_pad.push(data, now)
+        pad.serial_in.extend(self._to_pad.pull(now))
+        if pad.serial_out:
+            self._to_host.push(pad.read_serial(), now)
+        self._pending += self._to_host.pull(now)
+        if self._pending:
+            try:
+                written = os.write(self.master, self._pending)
+            except BlockingIOError:
+                written = 0
+            self._pending = self._pending[written:]
+            if len(self._pending) > MAX_PENDING:
+                self._pending = self._pending[-MAX_PENDING:]
+
+    def close(self):
+        if self.link and os.path.islink(self.link):
+            os.remove(self.link)
+        os.close(self.master)
+        os.close(self._slave)
+
+def serve(index, ports, latency_s=0.0, bytes_per_s=0, link=None, config=None, settings=None, log=None):
+    """Run one virtual pad until it is terminated (a multiprocessing target); its port name goes
+    to the ports queue as (index, port)"""
+    link_ = PtyLink(latency_s, bytes_per_s, link)
+    pad.reset()
+    pad.on_serial(link_.poll)
+    ports.put((index, link_.link or link_.port))
+    console = open(log, "w", buffering=1) if log else io.StringIO()
+    # terminate() ends the run through the firmware (SystemExit isn't caught there) and removes the link
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    def forget_console():
+        # Console output of a pad that runs for days must not pile up in memory
+        while True:
+            yield 1000
+            if not log:
+                console.seek(0)
+                console.truncate()
+
+    try:
+        runner.run(forget_console, config=config, settings=settings, realtime=True, console=console)
+    finally:
+        link_.close()
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m hostsim.vpad", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1, help="number of virtual pads")
+    parser.add_argument("--link", help="symlink prefix for the ports (pad i at <link><i>)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="one-way latency of the link")
+    parser.add_argument("--bytes-per-s", type=int, default=0, help="throughput limit per direction (0 = none)")
+    parser.add_argument("--config", help="macropad_config.json on the SD card of every pad")
+    parser.add_argument("--layers", type=int, help="boot with a generated config of this many layers instead")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="settings.toml override")
+    parser.add_argument("--log", help="folder for the console output of the pads (pad<i>.log)")
+    args = parser.parse_args()
+
+    config = os.path.abspath(args.config) if args.config else None
+    if args.layers:
+        config = bench.sample_config(args.layers)
+    settings = {}
+    for text in args.set:
+        key, _, value = text.partition("=")
+        settings[key] = int(value) if value.lstrip("-").isdigit() else value
+    if args.log:
+        os.makedirs(args.log, exist_ok=True)
+
+    # kill / systemd stop the pads like Ctrl+C does
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    ports = multiprocessing.Queue()
+    processes = []
+    for index in range(args.count):
+        link = f"{args.link}{index}" if args.link else None
+        log = os.path.join(args.log, f"pad{index}.log") if args.log else None
+        process = multiprocessing.Process(target=serve, daemon=True,
+                                          args=(index, ports, args.latency_ms / 1000, args.bytes_per_s,
+                                                link, config, settings, log))
+        process.start()
+        processes.append(process)
+    names = dict(ports.get(timeout=30) for _ in processes)
+    for index in range(args.count):
+        print(f"🔌 Pad {index}: {names[index]}")
+    print(f"   latency {args.latency_ms} ms, {'unlimited' if not args.bytes_per_s else f'{args.bytes_per_s} bytes/s'}"
+          " - Ctrl+C stops the pads")
+    try:
+        while all(process.is_alive() for process in processes):
+            time.sleep(0.5)
+        print("💥 A pad stopped - see its log")
+        return False
+    except KeyboardInterrupt:
+        return True
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=2)
+
+if __name__ == "__main__":
+    exit(0 if main() else 1)
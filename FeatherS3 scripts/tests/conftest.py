@@ -0,0 +1,28 @@
+"""
+Firmware tests on the host simulator - run from "FeatherS3 scripts":
+
+    python -m pytest tests
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hostsim import bench, pad
+
+@pytest.fixture(autouse=True)
+def fresh_pad():
+    """Every test starts on an erased pad (NVM, pins, recorded reports)"""
+    pad.reset()
+    yield
+
+def upload_script(config, replies):
+    """Generator for a runner script: uploads config as the desktop app does, returns the reply"""
+    text = json.dumps(config, indent=2)
+    pad.write_serial("BEGIN_JSON\n" + text + "\nEND_JSON\n")
+    reply, _, _ = yield from replies.wait("UPLOAD_")
+    return reply
@@ -0,0 +1,9 @@
+"""
+Steady-state main loop allocates nothing: ALLOC_CHECK of the firmware with allocation tracking
+"""
+
+from hostsim import bench
+
+def test_idle_and_input_passes_allocate_nothing():
+    check = bench.alloc_check()
+    assert check.startswith("ALLOC_CHECK:result=PASS"), check
@@ -0,0 +1,41 @@
+"""
+NVM config cache: boot reads it before the SD card, so it must never hold an older config than the SD
+"""
+
+import io
+import json
+
+from conftest import upload_script
+from hostsim import bench, pad, runner
+
+NVM_MAGIC = slice(16, 20)   # config_cache.NVM_CACHE_OFFSET, MAGIC
+
+def test_oversize_upload_empties_the_cache(tmp_path):
+    results = {}
+
+    def upload():
+        replies = bench.ReplyLog()
+        pad.on_serial(replies.poll)
+        yield bench.WARMUP_PASSES
+        results["cached"] = bytes(pad.nvm[NVM_MAGIC])
+        # 60 layers compile to more than NVM holds
+        results["reply"] = yield from upload_script(bench.sample_config(60), replies)
+
+    runner.run(upload, root=str(tmp_path), config=bench.sample_config(1), console=bench.NullConsole())
+    assert results["cached"] == b"PCFG"
+    assert results["reply"] == "UPLOAD_OK"
+    assert bytes(pad.nvm[NVM_MAGIC]) != b"PCFG"
+
+    def download():
+        replies = bench.ReplyLog()
+        pad.on_serial(replies.poll)
+        yield bench.WARMUP_PASSES
+        pad.write_serial(b"DOWNLOAD_CONFIG\n")
+        line, _, _ = yield from replies.wait("CONFIG:")
+        results["layers"] = len(json.loads(line.split(":", 1)[1])["layers"])
+
+    # Reboot with the same SD card and NVM
+    console = io.StringIO()
+    runner.run(download, root=str(tmp_path), console=console)
+    assert "Config loaded from NVM cache" not in console.getvalue()
+    assert results["layers"] == 60
@@ -0,0 +1,41 @@
+"""
+Macro steps on the NKRO keyboard
+"""
+
+from hostsim import bench, pad, runner
+
+SHIFT = 0x02        # Modifier byte bit of Left Shift
+KEY_A = (1, 0x10)   # Bitmap byte and bit of keycode 0x04
+
+def run_macro(key, settings=None):
+    """Press button 1 bound to a Macro with the compact steps `key`, returns the keyboard reports"""
+    config = bench.sample_config(1)
+    config["layers"][0]["buttons"]["1"] = {"action": "Macro", "key": key, "enabled": True}
+
+    def script():
+        yield bench.WARMUP_PASSES
+        pad.hid_reports.clear()
+        pad.press("IO14")
+        yield 10
+        pad.release("IO14")
+        yield 50
+
+    runner.run(script, config=config, settings=settings, console=bench.NullConsole())
+    return [report for _, _, report in pad.reports(6)]
+
+def test_press_tap_release():
+    reports = run_macro("press:Shift; tap:A; release:")
+    assert reports[0][0] == SHIFT
+    byte, bit = KEY_A
+    assert any(report[0] == SHIFT and report[byte] & bit for report in reports)
+    assert not any(reports[-1])
+
+def test_held_keys_released_when_the_macro_ends():
+    reports = run_macro("press:Shift; tap:A")
+    assert not any(reports[-1])
+
+def test_boot_keyboard():
+    # 6KRO fallback: the steps go through adafruit_hid's Keyboard
+    reports = run_macro("press:Shift; tap:A; release:", settings={"PADAWAN_HID_KEYBOARD": "boot"})
+    assert reports[0][0] == SHIFT
+    assert not any(reports[-1])
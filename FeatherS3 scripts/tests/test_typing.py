@@ -0,0 +1,47 @@
+"""
+Type Text next to keys other bindings hold
+"""
+
+from hostsim import bench, pad, runner
+
+KEY_B = 0x05    # Held by a macro on button 1 - "Hallo Welt!" has no b
+
+def run_text_while_held(settings=None):
+    """Hold B through a macro on button 1, type "Hallo Welt!" with button 2, returns the keyboard
+    reports from the text press on and the number of them sent while the text was typing"""
+    config = bench.sample_config(1)
+    config["layers"][0]["buttons"]["1"] = {"action": "Macro", "key": "press:B; wait:1000", "enabled": True}
+    results = {}
+
+    def script():
+        yield bench.WARMUP_PASSES
+        pad.press("IO14")
+        yield 10
+        pad.release("IO14")
+        yield 10
+        pad.hid_reports.clear()
+        pad.press("IO18")
+        yield 10
+        pad.release("IO18")
+        yield 100
+        results["typed"] = len(pad.reports(6))
+        # The macro ends after a second and releases B
+        yield 1000
+
+    runner.run(script, config=config, settings=settings, console=bench.NullConsole())
+    return [report for _, _, report in pad.reports(6)], results["typed"]
+
+def test_held_key_stays_down_while_typing():
+    reports, typed = run_text_while_held()
+    assert typed > 2
+    byte, bit = 1 + (KEY_B >> 3), 1 << (KEY_B & 7)
+    assert all(report[byte] & bit for report in reports[:typed])
+    assert not any(reports[-1])
+
+def test_held_key_stays_down_while_typing_boot_keyboard():
+    reports, typed = run_text_while_held({"PADAWAN_HID_KEYBOARD": "boot"})
+    assert typed > 2
+    assert all(KEY_B in report[2:] for report in reports[:typed])
+    # Text keys go into another slot
+    assert any(len(set(report[2:]) - {0}) == 2 for report in reports[:typed])
+    assert not any(reports[-1])
@@ -0,0 +1,43 @@
+"""
+Scroll knob on the high resolution wheel mouse
+"""
+
+import struct
+
+from hostsim import bench, pad, runner
+
+MOUSE = 0x02
+MOUSE_REPORT_ID = 2     # hid_descriptors.MOUSE_REPORT_ID
+KNOB_PIN = "IO10"
+
+def wheel_counts():
+    """Wheel field of every mouse report sent"""
+    return [struct.unpack_from("<Bhhhh", report)[3] for _, _, report in pad.reports(MOUSE)]
+
+def test_multiplier_resets_when_usb_reconnects():
+    config = bench.sample_config(1)
+    config["layers"][0]["knobs"]["A"].update(cwAction="Scroll Up", ccwAction="Scroll Down")
+    counts = {}
+
+    def script():
+        yield bench.WARMUP_PASSES
+        pad.turn(KNOB_PIN, 1)
+        yield 10
+        # The host enables the wheel multiplier
+        pad.host_set_report(MOUSE, MOUSE_REPORT_ID, b"\x0f")
+        pad.turn(KNOB_PIN, 1)
+        yield 10
+        counts["before"] = wheel_counts()
+        # KVM switch: a host that never sets the feature report
+        pad.usb_connected = False
+        yield 5
+        pad.usb_connected = True
+        yield 5
+        pad.hid_reports.clear()
+        pad.turn(KNOB_PIN, 1)
+        yield 10
+        counts["after"] = wheel_counts()
+
+    runner.run(script, config=config, console=bench.NullConsole())
+    assert counts["before"] == [1, 120]
+    assert counts["after"] == [1]
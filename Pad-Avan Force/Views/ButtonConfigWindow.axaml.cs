@@ -135,6 +135,11 @@ namespace PadAwan_Force.Views
                 "Key combo" => 2,
                 "Layer Switch" => 3,
                 "None" => 4,
+                "Macro" => 5,
+                "Momentary Layer" => 6,
+                "Toggle Layer" => 7,
+                "One-Shot Layer" => 8,
+                "Transparent" => 9,
                 _ => 0
             };
         }
@@ -273,6 +278,10 @@ namespace PadAwan_Force.Views
                     switch (selectedAction)
                     {
                         case "Type Text":
+                        case "Macro": // Steps like "press:Ctrl; tap:C; wait:100; type:Hallo"
+                        case "Momentary Layer": // Layer number
+                        case "Toggle Layer":
+                        case "One-Shot Layer":
                             keyValuePanel.IsVisible = true;
                             specialKeyPanel.IsVisible = false;
                             keyComboPanel.IsVisible = false;
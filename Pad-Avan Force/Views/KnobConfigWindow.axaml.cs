@@ -456,7 +456,9 @@ namespace PadAwan_Force.Views
                 "Decrease Volume" => 1,
                 "Scroll Up" => 2,
                 "Scroll Down" => 3,
-                "None" => 4,  // CCW/CW ComboBox has 5 items (0-4)
+                "Scroll Left" => 4,
+                "Scroll Right" => 5,
+                "None" => 6,  // CCW/CW ComboBox has 7 items (0-6)
                 _ => 0
             };
         }
@@ -485,9 +487,9 @@ namespace PadAwan_Force.Views
                 var pressComboBox = this.FindControl<ComboBox>("PressActionComboBox");
 
                 if (ccwComboBox != null && ccwComboBox.SelectedIndex == -1) 
-                    ccwComboBox.SelectedIndex = 4; // None (CCW has 5 items)
+                    ccwComboBox.SelectedIndex = 6; // None (CCW has 7 items)
                 if (cwComboBox != null && cwComboBox.SelectedIndex == -1) 
-                    cwComboBox.SelectedIndex = 4; // None (CW has 5 items)
+                    cwComboBox.SelectedIndex = 6; // None (CW has 7 items)
                 if (pressComboBox != null && pressComboBox.SelectedIndex == -1) 
                     pressComboBox.SelectedIndex = 4; // None (Press has 5 items)
             }, DispatcherPriority.Loaded);
@@ -1,16 +1,43 @@
 #!/usr/bin/env python3
 """
 FeatherS3 / CircuitPython serial comms tester (handles CDC DATA vs CONSOLE)
+
+    python debug_serial.py                          # find the port that answers PING
+    python debug_serial.py --ping /tmp/padawan0     # PING one port (virtual pads aren't listed)
+    python debug_serial.py --typing-benchmark COM5  # fastest report interval the host types reliably
+    python debug_serial.py --stats COM5 [--reset]   # loop / press-to-report histograms and counters
+    python debug_serial.py --mem COM5 [--track on]  # heap watermarks, GC count, allocation per code region
+    python debug_serial.py --alloc-check COM5       # fails if idle or input loop passes allocate
+    python debug_serial.py --benchmark COM5 --layers 1,10,50,100 -o fw-1.0.json
+                                                    # PING / upload / download timing as JSON
 """
 
+import argparse
+import errno
+import json
+import os
 import serial, serial.tools.list_ports as lp
+import sys
 import time
 
+# The benchmark uploads the same synthetic config as the host simulator's benchmark
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "FeatherS3 scripts"))
+from hostsim.configs import sample_config
+
 BAUD = 115200          # USB CDC ignoriert's meist, aber ist "üblich"
 READ_INIT_SEC = 2.0
 READ_RESP_SEC = 3.0
 PING_BYTES = b"PING\n"
 
+# Typing benchmark: must match typing_engine.BENCHMARK_PATTERN on the device
+BENCHMARK_PATTERN = "abcdefghijklmnopqrstuvwx0123456789"
+BENCHMARK_INTERVALS_MS = (0, 1, 2, 4, 8, 16)
+BENCHMARK_RESULT_SEC = 30.0
+
+# Serial benchmark: large configs take seconds to upload and download over a slow link
+BENCHMARK_REPLY_SEC = 60.0
+UPLOAD_FEEDBACK_SEC = 1.2
+
 def classify_port(p):
     """Try to guess DATA vs CONSOLE from pyserial's port info"""
     desc = (p.description or "").lower()
@@ -49,18 +76,29 @@ def list_ports_verbose():
         print(f"     hwid={meta['hwid']}")
     return ports
 
+def open_port(port_name, rts=None):
+    """Open a pad port with DTR on (shows "connected" on some hosts). Pseudo-terminals
+    (hostsim.vpad virtual pads) have no modem lines, there DTR/RTS are skipped."""
+    ser = serial.Serial(port_name, BAUD, timeout=0.2, write_timeout=0.5)
+    try:
+        ser.dtr = True
+        if rts is not None:
+            ser.rts = rts
+    except OSError as e:
+        if e.errno != errno.ENOTTY:
+            ser.close()
+            raise
+    return ser
+
 def try_ping(port_name):
     print(f"\n🔌 Testing {port_name} ...")
     try:
-        with serial.Serial(port_name, BAUD, timeout=0.2, write_timeout=0.5) as ser:
+        # DTR/RTS an manchen Hosts wichtig (zeigt "connected" an)
+        with open_port(port_name, rts=False) as ser:
             # Stabilisieren
             ser.reset_input_buffer()
             ser.reset_output_buffer()
 
-            # DTR/RTS an manchen Hosts wichtig (zeigt "connected" an)
-            ser.dtr = True
-            ser.rts = False
-
             # Initialoutput einsammeln (REPL, boot, prints)
             print("📖 Reading initial output ...")
             t0 = time.time()
@@ -103,6 +141,275 @@ def try_ping(port_name):
         print(f"❌ Open/IO error on {port_name}: {e}")
         return False
 
+def read_benchmark_result(ser):
+    """Wait for TYPING_BENCHMARK:interval,characters,elapsed_ms,completed"""
+    t0 = time.time()
+    while time.time() - t0 < BENCHMARK_RESULT_SEC:
+        line = ser.readline()
+        s = line.decode("utf-8", "ignore").strip()
+        if s.startswith("TYPING_BENCHMARK_ERROR"):
+            raise RuntimeError(s)
+        if s.startswith("TYPING_BENCHMARK:"):
+            interval, chars, elapsed_ms, completed = (int(v) for v in s.split(":", 1)[1].split(","))
+            return chars, elapsed_ms, bool(completed)
+    raise TimeoutError("no TYPING_BENCHMARK result")
+
+def typing_benchmark(port_name, repeats=3, rounds=2):
+    """Let the pad type a known pattern into this terminal at shrinking report intervals
+    and report the fastest interval that arrives without dropped characters"""
+    expected = BENCHMARK_PATTERN * repeats
+    print("⌨️  Typing benchmark - keep THIS terminal focused, the pad types into it.")
+    print("   (Host layout must be DE or US. If a line never finishes, press Enter.)")
+    fastest = None
+    with open_port(port_name) as ser:
+        ser.reset_input_buffer()
+        for interval in BENCHMARK_INTERVALS_MS:
+            ok = True
+            for _ in range(rounds):
+                print(f"\n📤 Interval {interval} ms:")
+                ser.write(f"TYPING_BENCHMARK:{interval},{repeats}\n".encode())
+                ser.flush()
+                typed = input()
+                chars, elapsed_ms, completed = read_benchmark_result(ser)
+                cps = chars * 1000 / elapsed_ms if elapsed_ms else float("inf")
+                good = completed and typed == expected
+                print(f"   {'✅' if good else '❌'} {len(typed)}/{len(expected)} chars, {elapsed_ms} ms, {cps:.0f} chars/s")
+                ok = ok and good
+            if ok:
+                fastest = interval
+                break
+    print("\n" + "="*50)
+    if fastest is None:
+        print("💥 No interval typed reliably - check the host keyboard layout.")
+        return False
+    print(f"🎉 Fastest reliable report interval: {fastest} ms")
+    print(f'   Config: "typing": {{"reportInterval": {fastest}}}')
+    return True
+
+def read_reply(ser, prefix, timeout=READ_RESP_SEC):
+    """First line starting with `prefix` (console chatter in between is skipped)"""
+    t0 = time.time()
+    pending = b""
+    while time.time() - t0 < timeout:
+        # readline() gives up after the port timeout - long replies (CONFIG:) arrive in pieces
+        pending += ser.readline()
+        if not pending.endswith(b"\n"):
+            continue
+        s = pending.decode("utf-8", "ignore").strip()
+        pending = b""
+        if s.startswith(prefix):
+            return s
+    raise TimeoutError(f"no {prefix} reply")
+
+def parse_stats(line):
+    """STATS:key=value,...,pass_hist=limit:count|...  ->  dict (histograms as [(limit, count)])"""
+    stats = {}
+    for part in line.split(":", 1)[1].split(","):
+        key, _, value = part.partition("=")
+        if key.endswith("_hist"):
+            stats[key] = [tuple(bucket.split(":")) for bucket in value.split("|") if bucket]
+        else:
+            stats[key] = int(value)
+    return stats
+
+def print_histogram(title, buckets):
+    total = sum(int(count) for _, count in buckets) or 1
+    print(f"\n{title}")
+    for limit, count in buckets:
+        label = f"<= {limit} ms" if limit != "inf" else "> 512 ms"
+        bar = "#" * max(1, int(count) * 40 // total)
+        print(f"   {label:>10} {int(count):8d} {bar}")
+
+def show_stats(port_name, reset=False):
+    """Print the STATS of the pad, optionally clearing them afterwards for the next measurement"""
+    with open_port(port_name) as ser:
+        ser.reset_input_buffer()
+        ser.write(b"STATS\n")
+        ser.flush()
+        stats = parse_stats(read_reply(ser, "STATS:"))
+        if reset:
+            ser.write(b"STATS_RESET\n")
+            ser.flush()
+            read_reply(ser, "STATS_RESET_OK")
+    seconds = stats["uptime_ms"] / 1000
+    print(f"📊 {seconds:.1f} s, {stats['passes']} loop passes ({stats['passes'] / seconds if seconds else 0:.0f}/s)")
+    for key in ("pass_max_ms", "latencies", "latency_max_ms", "hid_reports",
+                "usb_rx_bytes", "usb_tx_bytes", "sd_reads", "gc_runs"):
+        print(f"   {key:<16} {stats[key]}")
+    print_histogram("Loop pass duration", stats["pass_hist"])
+    print_histogram("Press to HID report", stats["latency_hist"])
+    return True
+
+def parse_mem(line):
+    """MEM:key=value,...,regions=name:runs/total/max/spoiled|...  ->  dict (regions as {name: (runs, total, max, spoiled)})"""
+    mem = {}
+    for part in line.split(":", 1)[1].split(","):
+        key, _, value = part.partition("=")
+        if key == "regions":
+            mem[key] = {}
+            for region in value.split("|"):
+                if region:
+                    name, _, numbers = region.partition(":")
+                    mem[key][name] = tuple(int(n) for n in numbers.split("/"))
+        else:
+            mem[key] = int(value)
+    return mem
+
+def show_mem(port_name, track=None, reset=False):
+    """Print the MEM report of the pad. track "on"/"off" switches the per-region measurement
+    (it costs a heap walk per region, so it is off after every boot)."""
+    with open_port(port_name) as ser:
+        ser.reset_input_buffer()
+        ser.write(b"MEM\n")
+        ser.flush()
+        mem = parse_mem(read_reply(ser, "MEM:"))
+        if track is not None:
+            ser.write(f"MEM_TRACK:{1 if track == 'on' else 0}\n".encode())
+            ser.flush()
+            read_reply(ser, "MEM_TRACK:")
+        if reset:
+            ser.write(b"MEM_RESET\n")
+            ser.flush()
+            read_reply(ser, "MEM_RESET_OK")
+    print(f"🧠 Heap {mem['heap']} bytes: {mem['alloc']} used, {mem['free']} free")
+    print(f"   {'min_free':<16} {mem['min_free']}")
+    print(f"   {'max_alloc':<16} {mem['max_alloc']}")
+    print(f"   {'collections':<16} {mem['collections']}")
+    print(f"   {'config_bytes':<16} {mem['config_bytes']}")
+    if not mem["tracking"] and not mem["regions"]:
+        print("\n(region tracking is off - run with --track on, use the pad, then read again)")
+        return True
+    print(f"\n{'region':<12} {'runs':>8} {'bytes':>10} {'per run':>8} {'max':>8} {'spoiled':>8}")
+    regions = sorted(mem["regions"].items(), key=lambda item: item[1][1], reverse=True)
+    for name, (runs, total, largest, spoiled) in regions:
+        counted = runs - spoiled
+        per_run = total / counted if counted else 0
+        print(f"{name:<12} {runs:8d} {total:10d} {per_run:8.1f} {largest:8d} {spoiled:8d}")
+    return True
+
+def alloc_check(port_name, passes=2000):
+    """Run ALLOC_CHECK on the pad: press keys and turn the knobs while it measures"""
+    with open_port(port_name) as ser:
+        ser.reset_input_buffer()
+        ser.write(f"ALLOC_CHECK:{passes}\n".encode())
+        ser.flush()
+        read_reply(ser, "ALLOC_CHECK_STARTED:")
+        print(f"⏱️  Measuring {passes} loop passes - press keys and turn the knobs now")
+        # Idle passes run at 1 ms, slower once the pad drops to its idle scan rate
+        line = read_reply(ser, "ALLOC_CHECK:", timeout=max(30.0, passes * 0.05))
+    results = {}
+    for part in line.split(":", 1)[1].split(","):
+        key, _, value = part.partition("=")
+        results[key] = value
+    print(f"\n{'passes':<8} {'count':>8} {'allocating':>11} {'max bytes':>10}")
+    for kind in ("idle", "input", "timer", "host"):
+        count, allocating, largest = (int(n) for n in results[kind].split("/"))
+        print(f"{kind:<8} {count:8d} {allocating:11d} {largest:10d}")
+    if results["input"].startswith("0/"):
+        print("\n(no input pass measured - press a key during the check to cover the input path)")
+    ok = results["result"] == "PASS"
+    print("\n✅ No allocation in idle and input passes" if ok else "\n💥 Idle or input passes allocate - see MEM regions (--mem --track on)")
+    return ok
+
+def percentiles(values):
+    """n / mean / p50 / p90 / p99 / max of a list of milliseconds"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+    return {"n": len(ordered), "mean": round(sum(ordered) / len(ordered), 3), "p50": pick(0.5),
+            "p90": pick(0.9), "p99": pick(0.99), "max": round(ordered[-1], 3)}
+
+def command(ser, line, prefix, timeout=READ_RESP_SEC):
+    """Send one command, return (reply, milliseconds until it arrived)"""
+    t0 = time.perf_counter()
+    ser.write(f"{line}\n".encode())
+    ser.flush()
+    reply = read_reply(ser, prefix, timeout)
+    return reply, (time.perf_counter() - t0) * 1000
+
+def upload(ser, text):
+    """BEGIN_JSON, the lines, END_JSON -> (reply, upload ms, transfer ms, END_JSON to reply ms).
+    A PING before END_JSON marks when the pad has read every line (commands are answered during
+    an upload): the transfer is the time up to its PONG, END_JSON -> UPLOAD_OK the parse / compile /
+    save time alone."""
+    t0 = time.perf_counter()
+    ser.write(b"BEGIN_JSON\n")
+    for line in text.split("\n"):
+        ser.write(f"{line}\n".encode())
+    ser.write(b"PING\n")
+    ser.flush()
+    read_reply(ser, "PONG", BENCHMARK_REPLY_SEC)
+    t1 = time.perf_counter()
+    ser.write(b"END_JSON\n")
+    ser.flush()
+    reply = read_reply(ser, "UPLOAD_", BENCHMARK_REPLY_SEC)
+    t2 = time.perf_counter()
+    # The pad shows "Done!" for a second before it reads the next command
+    time.sleep(UPLOAD_FEEDBACK_SEC)
+    return reply, (t2 - t0) * 1000, (t1 - t0) * 1000, (t2 - t1) * 1000
+
+def serial_benchmark(port_name, sizes=(1, 10, 50, 100), pings=100, label=None, output="serial_benchmark.json"):
+    """PING round trip, command throughput and config upload / download time by config size,
+    written as JSON so runs can be compared across firmware versions and ports (a real pad or
+    a hostsim.vpad). The pad's own config is uploaded again at the end."""
+    results = {"port": port_name, "label": label, "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+               "pings": pings}
+    with open_port(port_name) as ser:
+        ser.reset_input_buffer()
+        command(ser, "PING", "PONG")
+
+        print(f"⏱️  {pings} x PING ...")
+        rtt = [command(ser, "PING", "PONG")[1] for _ in range(pings)]
+        results["ping_rtt_ms"] = percentiles(rtt)
+        print(f"   p50 {results['ping_rtt_ms']['p50']} ms, p99 {results['ping_rtt_ms']['p99']} ms")
+
+        # Pipelined: all commands sent at once, the pad works through them one per loop pass
+        print(f"⏱️  {pings} x PING pipelined ...")
+        t0 = time.perf_counter()
+        ser.write(PING_BYTES * pings)
+        ser.flush()
+        for _ in range(pings):
+            read_reply(ser, "PONG", BENCHMARK_REPLY_SEC)
+        elapsed = time.perf_counter() - t0
+        results["ping_pipelined"] = {"n": pings, "ms": round(elapsed * 1000, 3),
+                                     "commands_per_s": round(pings / elapsed, 1)}
+        _, battery_ms = command(ser, "BATTERY_STATUS", "BATTERY:")
+        results["battery_status_ms"] = round(battery_ms, 3)
+        print(f"   {results['ping_pipelined']['commands_per_s']} commands/s")
+
+        original, _ = command(ser, "DOWNLOAD_CONFIG", ("CONFIG:", "DOWNLOAD_ERROR"), BENCHMARK_REPLY_SEC)
+        results["config"] = []
+        try:
+            for layers in sizes:
+                text = json.dumps(sample_config(layers), indent=2)
+                print(f"📤 {layers} layers ({len(text)} bytes) ...")
+                reply, upload_ms, transfer_ms, end_json_ms = upload(ser, text)
+                config, download_ms = command(ser, "DOWNLOAD_CONFIG", "CONFIG:", BENCHMARK_REPLY_SEC)
+                results["config"].append({
+                    "layers": layers, "json_bytes": len(text), "lines": text.count("\n") + 1,
+                    "result": reply, "upload_ms": round(upload_ms, 3),
+                    "transfer_ms": round(transfer_ms, 3),
+                    "end_json_to_upload_ok_ms": round(end_json_ms, 3),
+                    # The lines alone - upload_ms also counts parsing and compiling
+                    "upload_bytes_per_s": round(len(text) / transfer_ms * 1000),
+                    "download_bytes": len(config), "download_ms": round(download_ms, 3),
+                })
+                print(f"   {reply}: upload {upload_ms:.0f} ms (transfer {transfer_ms:.0f} ms,"
+                      f" END_JSON -> reply {end_json_ms:.0f} ms),"
+                      f" download {download_ms:.0f} ms")
+        finally:
+            # Put the pad's config back, indented like the desktop app sends it
+            if original.startswith("CONFIG:"):
+                print("📤 Restoring the original config ...")
+                upload(ser, json.dumps(json.loads(original.split(":", 1)[1]), indent=2))
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print(f"📈 Results -> {output}")
+    return all(entry["result"] == "UPLOAD_OK" for entry in results["config"])
+
 def main():
     print("🚀 FeatherS3 Serial Ping")
     print("="*50)
@@ -135,5 +442,35 @@ def main():
         return False
 
 if __name__ == "__main__":
-    ok = main()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ping", metavar="PORT", help="PING only this port (e.g. a hostsim.vpad pseudo-terminal)")
+    parser.add_argument("--typing-benchmark", metavar="PORT", help="run the typing benchmark on this CDC data port")
+    parser.add_argument("--repeats", type=int, default=3, help="pattern repeats per benchmark line")
+    parser.add_argument("--stats", metavar="PORT", help="print the loop / latency statistics of the pad on this port")
+    parser.add_argument("--mem", metavar="PORT", help="print the heap / GC / allocation report of the pad on this port")
+    parser.add_argument("--alloc-check", metavar="PORT", help="check that idle and input loop passes of the pad allocate nothing")
+    parser.add_argument("--passes", type=int, default=2000, help="with --alloc-check: loop passes to measure")
+    parser.add_argument("--track", choices=("on", "off"), help="with --mem: switch per-region allocation tracking")
+    parser.add_argument("--benchmark", metavar="PORT", help="time PING, commands and config upload / download on this port")
+    parser.add_argument("--layers", default="1,10,50,100", help="with --benchmark: config sizes to upload")
+    parser.add_argument("--pings", type=int, default=100, help="with --benchmark: PING samples")
+    parser.add_argument("--label", help="with --benchmark: firmware version or note stored in the results")
+    parser.add_argument("-o", "--output", default="serial_benchmark.json", help="with --benchmark: results file")
+    parser.add_argument("--reset", action="store_true", help="with --stats / --mem: clear the counters after reading them")
+    args = parser.parse_args()
+    if args.ping:
+        ok = try_ping(args.ping)
+    elif args.typing_benchmark:
+        ok = typing_benchmark(args.typing_benchmark, args.repeats)
+    elif args.stats:
+        ok = show_stats(args.stats, args.reset)
+    elif args.mem:
+        ok = show_mem(args.mem, args.track, args.reset)
+    elif args.alloc_check:
+        ok = alloc_check(args.alloc_check, args.passes)
+    elif args.benchmark:
+        sizes = [int(size) for size in args.layers.split(",")]
+        ok = serial_benchmark(args.benchmark, sizes, args.pings, args.label, args.output)
+    else:
+        ok = main()
     exit(0 if ok else 1)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+PadAwan event trace -> Chrome trace JSON (open in chrome://tracing or ui.perfetto.dev)
+
+    python trace_export.py --start COM5              # clear the trace buffer on the pad and start recording
+    python trace_export.py COM5 -o trace.json        # dump the buffer and convert it
+    python trace_export.py COM5 --save dump.txt      # also keep the raw dump
+    python trace_export.py --file dump.txt -o trace.json
+"""
+
+import argparse
+import binascii
+import json
+import struct
+import time
+
+from debug_serial import open_port, read_reply
+
+RECORD_FORMAT = "<IBBH"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+DUMP_TIMEOUT_SEC = 10.0
+
+# Timeline rows (tid) per event type
+THREADS = {
+    "pass": (1, "main loop"),
+    "key_down": (2, "input"),
+    "key_up": (2, "input"),
+    "knob": (2, "input"),
+    "action": (3, "actions"),
+    "hid_report": (4, "HID"),
+    "command": (5, "serial"),
+    "upload": (5, "serial"),
+    "sd_read": (6, "SD card"),
+    "sd_write": (6, "SD card"),
+    "display": (7, "display"),
+    "gc": (8, "gc"),
+}
+HID_USAGES = {6: "keyboard", 1: "consumer", 2: "mouse"}
+WORK_BITS = ((1, "input"), (2, "timer"), (4, "host"))
+KNOB_PRESS_BASE = 0x100
+
+def read_dump(port_name):
+    """TRACE_DUMP lines from the pad (TRACE_BEGIN .. TRACE_END)"""
+    with open_port(port_name) as ser:
+        ser.reset_input_buffer()
+        ser.write(b"TRACE_DUMP\n")
+        ser.flush()
+        lines = [read_reply(ser, "TRACE_BEGIN:")]
+        t0 = time.time()
+        while time.time() - t0 < DUMP_TIMEOUT_SEC:
+            line = ser.readline().decode("utf-8", "ignore").strip()
+            if line.startswith("TRACE_DATA:"):
+                lines.append(line)
+            elif line == "TRACE_END":
+                lines.append(line)
+                return lines
+        raise TimeoutError("no TRACE_END")
+
+def send_command(port_name, command, reply):
+    with open_port(port_name) as ser:
+        ser.reset_input_buffer()
+        ser.write(command.encode() + b"\n")
+        ser.flush()
+        return read_reply(ser, reply)
+
+def parse_dump(lines):
+    """(header dict, [(timestamp us, type, phase, arg)]) of a dump"""
+    header = {}
+    for part in lines[0].split(":", 1)[1].split(","):
+        key, _, value = part.partition("=")
+        header[key] = value.split("|") if key in ("types", "actions", "commands") else value
+    if header.get("version") != "1":
+        raise ValueError(f"unknown trace format version {header.get('version')}")
+    data = b"".join(binascii.unhexlify(line.split(":", 1)[1]) for line in lines if line.startswith("TRACE_DATA:"))
+    records = [struct.unpack_from(RECORD_FORMAT, data, offset) for offset in range(0, len(data), RECORD_SIZE)]
+    return header, records
+
+def _name(header, kind, arg):
+    names = header["types"]
+    kind_name = names[kind] if kind < len(names) else f"type {kind}"
+    if kind_name in ("key_down", "key_up"):
+        key = f"knob press {arg - KNOB_PRESS_BASE}" if arg >= KNOB_PRESS_BASE else f"button {arg + 1}"
+        return f"{key} {'down' if kind_name == 'key_down' else 'up'}"
+    if kind_name == "knob":
+        steps = arg & 0xFF
+        steps = steps - 256 if steps > 127 else steps
+        return f"knob {chr(65 + (arg >> 8))} {steps:+d}"
+    if kind_name == "action":
+        actions = header["actions"]
+        return actions[arg] if arg < len(actions) else f"action {arg}"
+    if kind_name == "hid_report":
+        return f"{HID_USAGES.get(arg, arg)} report"
+    if kind_name == "command":
+        commands = header["commands"]
+        return commands[arg].rstrip(":") if arg < len(commands) else f"command {arg}"
+    if kind_name == "pass":
+        return "pass (" + "+".join(name for bit, name in WORK_BITS if arg & bit) + ")"
+    return kind_name.replace("_", " ")
+
+def to_chrome(header, records):
+    """Chrome trace events; the u32 microsecond clock is unwrapped, unmatched begin/end events
+    (cut off by the ring buffer or the dump) are dropped / closed at the last timestamp"""
+    events = []
+    open_spans = {}
+    offset = 0
+    previous = None
+    last_ts = 0
+    for timestamp, kind, phase, arg in records:
+        if previous is not None and timestamp + offset < previous - (1 << 31):
+            offset += 1 << 32
+        ts = timestamp + offset
+        previous = ts
+        last_ts = max(last_ts, ts)
+        kind_name = header["types"][kind] if kind < len(header["types"]) else str(kind)
+        tid = THREADS.get(kind_name, (9, "other"))[0]
+        name = _name(header, kind, arg)
+        stack = open_spans.setdefault(tid, [])
+        if phase == ord("B"):
+            stack.append(name)
+            events.append({"name": name, "ph": "B", "ts": ts, "pid": 1, "tid": tid, "args": {"arg": arg}})
+        elif phase == ord("E"):
+            if not stack:
+                continue
+            stack.pop()
+            events.append({"ph": "E", "ts": ts, "pid": 1, "tid": tid})
+        else:
+            events.append({"name": name, "ph": "i", "s": "t", "ts": ts, "pid": 1, "tid": tid, "args": {"arg": arg}})
+    for tid, stack in open_spans.items():
+        for _ in stack:
+            events.append({"ph": "E", "ts": last_ts, "pid": 1, "tid": tid})
+    events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "PadAwan"}})
+    for tid, label in sorted(set(THREADS.values())):
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": label}})
+    return {"traceEvents": events, "displayTimeUnit": "ms",
+            "otherData": {"records": header.get("records"), "overwritten": header.get("overwritten")}}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("port", nargs="?", help="CDC data port of the pad")
+    parser.add_argument("--file", help="convert a dump saved with --save instead of reading the pad")
+    parser.add_argument("--start", action="store_true", help="clear the buffer and start recording (TRACE:1)")
+    parser.add_argument("--stop", action="store_true", help="stop recording after the dump (TRACE:0)")
+    parser.add_argument("--save", help="write the raw dump lines to this file")
+    parser.add_argument("-o", "--output", default="trace.json", help="Chrome trace JSON file (default trace.json)")
+    args = parser.parse_args()
+
+    if args.start:
+        if not args.port:
+            parser.error("--start needs a port")
+        print(send_command(args.port, "TRACE:1", "TRACE:"))
+        return True
+    if args.file:
+        with open(args.file) as f:
+            lines = [line.strip() for line in f if line.strip()]
+    elif args.port:
+        lines = read_dump(args.port)
+        if args.stop:
+            send_command(args.port, "TRACE:0", "TRACE:")
+    else:
+        parser.error("give a port or --file")
+    if args.save:
+        with open(args.save, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    header, records = parse_dump(lines)
+    trace = to_chrome(header, records)
+    with open(args.output, "w") as f:
+        json.dump(trace, f)
+    print(f"📈 {len(records)} records ({header.get('overwritten')} overwritten) -> {args.output}")
+    return True
+
+if __name__ == "__main__":
+    exit(0 if main() else 1)